@@ -10,8 +10,8 @@ import pandas as pd                             # manipulasi data
 import time                                     # fungsi waktu
 import io                                       # manipulasi input/output
 import base64                                   # encoding/decoding
-import qrcode                                   # membuat qr code
-from datetime import datetime                   # tanggal dan waktu    
+from datetime import datetime, timedelta        # tanggal dan waktu    
+from functools import partial                   # fungsi pemuat data grafik
 from streamlit_option_menu import option_menu   # menu sidebar
 import os                                       # manipulasi file dan folder
 
@@ -21,20 +21,34 @@ from utils import (
     init_folders, init_master_csv, init_log_csv, init_users_csv,
     # fungsi utama aplikasi
     load_data, save_data, tambah_dokumen, get_dokumen_by_id, update_dokumen,
-    hapus_dokumen, get_semua_dokumen, 
+    hapus_dokumen, get_semua_dokumen, intip_id_dokumen,
+    # konteks data per rerun (tiap file dimuat sekali per render)
+    KonteksData,
+    # optimistic concurrency (versi dokumen)
+    KonflikVersi, versi_dokumen,
+    # fungsi import massal
+    import_dokumen_massal, get_status_qr, antrekan_qr,
     # fungsi log aktivitas
-    tambah_log, get_semua_log,
+    tambah_log, get_semua_log, hitung_log, get_info_partisi_log, kompres_partisi_log,
+    get_rollup_log,
     # fungsi qr code
-    generate_qr_code, scan_qr_code, generate_qr_batch,
+    generate_qr_code, scan_qr_code, generate_qr_batch, rencana_qr_batch, hapus_qr_yatim,
+    render_qr_cache, baca_qr_png, daftar_qr, thumbnail_qr, buat_zip_qr,
+    antrekan_lembar_label, UKURAN_KERTAS, FOLDER_EKSPOR_QR,
     # fungsi statistik dan grafik
     get_statistik, get_dokumen_terbaru, get_log_terbaru,
-    buat_pie_chart, buat_bar_chart, buat_line_chart,
+    buat_pie_chart, buat_bar_chart, buat_line_chart, waktu_grafik_terakhir,
     # fungsi pencarian, filter, export, backup
-    cari_dokumen, filter_dokumen, export_excel, buat_backup,
+    cari_dokumen, cari_query, cari_query_faset, filter_dokumen, export_excel, buat_backup,
+    # fungsi paginasi
+    halaman_data, KOLOM_URUT,
     # fungsi login
     validasi_login, tambah_user, get_file_size,
+    # fungsi cache data
+    get_statistik_cache, get_statistik_cache_query, get_statistik_cache_grafik, get_statistik_cache_qr,
+    versi_data,
     # konstanta
-    JENIS_DOKUMEN, STATUS_DOKUMEN, LOKASI_LIST
+    JENIS_DOKUMEN, STATUS_DOKUMEN, LOKASI_LIST, QR_WORKERS
 )
 
 # KONFIGURASI HALAMAN STREAMLIT
@@ -50,6 +64,16 @@ FILE_LOG = "data/log.csv"               # log aktivitas
 FILE_USERS = "data/users.csv"           # data user
 FOLDER_QR = "qr"                        # folder menyimpan gambar qr code
 
+# Parameter render QR preview di form Tambah (lihat PARAMETER_QR di utils)
+PARAMETER_QR_PREVIEW = {
+    'version': 1,               # ukuran qr code (1 = paling kecil)
+    'error_correction': 'L',    # tingkat koreksi kesalahan
+    'box_size': 8,              # ukuran tiap kotak
+    'border': 3,                # lebar border
+    'fill_color': '#8b5cf6',
+    'back_color': 'white'
+}
+
 # Definisi akses untuk setiap role
 ROLE_ACCESS = {
     'staff': {
@@ -63,7 +87,7 @@ ROLE_ACCESS = {
     'admin': {
         'menu': ['Lobby', 'Dashboard', 'Data Master', 'Scan QR', 'Kelola QR', 'Laporan', 'Pengaturan'],
         'dashboard_aktivitas': True,        # bisa lihat aktivitas terbaru
-        'data_master_tabs': ['Lihat Data', 'Tambah', 'Edit', 'Hapus'],  # semua tab
+        'data_master_tabs': ['Lihat Data', 'Tambah', 'Import', 'Edit', 'Hapus'],  # semua tab
         'laporan_tabs': ['Grafik', 'Log Aktivitas', 'Export'],  # semua tab
         'pengaturan_tabs': ['Akun', 'Data', 'Tentang'],  # semua tab
         'kelola_qr': True,                  # bisa kelola QR
@@ -236,6 +260,44 @@ def init_app():
     init_log_csv(FILE_LOG)              # buat log.csv jika belum ada
     init_users_csv(FILE_USERS)          # buat users.csv dengan admin default jika belum ada
 
+def tampil_grafik(fig):
+    """
+    Tampilkan grafik Plotly beserta waktu pembuatannya
+    (dari cache grafik atau dibangun ulang)
+    """
+    st.plotly_chart(fig, use_container_width=True, theme=None)
+    waktu = waktu_grafik_terakhir()
+    if waktu:
+        if waktu['cache']:
+            st.caption(f"⏱️ {waktu['ms']:.2f} ms dari cache (dibangun {waktu['ms_bangun']:.1f} ms)")
+        else:
+            st.caption(f"⏱️ {waktu['ms']:.1f} ms dibangun ulang")
+
+@st.fragment(run_every=0.5)
+def pantau_job(job_id, teks):
+    """
+    Progress job background (QR / label). Selama job berjalan hanya fragmen
+    ini yang di-rerun tiap 0.5 detik; halaman penuh di-rerun sekali saat job
+    selesai agar hasilnya ditampilkan
+    """
+    status = get_status_qr(job_id)
+    if status and status['jalan']:
+        st.progress(status['selesai'] / max(status['total'], 1),
+                    text=f"{teks}... {status['selesai']}/{status['total']}")
+    else:
+        st.rerun()
+
+def versi_ditampilkan(key, dok):
+    """
+    Versi dokumen yang tampil di render sebelumnya (yang dilihat user saat
+    klik tombol), lalu catat versi dok yang dirender sekarang.
+    Setiap rerun membaca ulang dok, jadi versi yang dicatat selalu sesuai
+    dengan data yang sedang tampil di layar.
+    """
+    versi_lama = st.session_state.get(key)
+    st.session_state[key] = versi_dokumen(dok)
+    return versi_lama if versi_lama is not None else st.session_state[key]
+
 def get_role_badge(role):
     """
     Mendapatkan badge HTML untuk role user
@@ -296,7 +358,7 @@ def halaman_login():
         """)
 
 # HALAMAN LOBBY
-def halaman_lobby():
+def halaman_lobby(ctx=None):
     # Tampilkan halaman lobby dengan menu utama 
     access = get_user_access()
     role = st.session_state.get('role', 'staff')
@@ -357,8 +419,8 @@ def halaman_lobby():
     st.markdown("### 📊 Statistik Cepat")
     
     # Ambil data statistik dari utils.py
-    stats = get_statistik(FILE_DOKUMEN)
-    df_log = get_semua_log(FILE_LOG)
+    stats = get_statistik(FILE_DOKUMEN, ctx=ctx)
+    total_log = hitung_log(FILE_LOG, ctx=ctx)    # dari manifest partisi, arsip tidak dimuat
     
     # Tampilkan statistik dalam 4 kolom
     col1, col2, col3, col4 = st.columns(4)
@@ -376,7 +438,7 @@ def halaman_lobby():
         if access['dashboard_aktivitas']:
             st.markdown(f"""
             <div class="metric-card green">
-                <h2>{len(df_log)}</h2>
+                <h2>{total_log}</h2>
                 <p>📝 Total Aktivitas</p>
             </div>
             """, unsafe_allow_html=True)
@@ -416,15 +478,15 @@ def halaman_lobby():
     st.info(f"**Role: {role.upper()}** - {role_info.get(role.lower(), 'Akses terbatas')}")
 
 # HALAMAN DASHBOARD
-def halaman_dashboard():
+def halaman_dashboard(ctx=None):
     # Halaman dashboard dengan statistik dan grafik
     access = get_user_access()
     
     st.header("📊 Dashboard")
     
     # Ambil data statistik dari utils.py
-    stats = get_statistik(FILE_DOKUMEN)
-    df_log = get_semua_log(FILE_LOG)
+    stats = get_statistik(FILE_DOKUMEN, ctx=ctx)
+    total_log = hitung_log(FILE_LOG, ctx=ctx)
     
     # Bagian statistik atas dalam 4 kolom
     col1, col2, col3, col4 = st.columns(4)
@@ -433,7 +495,7 @@ def halaman_dashboard():
         st.markdown(f'<div class="metric-card"><h2>{stats["total"]}</h2><p>📄 Total Dokumen</p></div>', unsafe_allow_html=True)
     with col2:
         if access['dashboard_aktivitas']:
-            st.markdown(f'<div class="metric-card green"><h2>{len(df_log)}</h2><p>📝 Aktivitas</p></div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="metric-card green"><h2>{total_log}</h2><p>📝 Aktivitas</p></div>', unsafe_allow_html=True)
         else:
             st.markdown(f'<div class="metric-card green" style="opacity: 0.5;"><h2>🔒</h2><p>📝 Aktivitas</p></div>', unsafe_allow_html=True)
     with col3:
@@ -448,20 +510,23 @@ def halaman_dashboard():
     
     with col1:
         st.subheader("📈 Distribusi Jenis Dokumen")
-        df = get_semua_dokumen(FILE_DOKUMEN)
+        # Grafik yang datanya tidak berubah diambil dari cache tanpa memuat
+        # master; data hanya dimuat (sekali per rerun, lewat ctx) saat cache miss
+        muat_dokumen = partial(get_semua_dokumen, FILE_DOKUMEN, ctx=ctx)
+        versi = versi_data(FILE_DOKUMEN)
         
         # Buat pie chart
-        fig = buat_pie_chart(df, 'Jenis', 'Dokumen per Jenis')
+        fig = buat_pie_chart(muat_dokumen, 'Jenis', 'Dokumen per Jenis', versi=versi)
         if fig:
-            st.plotly_chart(fig, use_container_width=True, theme=None)
+            tampil_grafik(fig)
         else:
             st.info("Belum ada data dokumen")
     
     with col2:
         st.subheader("📊 Dokumen per Lokasi")
-        fig = buat_bar_chart(df, 'Lokasi_Fisik', 'Dokumen per Lokasi')
+        fig = buat_bar_chart(muat_dokumen, 'Lokasi_Fisik', 'Dokumen per Lokasi', versi=versi)
         if fig:
-            st.plotly_chart(fig, use_container_width=True, theme=None)
+            tampil_grafik(fig)
         else:
             st.info("Belum ada data dokumen")
     
@@ -472,7 +537,7 @@ def halaman_dashboard():
     with col1:
         st.subheader("📋 Dokumen Terbaru")
         # Tampilkan 5 dokumen terbaru
-        df_terbaru = get_dokumen_terbaru(FILE_DOKUMEN, 5)
+        df_terbaru = get_dokumen_terbaru(FILE_DOKUMEN, 5, ctx=ctx)
         if len(df_terbaru) > 0:
             st.dataframe(df_terbaru[['ID', 'Judul', 'Jenis', 'Status']], use_container_width=True, hide_index=True)
         else:
@@ -482,7 +547,7 @@ def halaman_dashboard():
         st.subheader("📝 Aktivitas Terbaru")
         # Cek akses untuk melihat aktivitas
         if access['dashboard_aktivitas']:
-            df_log_terbaru = get_log_terbaru(FILE_LOG, 5)
+            df_log_terbaru = get_log_terbaru(FILE_LOG, 5, ctx=ctx)
             if len(df_log_terbaru) > 0:
                 st.dataframe(df_log_terbaru[['ID_Dokumen', 'Aksi', 'Waktu']], use_container_width=True, hide_index=True)
             else:
@@ -491,19 +556,20 @@ def halaman_dashboard():
             st.warning("🔒 Anda tidak memiliki akses untuk melihat aktivitas terbaru.")
 
 # HALAMAN DATA MASTER
-def halaman_data_master():
+def halaman_data_master(ctx=None):
     """
     Halaman CRUD data dokumen dengan ROLE-BASED ACCESS
     ---------------------------------------------------
-    Terdiri dari 4 tab:
+    Terdiri dari 5 tab:
     1. Lihat Data - menampilkan semua dokumen dengan filter dan pencarian
     2. Tambah - form untuk menambah dokumen baru dengan preview
-    3. Edit - form untuk mengubah data dokumen
-    4. Hapus - menghapus dokumen dengan konfirmasi
+    3. Import - import dokumen massal dari file CSV / Excel
+    4. Edit - form untuk mengubah data dokumen
+    5. Hapus - menghapus dokumen dengan konfirmasi
     
     Akses berdasarkan Role:
     - Staff: Hanya tab Lihat Data
-    - Admin: Semua tab (Lihat Data, Tambah, Edit, Hapus)
+    - Admin: Semua tab (Lihat Data, Tambah, Import, Edit, Hapus)
     """
     access = get_user_access()
     allowed_tabs = access['data_master_tabs']
@@ -517,7 +583,7 @@ def halaman_data_master():
     
     # Buat tab berdasarkan akses
     tab_names = []
-    tab_icons = {"Lihat Data": "📋", "Tambah": "➕", "Edit": "✏️", "Hapus": "🗑️"}
+    tab_icons = {"Lihat Data": "📋", "Tambah": "➕", "Import": "📥", "Edit": "✏️", "Hapus": "🗑️"}
     
     for tab in allowed_tabs:
         tab_names.append(f"{tab_icons.get(tab, '')} {tab}")
@@ -529,33 +595,96 @@ def halaman_data_master():
         tab_index = allowed_tabs.index("Lihat Data")
         with tabs[tab_index]:
             # Baris filter dan pencarian
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
             with col1:
                 # Input pencarian
-                keyword = st.text_input("🔍 Cari", placeholder="Masukkan keyword...")
+                keyword = st.text_input("🔍 Cari", placeholder="Masukkan keyword...",
+                                        help="Contoh: `rapat jenis:memo status:aktif`, `tanggal:2025-01..2025-03`, "
+                                             "`\"surat masuk\"`, `notulen OR memo`, `-status:arsip`")
+            
+            # Pilihan dropdown dari rerun ini sudah ada di session_state, jadi
+            # hasil + hitungan per pilihan bisa dihitung sebelum dropdown digambar
+            filter_jenis = st.session_state.get('filter_jenis', "Semua")
+            filter_status = st.session_state.get('filter_status', "Semua")
+            filter_lokasi = st.session_state.get('filter_lokasi', "Semua")
+            
+            # Query pencarian + filter dropdown dijalankan sekaligus (satu kali lewat data)
+            try:
+                df, hitungan, sumber = cari_query_faset(FILE_DOKUMEN, keyword, jenis=filter_jenis,
+                                                        status=filter_status, lokasi=filter_lokasi,
+                                                        ctx=ctx, dengan_kunci=True)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                df, hitungan, sumber = get_semua_dokumen(FILE_DOKUMEN, ctx=ctx).iloc[0:0], {}, None
+            
+            def label_faset(kolom):
+                # "Kontrak (1,204)" - jumlah hasil jika pilihan ini dipakai
+                jumlah = hitungan.get(kolom, {})
+                return lambda nilai: (f"{nilai} ({sum(jumlah.values()):,})" if nilai == "Semua"
+                                      else f"{nilai} ({jumlah.get(nilai, 0):,})")
+            
             with col2:
                 # Dropdown filter jenis
-                filter_jenis = st.selectbox("Filter Jenis", ["Semua"] + JENIS_DOKUMEN)
+                st.selectbox("Filter Jenis", ["Semua"] + JENIS_DOKUMEN,
+                             format_func=label_faset('Jenis'), key="filter_jenis")
             with col3:
                 # Dropdown filter status
-                filter_status = st.selectbox("Filter Status", ["Semua"] + STATUS_DOKUMEN)
+                st.selectbox("Filter Status", ["Semua"] + STATUS_DOKUMEN,
+                             format_func=label_faset('Status'), key="filter_status")
+            with col4:
+                # Dropdown filter lokasi
+                st.selectbox("Filter Lokasi", ["Semua"] + LOKASI_LIST,
+                             format_func=label_faset('Lokasi_Fisik'), key="filter_lokasi")
             
-            # Ambil dan filter data
-            if keyword:
-                df = cari_dokumen(FILE_DOKUMEN, keyword)    # fungsi cari dari utils.py
-            else:
-                df = get_semua_dokumen(FILE_DOKUMEN)        # fungsi ambil semua data dari utils.py
+            # Baris pengaturan urutan dan ukuran halaman
+            col_urut, col_arah, col_ukuran = st.columns([2, 1, 1])
+            with col_urut:
+                pilihan_urut = (["Relevansi"] if keyword.strip() else []) + KOLOM_URUT
+                kolom_urut = st.selectbox("Urutkan", pilihan_urut, key="urut_kolom")
+            with col_arah:
+                arah = st.selectbox("Arah", ["Naik", "Turun"], key="urut_arah")
+            with col_ukuran:
+                ukuran = st.selectbox("Baris per halaman", [25, 50, 100, 200], index=1, key="ukuran_halaman")
+            
+            # Kursor halaman kembali ke awal jika query, filter, atau urutan berubah
+            tanda = (keyword, filter_jenis, filter_status, filter_lokasi, kolom_urut, arah, ukuran)
+            if st.session_state.get('lihat_tanda') != tanda:
+                st.session_state['lihat_tanda'] = tanda
+                st.session_state['lihat_kursor'] = None
             
-            # Terapkan filter jika bukan "Semua"
-            if filter_jenis != "Semua" and len(df) > 0 and 'Jenis' in df.columns:
-                df = df[df['Jenis'] == filter_jenis]
-            if filter_status != "Semua" and len(df) > 0 and 'Status' in df.columns:
-                df = df[df['Status'] == filter_status]
+            # Hanya halaman aktif yang diurutkan-dipotong di server lalu dikirim ke tabel
+            halaman = halaman_data(df, None if kolom_urut == "Relevansi" else kolom_urut,
+                                   turun=(arah == "Turun"), ukuran=ukuran,
+                                   kursor=st.session_state.get('lihat_kursor'), sumber=sumber)
             
             # Tampilkan tabel hasil
-            if len(df) > 0:
-                st.dataframe(df, use_container_width=True, hide_index=True, height=400)
-                st.info(f"📊 Total: {len(df)} dokumen")
+            if halaman['total'] > 0:
+                st.dataframe(halaman['data'], use_container_width=True, hide_index=True,
+                             height=min(400, 38 + 35 * len(halaman['data'])))
+                
+                def pindah_halaman(kursor):
+                    st.session_state['lihat_kursor'] = kursor
+                
+                mulai, total = halaman['mulai'], halaman['total']
+                akhir = mulai + len(halaman['data'])
+                ada_sebelum, ada_sesudah = mulai > 0, akhir < total
+                
+                col_awal, col_sebelum, col_info, col_sesudah, col_akhir = st.columns([1, 1, 3, 1, 1])
+                with col_awal:
+                    st.button("⏮️", key="hal_awal", disabled=not ada_sebelum, use_container_width=True,
+                              on_click=pindah_halaman, args=(('awal',),))
+                with col_sebelum:
+                    st.button("◀️", key="hal_sebelum", disabled=not ada_sebelum, use_container_width=True,
+                              on_click=pindah_halaman, args=(('sebelum', halaman['kunci_awal']),))
+                with col_info:
+                    st.info(f"📊 {mulai + 1:,}–{akhir:,} dari {total:,} dokumen "
+                            f"(halaman {mulai // ukuran + 1:,} / {(total - 1) // ukuran + 1:,})")
+                with col_sesudah:
+                    st.button("▶️", key="hal_sesudah", disabled=not ada_sesudah, use_container_width=True,
+                              on_click=pindah_halaman, args=(('setelah', halaman['kunci_akhir']),))
+                with col_akhir:
+                    st.button("⏭️", key="hal_akhir", disabled=not ada_sesudah, use_container_width=True,
+                              on_click=pindah_halaman, args=(('akhir',),))
             else:
                 st.warning("Tidak ada data dokumen")
     
@@ -582,18 +711,8 @@ def halaman_data_master():
             with col_preview:
                 st.markdown("#### 👁️ Preview Dokumen")
                 
-                df_preview = get_semua_dokumen(FILE_DOKUMEN)
-                
-                # Logika generate ID baru untuk preview
-                if len(df_preview) == 0 or 'ID' not in df_preview.columns:
-                    preview_id = "DOC001"
-                else:
-                    try:
-                        last_id = df_preview['ID'].dropna().iloc[-1] if len(df_preview['ID'].dropna()) > 0 else "DOC000"
-                        num = int(str(last_id).replace("DOC", "")) + 1
-                        preview_id = f"DOC{num:03d}"
-                    except:
-                        preview_id = f"DOC{len(df_preview)+1:03d}"
+                # ID berikutnya dari sequence (tanpa reservasi, tanpa memuat master)
+                preview_id = intip_id_dokumen(FILE_DOKUMEN)
                 
                 # Set preview values
                 preview_judul = judul if judul else "Judul belum diisi"
@@ -634,26 +753,13 @@ def halaman_data_master():
                 # Preview QR Code
                 st.markdown("#### 📱 Preview QR Code")
                 
-                # Generate temporary QR for preview
-                qr = qrcode.QRCode(
-                    version=1,                                          # ukuran qr code (1 = paling kecil)
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,  # tingkat koreksi kesalahan
-                    box_size=8,                                         # ukuran tiap kotak
-                    border=3                                            # lebar border
-                )
-                qr.add_data(preview_id)     # data yang akan di-encode
-                qr.make(fit=True)
-                qr_img = qr.make_image(fill_color="#8b5cf6", back_color="white")
-                
-                # Konversi ke bytes untuk ditampilkan di streamlit
-                buffer = io.BytesIO()
-                qr_img.save(buffer, format='PNG')
-                buffer.seek(0)
+                # QR preview (bytes PNG dari cache, tidak dirender ulang tiap rerun)
+                png_preview = render_qr_cache(preview_id, PARAMETER_QR_PREVIEW)
                 
                 # Tampilkan QR Code di tengah
                 col_qr1, col_qr2, col_qr3 = st.columns([1, 2, 1])
                 with col_qr2:
-                    st.image(buffer, width=180, caption=f"QR Code: {preview_id}")
+                    st.image(png_preview, width=180, caption=f"QR Code: {preview_id}")
             
             # Tombol Simpan
             st.markdown("---")
@@ -679,13 +785,62 @@ def halaman_data_master():
                     else:
                         st.error("❌ Judul dokumen harus diisi!")
     
+    # TAB: IMPORT MASSAL (hanya Admin)
+    if "Import" in allowed_tabs:
+        tab_index = allowed_tabs.index("Import")
+        with tabs[tab_index]:
+            st.subheader("📥 Import Dokumen Massal")
+            st.info("""
+            **Format file:** CSV (pemisah `;` atau `,`) atau Excel (.xlsx) dengan kolom
+            **Judul, Jenis, Lokasi, Status, Keterangan**. Nilai Jenis, Status dan Lokasi
+            harus sesuai pilihan di form Tambah. Status kosong diisi *Aktif*.
+            """)
+            
+            file_import = st.file_uploader("Pilih file", type=['csv', 'xlsx'], key="file_import")
+            
+            if file_import is not None:
+                if st.button("📥 Import Sekarang", type="primary", use_container_width=True, key="btn_import"):
+                    status_baca = st.empty()
+                    with st.spinner("Membaca dan memvalidasi file..."):
+                        hasil = import_dokumen_massal(
+                            FILE_DOKUMEN, FILE_LOG, file_import, file_import.name,
+                            user=st.session_state.get('username', 'Admin'),
+                            folder_qr=FOLDER_QR,
+                            progress=lambda n: status_baca.caption(f"📄 {n} baris dibaca")
+                        )
+                    # Disimpan di session agar tetap tampil selama QR dibuat (halaman di-rerun)
+                    st.session_state['hasil_import'] = hasil
+                
+                hasil = st.session_state.get('hasil_import')
+                if hasil:
+                    if hasil['berhasil'] > 0:
+                        st.success(f"✅ {hasil['berhasil']} dokumen berhasil diimport "
+                                   f"({hasil['id'][0]} s/d {hasil['id'][-1]})")
+                        if not hasil.get('log', True):
+                            st.warning("⚠️ Dokumen tersimpan, tetapi log aktivitas import gagal dicatat")
+                    if len(hasil['error']) > 0:
+                        st.warning(f"⚠️ {len(hasil['error'])} baris ditolak")
+                        st.dataframe(hasil['error'], use_container_width=True, hide_index=True, height=250)
+                    if hasil['berhasil'] == 0 and len(hasil['error']) == 0:
+                        st.warning("File tidak berisi data")
+                    
+                    # Pantau pembuatan QR code di background (hanya fragmen progress
+                    # yang di-rerun selama job berjalan)
+                    status_qr = get_status_qr(hasil['job_qr']) if hasil['job_qr'] else None
+                    if status_qr and status_qr['jalan']:
+                        pantau_job(hasil['job_qr'], "Membuat QR Code")
+                    elif status_qr:
+                        st.progress(1.0, text=f"✅ {status_qr['selesai'] - status_qr['gagal']} QR Code dibuat")
+            else:
+                st.session_state.pop('hasil_import', None)
+    
     # TAB: EDIT DOKUMEN (hanya Admin)
     if "Edit" in allowed_tabs:
         tab_index = allowed_tabs.index("Edit")
         with tabs[tab_index]:
             st.subheader("✏️ Edit Dokumen")
             
-            df = get_semua_dokumen(FILE_DOKUMEN)
+            df = get_semua_dokumen(FILE_DOKUMEN, ctx=ctx)
             
             if len(df) > 0 and 'ID' in df.columns:
                 id_list = df['ID'].tolist()
@@ -695,6 +850,10 @@ def halaman_data_master():
                     dok = get_dokumen_by_id(FILE_DOKUMEN, selected_id)
                     
                     if dok:
+                        # Versi yang dilihat user saat submit, untuk mendeteksi
+                        # perubahan dari sesi lain (form selalu dirender dari dok terbaru)
+                        versi_dibaca = versi_ditampilkan(f"edit_versi_{selected_id}", dok)
+                        
                         with st.form("form_edit"):
                             col1, col2 = st.columns(2)
                             
@@ -713,16 +872,24 @@ def halaman_data_master():
                             submit = st.form_submit_button("💾 Update", use_container_width=True)
                             
                             if submit:
-                                update_dokumen(FILE_DOKUMEN, selected_id, {
-                                    'Judul': new_judul,
-                                    'Jenis': new_jenis,
-                                    'Lokasi_Fisik': new_lokasi,
-                                    'Status': new_status,
-                                    'Keterangan': new_keterangan
-                                })
-                                tambah_log(FILE_LOG, selected_id, "UPDATE", st.session_state.get('username', 'Admin'))
-                                st.success(f"✅ Dokumen {selected_id} berhasil diupdate!")
-                                st.rerun()
+                                try:
+                                    update_dokumen(FILE_DOKUMEN, selected_id, {
+                                        'Judul': new_judul,
+                                        'Jenis': new_jenis,
+                                        'Lokasi_Fisik': new_lokasi,
+                                        'Status': new_status,
+                                        'Keterangan': new_keterangan
+                                    }, versi=versi_dibaca)
+                                except KonflikVersi as e:
+                                    # Form di atas sudah dirender ulang dari data terbaru
+                                    st.error(f"⚠️ {e}")
+                                    if e.dokumen is not None:
+                                        st.dataframe(pd.DataFrame([e.dokumen]), use_container_width=True, hide_index=True)
+                                        st.info("Form sudah memuat data terbaru di atas. Periksa lalu klik Update lagi.")
+                                else:
+                                    tambah_log(FILE_LOG, selected_id, "UPDATE", st.session_state.get('username', 'Admin'))
+                                    st.success(f"✅ Dokumen {selected_id} berhasil diupdate!")
+                                    st.rerun()
             else:
                 st.warning("Belum ada data dokumen")
     
@@ -732,7 +899,7 @@ def halaman_data_master():
         with tabs[tab_index]:
             st.subheader("🗑️ Hapus Dokumen")
             
-            df = get_semua_dokumen(FILE_DOKUMEN)
+            df = get_semua_dokumen(FILE_DOKUMEN, ctx=ctx)
             
             if len(df) > 0 and 'ID' in df.columns:
                 id_list = df['ID'].tolist()
@@ -742,6 +909,9 @@ def halaman_data_master():
                     dok = get_dokumen_by_id(FILE_DOKUMEN, selected_id)
                     
                     if dok:
+                        # Versi saat dokumen ditampilkan (lihat tab Edit)
+                        versi_dibaca = versi_ditampilkan(f"hapus_versi_{selected_id}", dok)
+                        
                         st.markdown(f"""
                         <div class="info-card">
                             <p><strong>ID:</strong> {dok['ID']}</p>
@@ -757,11 +927,16 @@ def halaman_data_master():
                         
                         if konfirmasi:
                             if st.button("🗑️ Hapus Permanen", type="primary", key="btn_hapus_permanen"):
-                                tambah_log(FILE_LOG, selected_id, "DELETE", st.session_state.get('username', 'Admin'))
-                                hapus_dokumen(FILE_DOKUMEN, selected_id)
-                                st.success(f"✅ Dokumen {selected_id} berhasil dihapus!")
-                                time.sleep(1)
-                                st.rerun()
+                                try:
+                                    hapus_dokumen(FILE_DOKUMEN, selected_id, versi=versi_dibaca)
+                                except KonflikVersi as e:
+                                    # Kartu di atas sudah menampilkan data terbaru
+                                    st.error(f"⚠️ {e}. Periksa data di atas sebelum menghapus.")
+                                else:
+                                    tambah_log(FILE_LOG, selected_id, "DELETE", st.session_state.get('username', 'Admin'))
+                                    st.success(f"✅ Dokumen {selected_id} berhasil dihapus!")
+                                    time.sleep(1)
+                                    st.rerun()
             else:
                 st.warning("Belum ada data dokumen")
 
@@ -819,7 +994,7 @@ def halaman_scan_qr():
             st.info("Belum ada QR Code yang di-scan")
 
 # HALAMAN KELOLA QR
-def halaman_kelola_qr():
+def halaman_kelola_qr(ctx=None):
     """
     Halaman kelola QR Code (hanya Admin)
     ------------------------------------
@@ -827,6 +1002,10 @@ def halaman_kelola_qr():
     1. Lihat QR - melihat QR Code per dokumen
     2. Generate Batch - generate QR untuk semua dokumen sekaligus
     3. Download - download semua QR Code
+    4. Label - cetak lembar label QR
+    Job background (generate batch, label) dipantau tanpa menahan halaman:
+    progress digambar sekali, lalu halaman di-rerun di akhir fungsi selama
+    masih ada job yang berjalan.
     """
     access = get_user_access()
     
@@ -836,11 +1015,11 @@ def halaman_kelola_qr():
     
     st.header("📱 Kelola QR Code")
     
-    tab1, tab2, tab3 = st.tabs(["📋 Lihat QR", "🔄 Generate Batch", "⬇️ Download"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📋 Lihat QR", "🔄 Generate Batch", "⬇️ Download", "🏷️ Label"])
     
     # TAB 1: LIHAT QR
     with tab1:
-        df = get_semua_dokumen(FILE_DOKUMEN)
+        df = get_semua_dokumen(FILE_DOKUMEN, ctx=ctx)
         
         if len(df) > 0 and 'ID' in df.columns:
             # Dropdown pilih dokumen
@@ -854,18 +1033,18 @@ def halaman_kelola_qr():
                 with col1:
                     # Path file QR berdasarkan ID
                     qr_path = f"qr/{selected_id}.png"
-                    if os.path.exists(qr_path):
-                        # QR code sudah ada, tampilkan
-                        st.image(qr_path, width=250, caption=f"QR Code: {selected_id}")
+                    png_qr = baca_qr_png(qr_path)
+                    if png_qr is not None:
+                        # QR code sudah ada, tampilkan (bytes dari cache QR)
+                        st.image(png_qr, width=250, caption=f"QR Code: {selected_id}")
                         
                         # Tombol download
-                        with open(qr_path, "rb") as f:
-                            st.download_button("⬇️ Download QR", f.read(), f"{selected_id}.png", "image/png", key="dl_single_qr")
+                        st.download_button("⬇️ Download QR", png_qr, f"{selected_id}.png", "image/png", key="dl_single_qr")
                     else:
                         # QR code belum ada, tampilkan tombol generate
                         st.warning("QR Code belum dibuat")
                         if st.button("🔄 Generate QR", key="gen_single_qr"):
-                            generate_qr_code(selected_id, qr_path)
+                            generate_qr_code(selected_id, qr_path, id_dokumen=selected_id)
                             st.success("✅ QR Code berhasil dibuat!")
                             st.rerun()
                 
@@ -884,18 +1063,64 @@ def halaman_kelola_qr():
     with tab2:
         st.subheader("🔄 Generate QR Batch")
         
-        df = get_semua_dokumen(FILE_DOKUMEN)
+        df = get_semua_dokumen(FILE_DOKUMEN, ctx=ctx)
         
         if len(df) > 0:
             st.write(f"📊 Total dokumen: **{len(df)}**")
             
-            if st.button("🔄 Generate Semua QR", type="primary", use_container_width=True, key="btn_gen_batch"):
-                with st.spinner("Generating QR Codes..."):
-                    # Panggil fungsi generate batch dari utils.py
-                    generated = generate_qr_batch(FILE_DOKUMEN, FOLDER_QR)
-                st.success(f"✅ Berhasil generate {len(generated)} QR Code!")
-                # Catat log aktivitas
-                tambah_log(FILE_LOG, "BATCH", "GENERATE_BATCH", st.session_state.get('username', 'Admin'))
+            # Hanya QR yang hilang/basi yang dibuat ulang (lihat manifest QR)
+            paksa = st.checkbox("Buat ulang semua QR", key="qr_paksa",
+                                help="Abaikan manifest dan render ulang semua QR (file yang isinya sama tidak ditulis ulang)")
+            # Rencana di-cache sampai data, folder QR atau manifest berubah;
+            # "Periksa Ulang" memeriksa lagi file PNG yang diubah dari luar aplikasi
+            segarkan = st.button("🔍 Periksa Ulang", key="btn_periksa_qr")
+            rencana = rencana_qr_batch(FILE_DOKUMEN, FOLDER_QR, paksa=paksa, segarkan=segarkan)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("✅ Sudah terbaru", rencana['terbaru'])
+            col2.metric("🔄 Perlu dibuat", len(rencana['perlu']))
+            col3.metric("🗑️ QR yatim", len(rencana['yatim']))
+            rincian = ", ".join(f"{alasan}: {jumlah}" for alasan, jumlah in rencana['alasan'].items() if jumlah)
+            if rincian:
+                st.caption(f"Alasan dibuat ulang — {rincian}")
+            
+            # Jumlah proses paralel untuk render QR
+            workers = st.number_input("Jumlah worker", min_value=1, max_value=max(os.cpu_count() or 1, QR_WORKERS),
+                                      value=QR_WORKERS, key="qr_workers",
+                                      help="Jumlah proses yang membuat QR Code bersamaan (1 = serial)")
+            
+            if st.button(f"🔄 Generate {len(rencana['perlu'])} QR", type="primary", use_container_width=True,
+                         key="btn_gen_batch", disabled='job_qr_batch' in st.session_state or not rencana['perlu']):
+                # Dikerjakan di background (beberapa proses), progres dipantau di bawah
+                daftar_id = rencana['perlu']
+                daftar_path = [f"{FOLDER_QR}/{id_dokumen}.png" for id_dokumen in daftar_id]
+                st.session_state['job_qr_batch'] = antrekan_qr(daftar_id, daftar_path, workers=int(workers),
+                                                               folder_manifest=FOLDER_QR,
+                                                               hapus_manifest=rencana['usang'])
+            
+            # Pantau job generate batch yang sedang berjalan
+            job_id = st.session_state.get('job_qr_batch')
+            status_qr = get_status_qr(job_id) if job_id else None
+            if status_qr and status_qr['jalan']:
+                pantau_job(job_id, "Generating QR Codes")
+            elif job_id:
+                st.session_state.pop('job_qr_batch', None)
+                if status_qr:
+                    st.progress(1.0, text="Selesai")
+                    st.success(f"✅ Berhasil generate {status_qr['selesai'] - status_qr['gagal']} QR Code!")
+                    if status_qr['gagal']:
+                        st.warning(f"⚠️ {status_qr['gagal']} QR Code gagal dibuat")
+                    # Catat log aktivitas
+                    tambah_log(FILE_LOG, "BATCH", "GENERATE_BATCH", st.session_state.get('username', 'Admin'))
+            
+            # QR yatim: file PNG yang dokumennya sudah dihapus
+            if rencana['yatim']:
+                with st.expander(f"🗑️ {len(rencana['yatim'])} QR tanpa dokumen"):
+                    st.write(", ".join(rencana['yatim'][:100]) + (" ..." if len(rencana['yatim']) > 100 else ""))
+                    if st.button("🗑️ Hapus QR Yatim", key="btn_hapus_yatim"):
+                        jumlah = hapus_qr_yatim(FOLDER_QR, rencana['yatim'])
+                        tambah_log(FILE_LOG, "BATCH", "HAPUS_QR_YATIM", st.session_state.get('username', 'Admin'))
+                        st.success(f"✅ {jumlah} QR yatim dihapus")
+                        st.rerun()
         else:
             st.warning("Belum ada data dokumen")
 
@@ -903,30 +1128,117 @@ def halaman_kelola_qr():
     with tab3:
         st.subheader("⬇️ Download QR Code")
         
-        if os.path.exists(FOLDER_QR):
-            # List semua file PNG di folder QR
-            qr_files = [f for f in os.listdir(FOLDER_QR) if f.endswith('.png')]
+        # Filter kumpulan QR yang ditampilkan / di-ZIP
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            jenis_qr = st.selectbox("Filter Jenis", ["Semua"] + JENIS_DOKUMEN, key="qr_filter_jenis")
+        with col2:
+            status_qr = st.selectbox("Filter Status", ["Semua"] + STATUS_DOKUMEN, key="qr_filter_status")
+        with col3:
+            lokasi_qr = st.selectbox("Filter Lokasi", ["Semua"] + LOKASI_LIST, key="qr_filter_lokasi")
+        filter_qr = (jenis_qr, status_qr, lokasi_qr)
+        
+        daftar_id_qr = daftar_qr(FILE_DOKUMEN, FOLDER_QR, *filter_qr, ctx=ctx)
+        if daftar_id_qr:
+            st.write(f"📊 Total QR: **{len(daftar_id_qr)}**")
             
-            if qr_files:
-                st.write(f"📊 Total QR: **{len(qr_files)}**")
-                
-                # Tampilkan dalam grid 4 kolom
-                cols = st.columns(4)
-                for i, qr_file in enumerate(qr_files):
-                    with cols[i % 4]:   # 4 kolom
-                        qr_path = f"{FOLDER_QR}/{qr_file}"
-                        st.image(qr_path, width=120)
-                        st.caption(qr_file.replace('.png', ''))
-                        
-                        with open(qr_path, "rb") as f:
-                            st.download_button("⬇️", f.read(), qr_file, "image/png", key=f"dl_{qr_file}")
-            else:
-                st.warning("Belum ada file QR")
+            # Satu ZIP untuk semua QR yang cocok, dibuat hanya saat diminta
+            zip_qr = st.session_state.get('zip_qr')
+            if zip_qr and zip_qr['filter'] != filter_qr:
+                zip_qr = None
+            if st.button("📦 Siapkan ZIP", use_container_width=True, key="btn_zip_qr"):
+                with st.spinner("Menyiapkan ZIP..."):
+                    path_zip, jumlah = buat_zip_qr(FILE_DOKUMEN, FOLDER_QR, *filter_qr)
+                zip_qr = {'filter': filter_qr, 'path': path_zip, 'jumlah': jumlah}
+                st.session_state['zip_qr'] = zip_qr
+            if zip_qr and zip_qr['path'] and os.path.exists(zip_qr['path']):
+                with open(zip_qr['path'], "rb") as f:
+                    st.download_button(f"⬇️ Download ZIP ({zip_qr['jumlah']} QR, {get_file_size(zip_qr['path'])})",
+                                       f, "qr_codes.zip", "application/zip",
+                                       use_container_width=True, key="dl_zip_qr")
+            
+            # Grid thumbnail per halaman (4 kolom)
+            per_halaman = 24
+            jumlah_halaman = (len(daftar_id_qr) - 1) // per_halaman + 1
+            halaman = st.number_input("Halaman", min_value=1, max_value=jumlah_halaman, value=1,
+                                      key="qr_halaman") if jumlah_halaman > 1 else 1
+            mulai = (int(halaman) - 1) * per_halaman
+            cols = st.columns(4)
+            for i, id_dokumen in enumerate(daftar_id_qr[mulai:mulai + per_halaman]):
+                with cols[i % 4]:   # 4 kolom
+                    thumbnail = thumbnail_qr(f"{FOLDER_QR}/{id_dokumen}.png")
+                    if thumbnail is None:
+                        continue
+                    st.image(thumbnail, width=120)
+                    st.caption(id_dokumen)
+            st.caption(f"Halaman {int(halaman)} dari {jumlah_halaman} — download satu QR lewat tab Lihat QR")
+        elif os.path.exists(FOLDER_QR):
+            st.warning("Belum ada file QR yang cocok dengan filter")
         else:
             st.warning("Folder QR belum ada")
 
+    # TAB 4: LEMBAR LABEL
+    with tab4:
+        st.subheader("🏷️ Cetak Lembar Label")
+        
+        # Pilihan kertas, grid dan format
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            kertas = st.selectbox("Kertas", list(UKURAN_KERTAS), key="label_kertas")
+        with col2:
+            kolom_label = st.number_input("Kolom", min_value=1, max_value=10, value=3, key="label_kolom")
+        with col3:
+            baris_label = st.number_input("Baris", min_value=1, max_value=20, value=8, key="label_baris")
+        with col4:
+            format_label = st.selectbox("Format", ["PDF", "PNG (ZIP)"], key="label_format")
+        
+        # Dokumen yang dicetak (misalnya satu rak: filter Lokasi)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            jenis_label = st.selectbox("Filter Jenis", ["Semua"] + JENIS_DOKUMEN, key="label_filter_jenis")
+        with col2:
+            status_label = st.selectbox("Filter Status", ["Semua"] + STATUS_DOKUMEN, key="label_filter_status")
+        with col3:
+            lokasi_label = st.selectbox("Filter Lokasi", ["Semua"] + LOKASI_LIST, key="label_filter_lokasi")
+        st.caption(f"{int(kolom_label) * int(baris_label)} label per halaman — tiap label berisi QR, ID, Judul dan Lokasi")
+        
+        if st.button("🏷️ Buat Lembar Label", type="primary", use_container_width=True, key="btn_label",
+                     disabled='job_label' in st.session_state):
+            ekstensi = "pdf" if format_label == "PDF" else "zip"
+            path_label = f"{FOLDER_EKSPOR_QR}/label_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ekstensi}"
+            st.session_state['job_label'] = antrekan_lembar_label(
+                FILE_DOKUMEN, path_label, kertas=kertas, kolom=int(kolom_label), baris=int(baris_label),
+                format_output="pdf" if format_label == "PDF" else "png",
+                jenis=jenis_label, status=status_label, lokasi=lokasi_label)
+        
+        # Pantau job lembar label yang sedang berjalan
+        job_id = st.session_state.get('job_label')
+        status_label_job = get_status_qr(job_id) if job_id else None
+        if status_label_job and status_label_job['jalan']:
+            pantau_job(job_id, "Menyusun halaman label")
+        elif job_id:
+            st.session_state.pop('job_label', None)
+            if status_label_job:
+                if status_label_job['error']:
+                    st.error(f"❌ {status_label_job['error']}")
+                elif status_label_job['path']:
+                    st.session_state['hasil_label'] = status_label_job
+                    tambah_log(FILE_LOG, "BATCH", "CETAK_LABEL", st.session_state.get('username', 'Admin'))
+                else:
+                    st.warning("Tidak ada dokumen yang cocok dengan filter")
+        
+        # Download hasil terakhir (file dibaca saat tombol dirender, tidak ditampung di session)
+        hasil_label = st.session_state.get('hasil_label')
+        if hasil_label and os.path.exists(hasil_label['path']):
+            st.success(f"✅ {hasil_label['label']} label dalam {hasil_label['total']} halaman")
+            nama_file = os.path.basename(hasil_label['path'])
+            with open(hasil_label['path'], "rb") as f:
+                st.download_button(f"⬇️ Download {nama_file} ({get_file_size(hasil_label['path'])})", f, nama_file,
+                                   "application/pdf" if nama_file.endswith(".pdf") else "application/zip",
+                                   use_container_width=True, key="dl_label")
+
 # HALAMAN LAPORAN
-def halaman_laporan():
+def halaman_laporan(ctx=None):
     """
     Halaman laporan dan grafik dengan ROLE-BASED ACCESS
     ----------------------------------------------------
@@ -955,35 +1267,68 @@ def halaman_laporan():
     if "Grafik" in allowed_tabs:
         tab_index = allowed_tabs.index("Grafik")
         with tabs[tab_index]:
-            df = get_semua_dokumen(FILE_DOKUMEN)
+            # Grafik yang datanya tidak berubah diambil dari cache tanpa memuat master;
+            # jumlah dokumen dari counter statistik, bukan len(DataFrame)
+            muat_dokumen = partial(get_semua_dokumen, FILE_DOKUMEN, ctx=ctx)
+            versi = versi_data(FILE_DOKUMEN)
             
-            if len(df) > 0:
+            if get_statistik(FILE_DOKUMEN, ctx=ctx)['total'] > 0:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    fig = buat_pie_chart(df, 'Jenis', 'Distribusi Jenis Dokumen')
+                    fig = buat_pie_chart(muat_dokumen, 'Jenis', 'Distribusi Jenis Dokumen', versi=versi)
                     if fig:
-                        st.plotly_chart(fig, use_container_width=True, theme=None)
+                        tampil_grafik(fig)
                 
                 with col2:
-                    fig = buat_bar_chart(df, 'Status', 'Dokumen per Status')
+                    fig = buat_bar_chart(muat_dokumen, 'Status', 'Dokumen per Status', versi=versi)
                     if fig:
-                        st.plotly_chart(fig, use_container_width=True, theme=None)
+                        tampil_grafik(fig)
                 
                 st.markdown("---")
                 
-                fig = buat_bar_chart(df, 'Lokasi_Fisik', 'Dokumen per Lokasi')
+                fig = buat_bar_chart(muat_dokumen, 'Lokasi_Fisik', 'Dokumen per Lokasi', versi=versi)
                 if fig:
-                    st.plotly_chart(fig, use_container_width=True, theme=None)
+                    tampil_grafik(fig)
                 
                 # Line chart aktivitas (hanya jika punya akses)
                 if access['dashboard_aktivitas']:
-                    df_log = get_semua_log(FILE_LOG)
-                    if len(df_log) > 0:
-                        st.markdown("---")
-                        fig = buat_line_chart(df_log, 'Aktivitas per Hari')
+                    st.markdown("---")
+                    # Grafik dibaca dari rollup per jam/hari, bukan dari log mentah
+                    col_rentang, col_grain, col_rincian = st.columns([2, 1, 1])
+                    with col_rentang:
+                        rentang_grafik = st.date_input(
+                            "Rentang aktivitas",
+                            value=(datetime.now().date() - timedelta(days=30), datetime.now().date()),
+                            key="rentang_grafik_log"
+                        )
+                    with col_grain:
+                        grain = st.selectbox("Satuan waktu", ["hari", "jam"],
+                                             format_func=lambda g: f"Per {g.capitalize()}", key="grain_grafik_log")
+                    with col_rincian:
+                        rincian = st.selectbox("Rincian", ["Total", "User", "Aksi"],
+                                               format_func=lambda r: r if r == "Total" else f"Per {r}",
+                                               key="rincian_grafik_log")
+                    
+                    # selama memilih, date_input baru berisi satu tanggal
+                    mulai = rentang_grafik[0] if len(rentang_grafik) > 0 else None
+                    sampai = rentang_grafik[-1] if len(rentang_grafik) > 0 else None
+                    per = None if rincian == "Total" else rincian
+                    df_rollup = get_rollup_log(FILE_LOG, mulai, sampai, grain=grain, per=per)
+                    if len(df_rollup) > 0:
+                        fig = buat_line_chart(df_rollup, f"Aktivitas per {grain.capitalize()}", per=per,
+                                              versi=(versi_data(FILE_LOG), str(mulai), str(sampai), grain))
                         if fig:
-                            st.plotly_chart(fig, use_container_width=True, theme=None)
+                            tampil_grafik(fig)
+                        
+                        # Tabel ringkasan rentang ini per User / Aksi
+                        if per:
+                            ringkasan = (df_rollup.groupby(per)['Jumlah'].sum()
+                                         .sort_values(ascending=False).reset_index())
+                            st.dataframe(ringkasan, use_container_width=True, hide_index=True)
+                        st.caption(f"📊 {int(df_rollup['Jumlah'].sum()):,} aktivitas dalam rentang ini")
+                    else:
+                        st.info("Belum ada aktivitas dalam rentang ini")
             else:
                 st.warning("Belum ada data dokumen")
     
@@ -991,11 +1336,20 @@ def halaman_laporan():
     if "Log Aktivitas" in allowed_tabs:
         tab_index = allowed_tabs.index("Log Aktivitas")
         with tabs[tab_index]:
-            df_log = get_semua_log(FILE_LOG)
+            # Rentang tanggal: hanya partisi log yang beririsan yang dibaca
+            rentang_log = st.date_input(
+                "Rentang tanggal",
+                value=(datetime.now().date() - timedelta(days=30), datetime.now().date()),
+                key="rentang_log"
+            )
+            # selama memilih, date_input baru berisi satu tanggal
+            mulai = rentang_log[0] if len(rentang_log) > 0 else None
+            sampai = rentang_log[-1] if len(rentang_log) > 0 else None
+            df_log = get_semua_log(FILE_LOG, mulai, sampai, ctx=ctx)
             
             if len(df_log) > 0:
                 st.dataframe(df_log, use_container_width=True, hide_index=True, height=400)
-                st.info(f"📊 Total: {len(df_log)} aktivitas")
+                st.info(f"📊 Total: {len(df_log)} dari {hitung_log(FILE_LOG, ctx=ctx)} aktivitas")
             else:
                 st.warning("Belum ada log aktivitas")
     
@@ -1029,7 +1383,7 @@ def halaman_laporan():
                     st.success("✅ Backup berhasil!")
 
 # HALAMAN PENGATURAN
-def halaman_pengaturan():
+def halaman_pengaturan(ctx=None):
     """
     Halaman pengaturan dengan ROLE-BASED ACCESS
     --------------------------------------------
@@ -1082,7 +1436,7 @@ def halaman_pengaturan():
             
             st.markdown("---")
             st.markdown("#### 📋 Daftar User")
-            df_users = load_data(FILE_USERS)
+            df_users = load_data(FILE_USERS, ctx=ctx)
             if len(df_users) > 0:
                 df_display = df_users.copy()
                 df_display['password'] = '********'
@@ -1103,6 +1457,71 @@ def halaman_pengaturan():
             with col3:
                 qr_count = len([f for f in os.listdir(FOLDER_QR) if f.endswith('.png')]) if os.path.exists(FOLDER_QR) else 0
                 st.metric("QR Files", f"{qr_count} files")
+            
+            # Statistik cache data bersama (semua sesi)
+            st.markdown("---")
+            st.markdown("#### ⚡ Cache Data")
+            cache = get_statistik_cache()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Hit / Miss", f"{cache['hit']} / {cache['miss']}", f"{cache['hit_rate']:.0%} hit rate")
+            with col2:
+                st.metric("Memori Cache", f"{cache['ukuran_mb']:.1f} / {cache['maks_mb']:.0f} MB")
+            with col3:
+                st.metric("Entry / Eviction", f"{cache['entry']} / {cache['eviction']}")
+            
+            # Statistik cache hasil pencarian + filter (Lihat Data)
+            st.markdown("#### 🔎 Cache Query")
+            cache_query = get_statistik_cache_query()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Hit / Miss", f"{cache_query['hit']} / {cache_query['miss']}",
+                          f"{cache_query['hit_rate']:.0%} hit rate")
+            with col2:
+                st.metric("Memori Cache", f"{cache_query['ukuran_mb']:.2f} / {cache_query['maks_mb']:.0f} MB")
+            with col3:
+                st.metric("Entry / Eviction", f"{cache_query['entry']} / {cache_query['eviction']}")
+            
+            # Statistik cache figure grafik (Dashboard & Laporan)
+            st.markdown("#### 📈 Cache Grafik")
+            cache_grafik = get_statistik_cache_grafik()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Hit / Miss", f"{cache_grafik['hit']} / {cache_grafik['miss']}",
+                          f"{cache_grafik['hit_rate']:.0%} hit rate")
+            with col2:
+                st.metric("Memori Cache", f"{cache_grafik['ukuran_mb']:.2f} / {cache_grafik['maks_mb']:.0f} MB")
+            with col3:
+                st.metric("Entry / Eviction", f"{cache_grafik['entry']} / {cache_grafik['eviction']}")
+            
+            # Statistik cache bytes QR (preview, Lihat QR, Download)
+            st.markdown("#### 📱 Cache QR")
+            cache_qr = get_statistik_cache_qr()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Hit / Miss", f"{cache_qr['hit']} / {cache_qr['miss']}",
+                          f"{cache_qr['hit_rate']:.0%} hit rate")
+            with col2:
+                st.metric("Memori Cache", f"{cache_qr['ukuran_mb']:.2f} / {cache_qr['maks_mb']:.0f} MB")
+            with col3:
+                st.metric("Entry / Eviction", f"{cache_qr['entry']} / {cache_qr['eviction']}")
+            
+            # Partisi arsip log aktivitas (per periode)
+            st.markdown("---")
+            st.markdown("#### 🗂️ Partisi Log")
+            df_partisi = get_info_partisi_log(FILE_LOG)
+            if len(df_partisi) > 0:
+                st.dataframe(df_partisi, use_container_width=True, hide_index=True)
+                if st.button("🗜️ Kompres Partisi Lama", use_container_width=True):
+                    dikompres = kompres_partisi_log(FILE_LOG)
+                    if dikompres:
+                        st.success(f"✅ {len(dikompres)} partisi dikompres: {', '.join(dikompres)}")
+                        time.sleep(1)
+                        st.rerun()
+                    else:
+                        st.info("Tidak ada partisi yang perlu dikompres")
+            else:
+                st.info("Belum ada partisi arsip, semua log masih di partisi aktif")
     
     # TAB: TENTANG (semua role)
     if "Tentang" in allowed_tabs:
@@ -1294,24 +1713,34 @@ def main():
                 st.session_state.pop('username', None)
                 st.session_state.pop('role', None)
                 st.rerun()
+            
+            # Diisi setelah halaman selesai dirender
+            info_konteks = st.empty()
+        
+        # Konteks data rerun ini: tiap file dimuat paling banyak sekali per render
+        ctx = KonteksData()
         
         # Routing/render halaman berdasarkan menu yang dipilih
         current_menu = st.session_state.get('current_menu', menu_options[0])
         
         if current_menu == "Lobby":
-            halaman_lobby()
+            halaman_lobby(ctx)
         elif current_menu == "Dashboard":
-            halaman_dashboard()
+            halaman_dashboard(ctx)
         elif current_menu == "Data Master":
-            halaman_data_master()
+            halaman_data_master(ctx)
         elif current_menu == "Scan QR":
             halaman_scan_qr()
         elif current_menu == "Kelola QR":
-            halaman_kelola_qr()
+            halaman_kelola_qr(ctx)
         elif current_menu == "Laporan":
-            halaman_laporan()
+            halaman_laporan(ctx)
         elif current_menu == "Pengaturan":
-            halaman_pengaturan()
+            halaman_pengaturan(ctx)
+        
+        ringkasan = ctx.ringkasan()
+        info_konteks.caption(f"⚡ {ringkasan['dimuat']} file dimuat, "
+                             f"{ringkasan['dihindari']} parse dihindari di render ini")
         
 # ENTRY POINT
 if __name__ == "__main__":
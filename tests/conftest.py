@@ -0,0 +1,5 @@
+# Agar `import utils` bisa dipakai dari folder tests/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
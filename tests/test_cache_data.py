@@ -0,0 +1,50 @@
+'''
+Test cache DataFrame bersama (muat_dengan_cache / load_data)
+'''
+import pandas as pd
+
+import utils
+
+
+def test_perubahan_pemanggil_tidak_mengubah_cache(tmp_path):
+    file_path = str(tmp_path / 'data.csv')
+    utils.save_data(file_path, pd.DataFrame({'ID': ['A', 'B'], 'Status': ['Aktif', 'Aktif']}))
+
+    df = utils.load_data(file_path)
+    df.loc[0, 'Status'] = 'Arsip'
+    df['Status'].values[1] = 'Arsip'
+
+    assert list(utils.load_data(file_path)['Status']) == ['Aktif', 'Aktif']
+
+
+def test_konteks_memberi_salinan(tmp_path):
+    file_path = str(tmp_path / 'data.csv')
+    utils.save_data(file_path, pd.DataFrame({'ID': ['A'], 'Status': ['Aktif']}))
+    ctx = utils.KonteksData()
+
+    df = ctx.muat(file_path)
+    df.loc[0, 'Status'] = 'Arsip'
+
+    assert ctx.muat(file_path).loc[0, 'Status'] == 'Aktif'
+    assert utils.load_data(file_path).loc[0, 'Status'] == 'Aktif'
+    assert ctx.ringkasan()['dimuat'] == 1
+
+
+def test_copy_on_write_tidak_diubah_global():
+    assert pd.get_option('mode.copy_on_write') is False
+
+
+def test_cache_lru_menjaga_total_ukuran():
+    cache = utils.CacheLRU()
+    batas_mb = 100 / (1024 * 1024)
+    for i in range(10):
+        cache.simpan(i, f"nilai {i}", 30, batas_mb)
+    cache.simpan(9, 'nilai baru', 40, batas_mb)      # ganti entry: ukuran lama dikurangi
+    assert list(cache.entry) == [7, 8, 9]
+    assert cache.ukuran == sum(ukuran for _, ukuran in cache.entry.values()) == 100
+    assert cache.stats['eviction'] == 7
+
+    assert not cache.simpan('besar', 'x', 101, batas_mb)
+    cache.hapus_jika(lambda kunci: kunci == 8)
+    assert cache.ambil(8) is None and cache.ambil(9) == 'nilai baru'
+    assert cache.statistik(batas_mb)['ukuran_mb'] * 1024 * 1024 == 70
@@ -0,0 +1,74 @@
+'''
+Test cache bytes PNG QR (render_qr_cache, baca_qr_png, _qr_dengan_cache)
+'''
+import os
+
+import pytest
+
+import utils
+
+
+@pytest.fixture(autouse=True)
+def cache_kosong(monkeypatch):
+    monkeypatch.setattr(utils, '_CACHE_QR', utils.CacheLRU())
+
+
+def stats():
+    hasil = utils.get_statistik_cache_qr()
+    return hasil['hit'], hasil['miss'], hasil['eviction']
+
+
+def test_kunci_isi_dan_parameter(monkeypatch):
+    png = utils.render_qr_cache('DOC001')
+    assert png == utils._render_qr_png('DOC001')
+    assert utils.render_qr_cache('DOC001') is png
+    assert stats() == (1, 1, 0)
+
+    # Isi lain atau parameter gaya lain -> entry lain
+    assert utils.render_qr_cache('DOC002') != png
+    besar = utils.render_qr_cache('DOC001', dict(utils.PARAMETER_QR, box_size=12))
+    assert besar != png and besar == utils._render_qr_png('DOC001', dict(utils.PARAMETER_QR, box_size=12))
+    assert stats() == (1, 3, 0)
+
+    # Parameter sama walau objek dictionary beda -> entry yang sama
+    assert utils.render_qr_cache('DOC001', dict(utils.PARAMETER_QR)) is png
+    assert utils.get_statistik_cache_qr()['hit_rate'] == 0.4
+
+
+def test_batas_ukuran_dan_eviction(monkeypatch):
+    satu = len(utils._render_qr_png('DOC001')) + utils._UKURAN_ENTRY_QR
+    monkeypatch.setattr(utils, 'CACHE_QR_MAKS_MB', 2.5 * satu / (1024 * 1024))
+    for i in range(1, 5):
+        utils.render_qr_cache(f"DOC00{i}")
+    statistik = utils.get_statistik_cache_qr()
+    assert statistik['entry'] == 2 and statistik['eviction'] == 2
+    assert statistik['ukuran_mb'] <= statistik['maks_mb']
+
+    # DOC001 sudah dibuang (LRU), DOC004 masih ada
+    utils.render_qr_cache('DOC004')
+    utils.render_qr_cache('DOC001')
+    assert stats() == (1, 5, 3)
+
+    # PNG lebih besar dari batas tetap dikembalikan tapi tidak disimpan
+    monkeypatch.setattr(utils, 'CACHE_QR_MAKS_MB', 10 / (1024 * 1024))
+    assert utils.render_qr_cache('DOC009') == utils._render_qr_png('DOC009')
+    assert utils.get_statistik_cache_qr()['entry'] == 2
+    utils.render_qr_cache('DOC009')
+    assert stats() == (1, 7, 3)
+
+
+def test_file_dibuat_ulang_dibaca_lagi(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = os.path.join('qr', 'DOC001.png')
+    utils.generate_qr_code('DOC001', path)
+    assert utils.baca_qr_png(path) == utils._render_qr_png('DOC001')
+    assert utils.baca_qr_png(path) == utils._render_qr_png('DOC001')
+    assert stats() == (1, 1, 0)
+
+    # qr/<ID>.png dibuat ulang dengan isi lain: tanda file berubah -> miss
+    utils.generate_qr_code('DOC001 versi baru', path)
+    assert utils.baca_qr_png(path) == utils._render_qr_png('DOC001 versi baru')
+    assert stats() == (1, 2, 0)
+
+    os.remove(path)
+    assert utils.baca_qr_png(path) is None
@@ -0,0 +1,93 @@
+'''
+Test cache hasil query Lihat Data (cari_query_faset, _simpan_cache_query)
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    # Cache query kosong per test agar hitungan hit/miss tidak tercampur
+    monkeypatch.setattr(utils, '_CACHE_QUERY', utils.CacheLRU())
+    monkeypatch.chdir(tmp_path)     # QR dari tambah_dokumen ditulis ke tmp_path/qr
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, pd.DataFrame({
+        'ID': [f"DOC{i:03d}" for i in range(1, 9)],
+        'Judul': ['Notulen Rapat', 'Surat Dinas', 'Memo Rapat', 'Memo Cuti'] * 2,
+        'Jenis': ['Notulen', 'Surat Masuk', 'Memo', 'Memo'] * 2,
+        'Lokasi_Fisik': ['Rak A', 'Rak B'] * 4,
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        'Keterangan': '',
+        'Status': ['Aktif', 'Arsip'] * 4,
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER))
+    return file_path
+
+
+def stats():
+    hasil = utils.get_statistik_cache_query()
+    return hasil['hit'], hasil['miss'], hasil['eviction']
+
+
+def test_query_ternormalisasi_sama_kena_cache(master):
+    df1, hitungan1 = utils.cari_query_faset(master, 'jenis:memo rapat', status='Aktif')
+    assert stats() == (0, 1, 0)
+
+    # Beda spasi, huruf besar nama field dan AND eksplisit -> kunci yang sama
+    df2, hitungan2 = utils.cari_query_faset(master, '  Jenis:memo   AND rapat ', status='Aktif')
+    assert stats() == (1, 1, 0)
+    assert utils.get_statistik_cache_query()['hit_rate'] == 0.5
+    pd.testing.assert_frame_equal(df1, df2)
+    assert hitungan1 == hitungan2
+
+    # Filter dropdown ikut kunci
+    utils.cari_query_faset(master, 'jenis:memo rapat', status='Arsip')
+    assert stats() == (1, 2, 0)
+    assert utils.get_statistik_cache_query()['entry'] == 2
+
+
+def test_hitungan_dari_cache_tidak_bisa_diubah_pemanggil(master):
+    _, hitungan = utils.cari_query_faset(master, 'memo')
+    hitungan['Jenis']['Memo'] = 999
+    _, hitungan = utils.cari_query_faset(master, 'memo')
+    assert hitungan['Jenis']['Memo'] == 4
+
+
+def test_penulisan_membuat_entry_basi(master):
+    utils.cari_query_faset(master, 'memo')
+    versi_lama = utils.versi_data(master)
+
+    utils.tambah_dokumen(master, {'judul': 'Memo Baru', 'jenis': 'Memo'})
+    assert utils.versi_data(master) != versi_lama
+
+    df, hitungan = utils.cari_query_faset(master, 'memo')
+    assert stats() == (0, 2, 0)
+    assert len(df) == 5 and hitungan['Jenis']['Memo'] == 5
+    assert utils.cari_query_faset(master, 'memo')[0]['ID'].tolist() == df['ID'].tolist()
+    assert stats() == (1, 2, 0)
+
+
+def test_eviction_di_batas_memori(master, monkeypatch):
+    # Batas cukup untuk dua entry kecil
+    monkeypatch.setattr(utils, 'CACHE_QUERY_MAKS_MB', 2.5 * utils._UKURAN_ENTRY_QUERY / (1024 * 1024))
+    for query in ['memo', 'rapat', 'surat']:
+        utils.cari_query_faset(master, query)
+    assert stats() == (0, 3, 1)
+    assert utils.get_statistik_cache_query()['entry'] == 2
+
+    # 'memo' (paling lama) sudah dibuang, 'surat' masih ada
+    utils.cari_query_faset(master, 'surat')
+    utils.cari_query_faset(master, 'memo')
+    assert stats() == (1, 4, 2)
+    assert utils.get_statistik_cache_query()['ukuran_mb'] <= utils.CACHE_QUERY_MAKS_MB
+
+
+def test_entry_lebih_besar_dari_batas_tidak_disimpan(master, monkeypatch):
+    monkeypatch.setattr(utils, 'CACHE_QUERY_MAKS_MB', 0.5 * utils._UKURAN_ENTRY_QUERY / (1024 * 1024))
+    utils.cari_query_faset(master, 'memo')
+    utils.cari_query_faset(master, 'memo')
+    assert stats() == (0, 2, 0)
+    assert utils.get_statistik_cache_query()['entry'] == 0
@@ -0,0 +1,90 @@
+'''
+Test pencarian dokumen lewat indeks teks (cari_dokumen, IndeksTeks)
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, pd.DataFrame({
+        'ID': ['DOC001', 'DOC002', 'DOC003', 'DOC004'],
+        'Judul': ['Notulen Rapat Direksi', 'Surat Tugas', 'Laporan Keuangan', 'Memo Internal'],
+        'Jenis': ['Notulen', 'Surat', 'Laporan', 'Memo'],
+        'Lokasi_Fisik': 'Rak A',
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        'Keterangan': ['', 'tugas ke rapat cabang', 'pembukuan', 'dibukukan ulang'],
+        'Status': 'Aktif',
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER))
+    return file_path
+
+
+def ids(df):
+    return list(df['ID'])
+
+
+def test_kecocokan_judul_di_atas_keterangan(master):
+    assert ids(utils.cari_dokumen(master, 'rapat')) == ['DOC001', 'DOC002']
+
+
+def test_semua_kata_harus_cocok_dan_prefix(master):
+    assert ids(utils.cari_dokumen(master, 'surat tug')) == ['DOC002']
+    assert utils.ambil_indeks(master, 'teks').cari('laporan memo') == []
+
+
+def test_stemming(master):
+    # 'dibukukan' dan 'pembukuan' sama-sama berakar 'buku'
+    assert set(ids(utils.cari_dokumen(master, 'pembukuan'))) == {'DOC003', 'DOC004'}
+
+
+def test_frasa_dalam_tanda_kutip(master):
+    assert ids(utils.cari_dokumen(master, '"rapat direksi"')) == ['DOC001']
+
+
+def test_indeks_mengikuti_update_dan_hapus(master):
+    utils.cari_dokumen(master, 'rapat')      # indeks dimuat
+    utils.update_dokumen(master, 'DOC004', {'Judul': 'Memo Rapat Kilat'})
+    utils.hapus_dokumen(master, 'DOC002')
+
+    assert ids(utils.cari_dokumen(master, 'rapat')) == ['DOC001', 'DOC004']
+    assert ids(utils.cari_dokumen(master, 'kilat')) == ['DOC004']
+
+
+def test_salah_ketik_tetap_ditemukan(master):
+    assert ids(utils.cari_dokumen(master, 'notulem rapat'))[0] == 'DOC001'
+    assert ids(utils.cari_dokumen(master, 'keuangn')) == ['DOC003']
+
+
+def test_delta_trigram_sama_dengan_bangun_ulang():
+    df = pd.DataFrame({'ID': [f"DOC{i:04d}" for i in range(3000)],
+                       'Judul': [f"Surat nomor {i} perihal rapat {i % 7}" for i in range(3000)],
+                       'Keterangan': ''})
+    indeks = utils.IndeksTrigram()
+    indeks.bangun(df.iloc[:10])
+    for i in range(10, len(df)):
+        indeks.tambah(df.iloc[i:i + 1])
+    indeks.ubah(5, {'Judul': 'Memo cuti tahunan'})
+    indeks.hapus(6)
+
+    baru = utils.IndeksTrigram()
+    baru.bangun(df.drop(index=6).assign(Judul=lambda d: d['Judul'].where(d.index != 5, 'Memo cuti tahunan')))
+    # Kapasitas digandakan, bukan disalin tiap insert
+    assert len(indeks.aktif) < 2 * len(indeks.ids)
+    for query in ('surat nomr 1234', 'memo cuti', 'perihal rapat 6'):
+        assert indeks.cari(query) == baru.cari(query)
+
+
+def test_ubah_keterangan_saat_indeks_dibangun_tanpa_keterangan():
+    # Indeks dibangun dari data tanpa kolom Keterangan; Keterangan yang
+    # diisi lewat delta ubah tetap bisa dicari
+    indeks = utils.IndeksTrigram()
+    indeks.bangun(pd.DataFrame({'ID': ['DOC001', 'DOC002'], 'Judul': ['Surat Tugas', 'Memo Internal']}))
+    assert indeks.ubah(1, {'Keterangan': 'pengadaan kendaraan dinas'})
+    assert [id_dokumen for id_dokumen, _ in indeks.cari('kendaraan dinas')] == ['DOC002']
+    assert [id_dokumen for id_dokumen, _ in indeks.cari('memo internal')] == ['DOC002']
@@ -0,0 +1,48 @@
+'''
+Test CRUD dokumen lewat hash index ID (get_dokumen_by_id, update, hapus)
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    # QR ditulis ke qr/<ID>.png relatif terhadap folder kerja
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'data' / 'master.csv')
+    utils.init_master_csv(file_path)
+    return file_path
+
+
+def tambah(file_path, judul):
+    return utils.tambah_dokumen(file_path, {'judul': judul, 'jenis': 'Memo', 'lokasi': 'Rak A'})
+
+
+def test_lookup_update_hapus_lewat_indeks(master):
+    ids = [tambah(master, f"Judul {i}") for i in range(5)]
+    assert utils.get_dokumen_by_id(master, ids[3])['Judul'] == 'Judul 3'
+
+    assert utils.update_dokumen(master, ids[3], {'Judul': 'Baru'})
+    assert utils.get_dokumen_by_id(master, ids[3])['Judul'] == 'Baru'
+
+    # Hapus baris tengah: posisi baris sesudahnya bergeser
+    assert utils.hapus_dokumen(master, ids[1])
+    assert utils.get_dokumen_by_id(master, ids[1]) is None
+    for i in (0, 2, 4):
+        assert utils.get_dokumen_by_id(master, ids[i])['ID'] == ids[i]
+
+    # Indeks hasil delta sama dengan indeks yang dibangun dari data
+    indeks = utils.ambil_indeks(master, 'id')
+    baru = utils.IndeksID()
+    baru.bangun(utils.load_data(master))
+    assert indeks.posisi == baru.posisi and indeks.ids == baru.ids
+
+
+def test_id_ganda_tidak_dihapus(master):
+    df = pd.DataFrame({'ID': ['DOC001', 'DOC001'], 'Judul': ['A', 'B']}, columns=utils.COLUMNS_MASTER)
+    utils.save_data(master, df)
+
+    assert utils.hapus_dokumen(master, 'DOC001') is False
+    assert len(utils.load_data(master)) == 2
@@ -0,0 +1,88 @@
+'''
+Test bitmap faset Jenis/Status/Lokasi (IndeksFaset, filter_dokumen)
+'''
+import pandas as pd
+
+import utils
+
+
+def data_dokumen(jumlah):
+    return pd.DataFrame({
+        'ID': [f"DOC{i:04d}" for i in range(jumlah)],
+        'Jenis': [['Memo', 'Surat', 'Laporan'][i % 3] for i in range(jumlah)],
+        'Status': [['Aktif', 'Arsip'][i % 2] for i in range(jumlah)],
+        'Lokasi_Fisik': [f"Rak {i % 5}" for i in range(jumlah)]
+    })
+
+
+def hitungan_asli(df):
+    return {kolom: {str(k): int(v) for k, v in df[kolom].value_counts().items()}
+            for kolom in utils.KOLOM_FASET}
+
+
+def test_delta_sama_dengan_bangun_ulang():
+    df = data_dokumen(2500)
+    faset = utils.IndeksFaset()
+    faset.bangun(df.iloc[:3])
+    for i in range(3, len(df)):
+        assert faset.tambah(df.iloc[i:i + 1])
+    assert faset.ubah(10, {'Status': 'Dihapus', 'Jenis': 'Memo'})
+    assert faset.hapus(0) and faset.hapus(faset.jumlah - 1)
+
+    df.loc[10, ['Status', 'Jenis']] = ['Dihapus', 'Memo']
+    df = df.iloc[1:-1].reset_index(drop=True)
+    for kolom in utils.KOLOM_FASET:
+        assert faset.hitung(kolom) == hitungan_asli(df)[kolom]
+        for nilai in df[kolom].unique():
+            assert (faset.ambil(kolom, nilai) == (df[kolom] == nilai).to_numpy()).all()
+    # Kapasitas digandakan, bukan disalin tiap insert
+    assert faset.kapasitas < 2 * faset.jumlah + 1024
+
+
+def test_hitung_dengan_mask():
+    df = data_dokumen(12)
+    faset = utils.IndeksFaset()
+    faset.bangun(df)
+    mask = faset.ambil('Status', 'Aktif')
+    assert faset.hitung('Jenis', mask) == hitungan_asli(df[df['Status'] == 'Aktif'])['Jenis']
+    assert not faset.ambil('Jenis', 'Tidak Ada').any()
+
+
+def test_hapus_meninggalkan_slot_mati_tanpa_geser_bitmap():
+    df = data_dokumen(20)
+    faset = utils.IndeksFaset()
+    faset.bangun(df)
+    bitmap_surat = faset.bitmap['Jenis']['Surat']
+    assert faset.hapus(3) and faset.hapus(0)
+    # Bitmap tidak digeser/disalin saat hapus, hanya bit slot mati dimatikan
+    assert faset.bitmap['Jenis']['Surat'] is bitmap_surat
+    assert faset.slot_terpakai == 20 and faset.jumlah == 18
+    assert faset.tambah(data_dokumen(2).assign(Jenis='Arsip Baru'))
+    assert faset.ubah(0, {'Jenis': 'Laporan'})
+
+    # Slot mati tidak ikut dihitung, posisi baris tetap sesuai data
+    df = pd.concat([df.drop(index=[0, 3]), data_dokumen(2).assign(Jenis='Arsip Baru')], ignore_index=True)
+    df.loc[0, 'Jenis'] = 'Laporan'
+    for kolom in utils.KOLOM_FASET:
+        assert faset.hitung(kolom) == hitungan_asli(df)[kolom]
+        for nilai in df[kolom].unique():
+            assert (faset.ambil(kolom, nilai) == (df[kolom] == nilai).to_numpy()).all()
+    mask = faset.ambil('Status', 'Aktif')
+    assert faset.hitung('Jenis', mask) == hitungan_asli(df[df['Status'] == 'Aktif'])['Jenis']
+
+
+def test_slot_mati_terlalu_banyak_memicu_bangun_ulang():
+    faset = utils.IndeksFaset()
+    faset.bangun(data_dokumen(3000))
+    jumlah_hapus = 0
+    while faset.hapus(0):
+        jumlah_hapus += 1
+    assert jumlah_hapus == 1001
+
+
+def test_filter_dokumen_lewat_faset(tmp_path):
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, data_dokumen(30).reindex(columns=utils.COLUMNS_MASTER))
+
+    assert list(utils.filter_dokumen(file_path, 'Jenis', 'Surat')['ID']) == [f"DOC{i:04d}" for i in range(1, 30, 3)]
+    assert len(utils.filter_dokumen(file_path, 'Status', 'Semua')) == 30
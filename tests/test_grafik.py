@@ -0,0 +1,56 @@
+'''
+Test cache figure Plotly (buat_pie_chart / buat_bar_chart / buat_line_chart)
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def df():
+    utils._CACHE_GRAFIK.kosongkan()
+    return pd.DataFrame({'Jenis': ['Memo', 'Surat', 'Memo'],
+                         'Waktu': ['2025-01-01 08:00:00', '2025-01-01 09:00:00', '2025-01-02 10:00:00']})
+
+
+def test_cache_hit_memberi_figure_baru(df):
+    pertama = utils.buat_bar_chart(df, 'Jenis', 'Per Jenis', versi=1)
+    pertama.update_layout(title_text='Diubah sesi lain')
+
+    kedua = utils.buat_bar_chart(df, 'Jenis', 'Per Jenis', versi=1)
+    assert utils.waktu_grafik_terakhir()['cache'] is True
+    assert kedua is not pertama
+    assert kedua.layout.title.text != 'Diubah sesi lain'
+
+    kedua.data[0].marker.color = 'red'
+    ketiga = utils.buat_bar_chart(df, 'Jenis', 'Per Jenis', versi=1)
+    assert ketiga.to_plotly_json() == utils._bangun_bar_chart(df, 'Jenis', 'Per Jenis').to_plotly_json()
+
+
+def test_versi_baru_dibangun_ulang(df):
+    utils.buat_pie_chart(df, 'Jenis', 'Pie', versi=1)
+    fig = utils.buat_pie_chart(df.iloc[:1], 'Jenis', 'Pie', versi=2)
+    assert utils.waktu_grafik_terakhir()['cache'] is False
+    assert list(fig.data[0].values) == [1]
+
+
+def test_grafik_kosong_ikut_di_cache(df):
+    assert utils.buat_line_chart(df.iloc[0:0], 'Aktivitas', versi=1) is None
+    assert utils.buat_line_chart(df.iloc[0:0], 'Aktivitas', versi=1) is None
+    assert utils.waktu_grafik_terakhir()['cache'] is True
+
+
+def test_pemuat_data_hanya_dipanggil_saat_cache_miss(df):
+    dipanggil = []
+
+    def muat():
+        dipanggil.append(1)
+        return df
+
+    pertama = utils.buat_pie_chart(muat, 'Jenis', 'Pie', versi=1)
+    kedua = utils.buat_pie_chart(muat, 'Jenis', 'Pie', versi=1)
+    utils.buat_bar_chart(muat, 'Jenis', 'Bar', versi=1)
+    assert len(dipanggil) == 2
+    assert kedua.to_plotly_json() == pertama.to_plotly_json()
+    assert list(pertama.data[0].values) == [2, 1]
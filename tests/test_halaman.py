@@ -0,0 +1,66 @@
+'''
+Test paginasi keyset Lihat Data (halaman_data) dan cache hasil query
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def df():
+    # DOC9 < DOC10 (ID diurutkan per panjang lalu teks)
+    return pd.DataFrame({
+        'ID': [f"DOC{i}" for i in range(1, 24)],
+        'Jenis': [['Memo', 'Laporan', 'Surat Masuk'][i % 3] for i in range(1, 24)]
+    }).sample(frac=1, random_state=1).reset_index(drop=True)
+
+
+def semua_halaman(df, **opsi):
+    hasil = []
+    halaman = utils.halaman_data(df, ukuran=5, **opsi)
+    while True:
+        hasil.append(list(halaman['data']['ID']))
+        if halaman['mulai'] + 5 >= halaman['total']:
+            return hasil
+        halaman = utils.halaman_data(df, ukuran=5, kursor=('setelah', halaman['kunci_akhir']), **opsi)
+
+
+def test_maju_sampai_akhir_urut_id(df):
+    halaman = semua_halaman(df)
+    assert halaman[0] == ['DOC1', 'DOC2', 'DOC3', 'DOC4', 'DOC5']
+    assert halaman[1][-1] == 'DOC10'
+    assert sum(halaman, []) == [f"DOC{i}" for i in range(1, 24)]
+
+
+def test_urut_kolom_turun(df):
+    ids = sum(semua_halaman(df, kolom_urut='Jenis', turun=True), [])
+    harapan = df.assign(n=df['ID'].str[3:].astype(int)).sort_values(['Jenis', 'n'], ascending=False)
+    assert ids == list(harapan['ID'])
+
+
+def test_mundur_dan_halaman_akhir(df):
+    akhir = utils.halaman_data(df, ukuran=5, kursor=('akhir',))
+    assert akhir['mulai'] == 20 and list(akhir['data']['ID']) == ['DOC21', 'DOC22', 'DOC23']
+
+    sebelum = utils.halaman_data(df, ukuran=5, kursor=('sebelum', akhir['kunci_awal']))
+    assert sebelum['mulai'] == 15 and list(sebelum['data']['ID']) == [f"DOC{i}" for i in range(16, 21)]
+
+
+def test_kursor_tetap_valid_setelah_baris_dihapus(df):
+    pertama = utils.halaman_data(df, ukuran=5)
+    df = df[df['ID'] != 'DOC3']
+    kedua = utils.halaman_data(df, ukuran=5, kursor=('setelah', pertama['kunci_akhir']))
+    assert list(kedua['data']['ID']) == [f"DOC{i}" for i in range(6, 11)]
+
+
+def test_urutan_hasil_query_di_cache(tmp_path, df):
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, df.reindex(columns=utils.COLUMNS_MASTER))
+    hasil, _, sumber = utils.cari_query_faset(file_path, 'jenis:memo', dengan_kunci=True)
+
+    pertama = utils.halaman_data(hasil, ukuran=3, sumber=sumber)
+    hit = utils.get_statistik_cache_query()['hit']
+    kedua = utils.halaman_data(hasil, ukuran=3, kursor=('setelah', pertama['kunci_akhir']), sumber=sumber)
+    assert utils.get_statistik_cache_query()['hit'] == hit + 1
+    assert list(pertama['data']['ID']) + list(kedua['data']['ID']) == [f"DOC{i}" for i in (3, 6, 9, 12, 15, 18)]
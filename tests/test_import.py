@@ -0,0 +1,108 @@
+'''
+Test import dokumen massal dari CSV / Excel (import_dokumen_massal)
+'''
+import time
+
+import pytest
+from openpyxl import Workbook
+
+import utils
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    utils.init_master_csv('data/master.csv')
+    utils.init_log_csv('data/log.csv')
+    return tmp_path
+
+
+def tunggu_qr(job_id, batas=60):
+    mulai = time.time()
+    while time.time() - mulai < batas:
+        status = utils.get_status_qr(job_id)
+        if not status['jalan']:
+            return status
+        time.sleep(0.1)
+    raise AssertionError("antrean QR tidak selesai")
+
+
+def test_import_csv_per_chunk(folder):
+    path = folder / 'import.csv'
+    path.write_text(
+        "judul,jenis,lokasi,status\n"
+        "Surat A,surat masuk,Rak A - Lantai 1,\n"
+        ",Laporan,Rak A - Lantai 1,Aktif\n"
+        "Laporan B,Laporan,Gudang Z,Aktif\n"
+        "Laporan C,LAPORAN,rak b - lantai 1,arsip\n", encoding='utf-8')
+    dibaca = []
+
+    hasil = utils.import_dokumen_massal('data/master.csv', 'data/log.csv', str(path),
+                                        ukuran_chunk=2, progress=dibaca.append)
+
+    assert dibaca == [2, 4]
+    assert hasil['berhasil'] == 2 and hasil['id'] == ['DOC001', 'DOC002']
+    assert hasil['error'][['Baris', 'Alasan']].values.tolist() == [
+        [3, 'Judul kosong'], [4, 'Lokasi_Fisik tidak dikenal']]
+    df = utils.load_data('data/master.csv')
+    assert df[['Jenis', 'Lokasi_Fisik', 'Status']].values.tolist() == [
+        ['Surat Masuk', 'Rak A - Lantai 1', 'Aktif'], ['Laporan', 'Rak B - Lantai 1', 'Arsip']]
+    # Satu log ringkasan untuk seluruh import
+    assert utils.load_data('data/log.csv')['ID_Dokumen'].tolist() == ['DOC001..DOC002']
+
+    status = tunggu_qr(hasil['job_qr'])
+    assert (status['selesai'], status['gagal']) == (2, 0)
+    assert utils.rencana_qr_batch('data/master.csv', 'qr')['perlu'] == []
+
+
+def test_import_excel(folder):
+    wb = Workbook()
+    wb.active.append(['Judul', 'Jenis', 'Lokasi', 'Keterangan'])
+    wb.active.append(['Memo A', 'Memo', 'Rak A - Lantai 1', 'catatan'])
+    wb.active.append([None, None, None, None])
+    wb.active.append(['Memo B', 'Memo', 'Rak A - Lantai 1'])
+    wb.save(folder / 'import.xlsx')
+
+    hasil = utils.import_dokumen_massal('data/master.csv', 'data/log.csv', str(folder / 'import.xlsx'))
+
+    assert hasil['berhasil'] == 2 and len(hasil['error']) == 0
+    assert utils.load_data('data/master.csv')['Judul'].tolist() == ['Memo A', 'Memo B']
+    tunggu_qr(hasil['job_qr'])
+
+
+def test_nomor_baris_error_sesuai_file(folder):
+    wb = Workbook()
+    wb.active.append(['Judul', 'Jenis', 'Lokasi'])
+    wb.active.append(['Memo A', 'Memo', 'Rak A - Lantai 1'])      # baris 2
+    wb.active.append([None, None, None])                            # baris 3 kosong
+    wb.active.append([None, None, None])                            # baris 4 kosong
+    wb.active.append(['Memo B', 'Bukan Jenis', 'Rak A - Lantai 1'])  # baris 5
+    wb.active.append(['', 'Memo', 'Rak A - Lantai 1'])              # baris 6
+    wb.save(folder / 'import.xlsx')
+    (folder / 'import.csv').write_text(
+        "judul;jenis;lokasi\n"
+        "\n"
+        "Memo A;Memo;Rak A - Lantai 1\n"
+        ";;\n"
+        "Memo B;Bukan Jenis;Rak A - Lantai 1\n", encoding='utf-8')
+
+    for nama, harapan in [('import.xlsx', [[5, 'Jenis tidak dikenal'], [6, 'Judul kosong']]),
+                          ('import.csv', [[5, 'Jenis tidak dikenal']])]:
+        hasil = utils.import_dokumen_massal('data/master.csv', 'data/log.csv', str(folder / nama), ukuran_chunk=2)
+        assert hasil['berhasil'] == 1
+        assert hasil['error'][['Baris', 'Alasan']].values.tolist() == harapan
+        tunggu_qr(hasil['job_qr'])
+
+
+def test_log_gagal_tidak_membatalkan_import(folder, monkeypatch):
+    (folder / 'import.csv').write_text("judul,jenis,lokasi\nMemo A,Memo,Rak A - Lantai 1\n", encoding='utf-8')
+
+    def disk_penuh(*args, **kwargs):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(utils, 'tambah_log', disk_penuh)
+    hasil = utils.import_dokumen_massal('data/master.csv', 'data/log.csv', str(folder / 'import.csv'))
+
+    assert hasil['berhasil'] == 1 and hasil['log'] is False
+    assert utils.load_data('data/master.csv')['Judul'].tolist() == ['Memo A']
+    tunggu_qr(hasil['job_qr'])
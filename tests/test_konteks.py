@@ -0,0 +1,83 @@
+'''
+Test konteks data per rerun (KonteksData, argumen ctx di fungsi akses data)
+'''
+import os
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    # Cache proses dan indeks kosong: semua pembacaan harus lewat storage engine
+    monkeypatch.setattr(utils, '_CACHE_DATA', utils.CacheLRU())
+    monkeypatch.setattr(utils, '_INDEKS_AKTIF', {})
+    master = str(tmp_path / 'master.csv')
+    log = str(tmp_path / 'log.csv')
+    utils.save_data(master, pd.DataFrame({
+        'ID': [f"DOC{i:03d}" for i in range(1, 11)],
+        'Judul': [f"Judul {i}" for i in range(1, 11)],
+        'Jenis': ['Memo', 'Surat Masuk'] * 5,
+        'Lokasi_Fisik': 'Rak A',
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        'Keterangan': '',
+        'Status': 'Aktif',
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER))
+    utils.init_log_csv(log)
+    utils.tambah_log(log, 'DOC001', 'CREATE')
+    monkeypatch.setattr(utils, '_CACHE_DATA', utils.CacheLRU())
+
+    # Hitung berapa kali tiap file benar-benar di-parse
+    dibaca = Counter()
+    storage = utils.get_storage()
+    load_asli = storage.load
+
+    def load(file_path, kolom=None):
+        dibaca[os.path.basename(file_path)] += 1
+        return load_asli(file_path, kolom=kolom)
+
+    monkeypatch.setattr(storage, 'load', load)
+    return master, log, dibaca
+
+
+def test_satu_file_diparse_sekali_per_konteks(data):
+    master, log, dibaca = data
+    ctx = utils.KonteksData()
+
+    df = utils.get_semua_dokumen(master, ctx=ctx)
+    stats = utils.get_statistik(master, ctx=ctx)            # indeks dibangun dari data ctx
+    terbaru = utils.get_dokumen_terbaru(master, 3, ctx=ctx)
+    assert utils.hitung_log(log, ctx=ctx) == 1
+    assert utils.hitung_log(log, ctx=ctx) == 1
+    assert len(utils.get_semua_dokumen(master, ctx=ctx)) == 10
+
+    assert dibaca == {'master.csv': 1, 'log.csv': 1}
+    assert ctx.ringkasan() == {'dimuat': 2, 'dihindari': 4, 'file': 2}
+    assert stats['total'] == len(df) == 10 and stats['per_jenis'] == {'Memo': 5, 'Surat Masuk': 5}
+    assert terbaru['ID'].tolist() == ['DOC010', 'DOC009', 'DOC008']
+
+
+def test_penulisan_memuat_ulang_file_itu_saja(data):
+    master, log, dibaca = data
+    ctx = utils.KonteksData()
+    utils.get_semua_dokumen(master, ctx=ctx)
+    utils.hitung_log(log, ctx=ctx)
+
+    utils.tambah_log(log, 'DOC002', 'UPDATE')
+    assert utils.hitung_log(log, ctx=ctx) == 2
+    assert utils.get_dokumen_terbaru(master, 1, ctx=ctx)['ID'].tolist() == ['DOC010']
+    assert dibaca['master.csv'] == 1
+    assert ctx.ringkasan()['dihindari'] == 1
+
+
+def test_tanpa_data_di_konteks_dibaca_dari_ekor_file(data):
+    master, _, dibaca = data
+    ctx = utils.KonteksData()
+    assert utils.get_dokumen_terbaru(master, 2, ctx=ctx)['ID'].tolist() == ['DOC010', 'DOC009']
+    assert ctx.ringkasan() == {'dimuat': 0, 'dihindari': 0, 'file': 0}
+    assert not dibaca
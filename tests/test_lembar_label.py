@@ -0,0 +1,69 @@
+'''
+Test lembar label QR (buat_lembar_label)
+'''
+import os
+import re
+import zlib
+
+import pandas as pd
+import pytest
+
+import utils
+
+
+def buat_master(folder, jumlah, judul):
+    # Tulis master.csv berisi `jumlah` dokumen dengan Judul dari fungsi judul(i)
+    file_path = os.path.join(folder, 'master.csv')
+    df = pd.DataFrame({
+        'ID': [f"DOC{i:03d}" for i in range(jumlah)],
+        'Judul': [judul(i) for i in range(jumlah)],
+        'Jenis': 'Memo',
+        'Lokasi_Fisik': 'Rak A\nLantai 1',
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        'Keterangan': '',
+        'Status': 'Aktif',
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER)
+    utils.save_data(file_path, df)
+    return file_path
+
+
+def test_judul_multi_baris_tidak_menggagalkan_label(tmp_path):
+    # Satu Judul berisi baris baru di antara dokumen lain
+    file_path = buat_master(str(tmp_path), 30,
+                            lambda i: "Baris satu\nbaris dua\r\nbaris tiga" if i == 7 else f"Judul {i}")
+    output_path = str(tmp_path / 'label.pdf')
+
+    label, halaman = utils.buat_lembar_label(file_path, output_path, kolom=3, baris=8, workers=1)
+
+    assert (label, halaman) == (30, 2)
+    isi = open(output_path, 'rb').read()
+    assert isi.startswith(b'%PDF-') and isi.rstrip().endswith(b'%%EOF')
+    assert isi.count(b'/Type /Page ') == 2
+
+
+def test_pdf_xref_dan_gambar_halaman_valid(tmp_path):
+    file_path = buat_master(str(tmp_path), 5, lambda i: f"Judul {i}")
+    output_path = str(tmp_path / 'label.pdf')
+    utils.buat_lembar_label(file_path, output_path, kertas='A5', kolom=2, baris=4, dpi=100, workers=1)
+    isi = open(output_path, 'rb').read()
+
+    # Tiap entri xref menunjuk tepat ke awal objeknya
+    xref = int(re.search(rb'startxref\n(\d+)', isi).group(1))
+    baris_xref = isi[xref:].split(b'\n')
+    jumlah = int(baris_xref[1].split()[1])
+    for nomor in range(1, jumlah):
+        offset = int(baris_xref[2 + nomor][:10])
+        assert isi[offset:].startswith(f"{nomor} 0 obj".encode())
+
+    # Gambar halaman = piksel abu-abu selebar x setinggi kertas
+    m = re.search(rb'/Width (\d+) /Height (\d+).*?/Length (\d+) >>\nstream\n', isi)
+    lebar, tinggi, panjang = map(int, m.groups())
+    assert len(zlib.decompress(isi[m.end():m.end() + panjang])) == lebar * tinggi
+
+
+def test_label_terlalu_kecil(tmp_path):
+    file_path = buat_master(str(tmp_path), 1, lambda i: "Judul")
+    with pytest.raises(ValueError):
+        utils.buat_lembar_label(file_path, str(tmp_path / 'label.pdf'), kolom=20, baris=30)
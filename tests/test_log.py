@@ -0,0 +1,42 @@
+'''
+Test log aktivitas append-only (tambah_log)
+'''
+import threading
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def log(tmp_path):
+    file_path = str(tmp_path / 'log.csv')
+    utils.init_log_csv(file_path)
+    return file_path
+
+
+def test_tambah_log_hanya_menambah_di_akhir(log):
+    utils.tambah_log(log, 'DOC001', 'CREATE')
+    isi_lama = open(log, 'rb').read()
+    utils.tambah_log(log, ' DOC002 ', 'UPDATE', 'staff')
+
+    isi_baru = open(log, 'rb').read()
+    assert isi_baru.startswith(isi_lama) and len(isi_baru) > len(isi_lama)
+    df = utils.load_data(log)
+    assert list(df['ID_Log']) == [1, 2]
+    assert df.iloc[-1][['ID_Dokumen', 'Aksi', 'User']].tolist() == ['DOC002', 'UPDATE', 'staff']
+
+
+def test_tambah_log_bersamaan(log):
+    def catat(i):
+        for j in range(10):
+            utils.tambah_log(log, f"DOC{i}", f"AKSI{j}")
+
+    threads = [threading.Thread(target=catat, args=(i,)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    df = utils.load_data(log)
+    assert list(df['ID_Log']) == list(range(1, 51))
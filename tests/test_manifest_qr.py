@@ -0,0 +1,42 @@
+'''
+Test generate QR inkremental dengan manifest (rencana_qr_batch)
+'''
+import os
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'data' / 'master.csv')
+    utils.init_master_csv(file_path)
+    return file_path
+
+
+def test_qr_dari_tambah_dokumen_tidak_dibuat_ulang(master):
+    ids = [utils.tambah_dokumen(master, {'judul': f"Judul {i}"}) for i in range(3)]
+
+    rencana = utils.rencana_qr_batch(master, 'qr')
+    assert rencana['perlu'] == [] and rencana['terbaru'] == 3
+    assert sorted(utils.baca_manifest_qr('qr')['qr']) == ids
+
+
+def test_generate_satu_qr_dicatat(master):
+    id_dokumen = utils.tambah_dokumen(master, {'judul': 'Judul'})
+    os.remove(f"qr/{id_dokumen}.png")
+    assert utils.rencana_qr_batch(master, 'qr')['alasan']['hilang'] == 1
+
+    utils.generate_qr_code(id_dokumen, f"qr/{id_dokumen}.png", id_dokumen=id_dokumen)
+    assert utils.rencana_qr_batch(master, 'qr')['perlu'] == []
+    assert utils.generate_qr_batch(master, 'qr', workers=1) == []
+
+
+def test_hapus_dokumen_membuang_entri_manifest(master):
+    ids = [utils.tambah_dokumen(master, {'judul': f"Judul {i}"}) for i in range(2)]
+    assert utils.hapus_dokumen(master, ids[0])
+
+    assert list(utils.baca_manifest_qr('qr')['qr']) == [ids[1]]
+    assert utils.rencana_qr_batch(master, 'qr')['usang'] == []
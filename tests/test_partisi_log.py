@@ -0,0 +1,88 @@
+'''
+Test partisi log per periode (rotasi_log, kompres_partisi_log, get_semua_log)
+'''
+import os
+
+import pandas as pd
+import pytest
+
+import utils
+
+
+def baris_log(mulai_id, waktu):
+    return pd.DataFrame({
+        'ID_Log': range(mulai_id, mulai_id + len(waktu)),
+        'Waktu': waktu,
+        'ID_Dokumen': 'DOC001',
+        'Aksi': 'Tambah',
+        'User': 'Admin'
+    }, columns=utils.COLUMNS_LOG)
+
+
+def paksa_rotasi(file_path):
+    # Anggap periode aktif sudah berganti sejak rotasi terakhir
+    manifest = dict(utils.baca_manifest_log(file_path), aktif='2000-01')
+    utils._tulis_manifest_log(file_path, manifest)
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'LOG_PARTISI', 'bulanan')
+    file_path = str(tmp_path / 'log.csv')
+    sekarang = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+    utils.save_data(file_path, baris_log(1, ['2024-01-05 08:00:00', '2024-01-20 09:00:00',
+                                             '2024-02-03 10:00:00', sekarang]))
+    return file_path
+
+
+def test_rotasi_dan_rentang(log):
+    assert utils.rotasi_log(log) == 3
+    assert utils.rotasi_log(log) == 0
+    assert len(utils.load_data(log)) == 1
+    assert utils.hitung_log(log) == 4
+
+    # Hanya partisi yang beririsan dengan rentang yang dibaca
+    assert [os.path.basename(p) for p in utils.daftar_partisi_log(log, '2024-02-01 00:00:00',
+                                                                   '2024-02-28 23:59:59')] == ['2024-02.csv']
+    df = utils.get_semua_log(log, mulai='2024-01-01', sampai='2024-01-31')
+    assert list(df['ID_Log']) == [1, 2]
+
+
+def test_append_ke_partisi_kompres(log):
+    utils.rotasi_log(log)
+    assert utils.kompres_partisi_log(log, sisakan=1) == ['2024-01']
+
+    with utils.kunci_file(log):
+        utils.append_csv(log, baris_log(5, ['2024-01-31 23:00:00']))
+    paksa_rotasi(log)
+    assert utils.rotasi_log(log) == 1
+
+    info = utils.baca_manifest_log(log)['partisi']['2024-01']
+    assert info['baris'] == 3 and info['id_maks'] == 5
+    df = utils.get_semua_log(log, mulai='2024-01-01', sampai='2024-01-31')
+    assert list(df['ID_Log']) == [1, 2, 5]
+
+
+def test_gagal_menulis_partisi_kompres_tidak_merusak_arsip(log, monkeypatch):
+    utils.rotasi_log(log)
+    utils.kompres_partisi_log(log, sisakan=1)
+    folder = utils.folder_partisi_log(log)
+    isi_lama = open(os.path.join(folder, '2024-01.csv.gz'), 'rb').read()
+
+    with utils.kunci_file(log):
+        utils.append_csv(log, baris_log(5, ['2024-01-31 23:00:00']))
+    paksa_rotasi(log)
+
+    def disk_penuh(self, path, *args, **kwargs):
+        with open(path, 'wb') as f:
+            f.write(b'sebagian')
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', disk_penuh)
+    assert utils.rotasi_log(log) == 0
+    monkeypatch.undo()
+
+    assert open(os.path.join(folder, '2024-01.csv.gz'), 'rb').read() == isi_lama
+    assert not [nama for nama in os.listdir(folder) if nama.endswith('.tmp')]
+    assert utils.baca_manifest_log(log)['partisi']['2024-01']['baris'] == 2
+    assert len(utils.load_data(log)) == 2     # baris tetap di partisi aktif
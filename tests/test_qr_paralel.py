@@ -0,0 +1,55 @@
+'''
+Test generate QR batch paralel (generate_qr_paralel) dibanding jalur serial
+'''
+import os
+
+import utils
+
+
+def baca(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_paralel_identik_dengan_serial(tmp_path, capsys):
+    ids = [f"DOC{i:03d}" for i in range(1, 13)] + ['DOC-panjang-' + 'x' * 80]
+    for id_dokumen in ids:
+        utils.generate_qr_code(id_dokumen, str(tmp_path / 'serial' / f"{id_dokumen}.png"))
+
+    laporan = []
+    hasil = utils.generate_qr_paralel(ids, [str(tmp_path / 'paralel' / f"{i}.png") for i in ids],
+                                      workers=2, ukuran_chunk=4,
+                                      progress=lambda selesai, total: laporan.append((selesai, total)))
+
+    assert hasil == [None] * len(ids)
+    assert 'lanjut serial' not in capsys.readouterr().out     # benar-benar lewat proses worker
+    for id_dokumen in ids:
+        assert baca(tmp_path / 'paralel' / f"{id_dokumen}.png") == baca(tmp_path / 'serial' / f"{id_dokumen}.png")
+    # Satu laporan per chunk, terakhir = semua selesai
+    assert len(laporan) == 4 and laporan[-1] == (len(ids), len(ids))
+
+
+def test_worker_gagal_lanjut_serial(tmp_path, monkeypatch, capsys):
+    def pool_gagal(*args, **kwargs):
+        raise OSError('spawn tidak didukung')
+
+    monkeypatch.setattr(utils, 'ProcessPoolExecutor', pool_gagal)
+    ids = [f"DOC{i:03d}" for i in range(1, 6)]
+    hasil = utils.generate_qr_paralel(ids, [str(tmp_path / 'qr' / f"{i}.png") for i in ids],
+                                      workers=4, ukuran_chunk=2, dengan_sidik=True)
+
+    assert [error for error, _ in hasil] == [None] * len(ids)
+    assert 'lanjut serial' in capsys.readouterr().out
+    for id_dokumen, (_, sidik) in zip(ids, hasil):
+        png = utils._render_qr_png(id_dokumen)
+        assert baca(tmp_path / 'qr' / f"{id_dokumen}.png") == png
+        assert sidik['ukuran'] == len(png)
+
+
+def test_error_per_item(tmp_path):
+    # Folder output berupa file: hanya item itu yang gagal
+    (tmp_path / 'bukan_folder').write_text('')
+    hasil = utils.generate_qr_paralel(['A', 'B'], [str(tmp_path / 'A.png'),
+                                                    str(tmp_path / 'bukan_folder' / 'B.png')], workers=1)
+    assert hasil[0] is None and hasil[1]
+    assert os.path.exists(tmp_path / 'A.png')
@@ -0,0 +1,71 @@
+'''
+Test bahasa query kotak pencarian Lihat Data (parse_query, cari_query)
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path):
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, pd.DataFrame({
+        'ID': ['DOC001', 'DOC002', 'DOC003', 'DOC004'],
+        'Judul': ['Notulen Rapat', 'Surat Masuk Dinas', 'Memo Rapat', 'Memo Cuti'],
+        'Jenis': ['Notulen', 'Surat Masuk', 'Memo', 'Memo'],
+        'Lokasi_Fisik': ['Rak A', 'Rak B', 'Rak A', 'Lemari 1'],
+        'Tanggal_Upload': ['2024-12-31 10:00:00', '2025-01-15 09:00:00',
+                           '2025-02-01 00:00:00', '2025-03-31 23:59:59'],
+        'Keterangan': '',
+        'Status': ['Aktif', 'Arsip', 'Aktif', 'Arsip'],
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER))
+    return file_path
+
+
+def ids(df):
+    return sorted(df['ID'])
+
+
+def test_pohon_query():
+    assert utils.parse_query('jenis:memo (Status:aktif OR status:arsip) -tanggal:2024 rapat') == (
+        'dan', [('kolom', 'Jenis', 'memo'),
+                ('atau', [('kolom', 'Status', 'aktif'), ('kolom', 'Status', 'arsip')]),
+                ('bukan', ('kolom', 'Tanggal_Upload', '2024')),
+                ('teks', 'rapat', False)])
+    assert utils.parse_query('jenis:"surat masuk" jam:10') == (
+        'dan', [('kolom', 'Jenis', 'surat masuk'), ('teks', 'jam:10', False)])
+    assert utils.parse_query('   ') is None
+
+
+@pytest.mark.parametrize('query', ['rapat AND', '(rapat', 'rapat)', 'NOT'])
+def test_sintaks_salah(query):
+    with pytest.raises(ValueError):
+        utils.parse_query(query)
+
+
+@pytest.mark.parametrize('query, hasil', [
+    ('jenis:memo', ['DOC003', 'DOC004']),
+    ('jenis:memo status:aktif', ['DOC003']),
+    ('jenis:memo OR lokasi:"rak b"', ['DOC002', 'DOC003', 'DOC004']),
+    ('NOT status:aktif', ['DOC002', 'DOC004']),
+    ('tanggal:2025-01', ['DOC002']),
+    ('tanggal:2025-01-15..2025-02-01', ['DOC002', 'DOC003']),
+    ('tanggal:>=2025-02', ['DOC003', 'DOC004']),
+    ('tanggal:<2025', ['DOC001']),
+    ('tanggal:>2025-02', ['DOC004']),
+    ('rapat -jenis:notulen', ['DOC003']),
+    ('"surat masuk"', ['DOC002']),
+])
+def test_hasil_query(master, query, hasil):
+    assert ids(utils.cari_query(master, query)) == hasil
+
+
+def test_query_dengan_filter_dropdown_dan_hitungan(master):
+    df, hitungan = utils.cari_query_faset(master, 'rak', status='Aktif')
+    assert ids(df) == ['DOC001', 'DOC003']
+    # Hitungan Status tidak ikut difilter oleh dropdown Status sendiri
+    assert hitungan['Status'] == {'Aktif': 2, 'Arsip': 1}
+    assert hitungan['Jenis'] == {'Notulen': 1, 'Memo': 1}
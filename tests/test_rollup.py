@@ -0,0 +1,64 @@
+'''
+Test rollup aktivitas log (get_rollup_log) dibanding hitungan dari log mentah
+'''
+import os
+
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def log(tmp_path):
+    file_path = str(tmp_path / 'log.csv')
+    utils.init_log_csv(file_path)
+    baris = []
+    for i in range(60):
+        baris.append({
+            'ID_Log': i + 1,
+            'ID_Dokumen': f"DOC{i % 7:03d}",
+            'Aksi': ['CREATE', 'UPDATE', 'DELETE'][i % 3],
+            'Waktu': f"2024-01-{1 + i // 10:02d} {i % 24:02d}:15:00",
+            'User': ['Admin', 'staff'][i % 2]
+        })
+    utils.get_storage().append(file_path, pd.DataFrame(baris))
+    yield file_path
+    utils._ROLLUP_AKTIF.pop(os.path.abspath(file_path), None)
+
+
+def _hitung_mentah(file_path, grain, per=None, mulai=None, sampai=None):
+    df = utils.load_data(file_path)
+    if mulai is not None:
+        df = df[df['Waktu'] >= mulai]
+    if sampai is not None:
+        df = df[df['Waktu'] <= sampai + ' 23:59:59']
+    df = df.assign(Periode=df['Waktu'].str[:utils.GRAIN_ROLLUP[grain]])
+    kolom = ['Periode'] + ([per] if per else [])
+    return df.groupby(kolom, sort=True).size().reset_index(name='Jumlah')
+
+
+@pytest.mark.parametrize('grain', ['jam', 'hari'])
+@pytest.mark.parametrize('per', [None, 'User', 'Aksi'])
+def test_rollup_sama_dengan_log_mentah(log, grain, per):
+    hasil = utils.get_rollup_log(log, grain=grain, per=per)
+    harapan = _hitung_mentah(log, grain, per)
+    pd.testing.assert_frame_equal(hasil.reset_index(drop=True), harapan, check_dtype=False)
+
+
+def test_rollup_rentang_tanggal(log):
+    hasil = utils.get_rollup_log(log, mulai='2024-01-02', sampai='2024-01-04')
+    assert list(hasil['Periode']) == ['2024-01-02', '2024-01-03', '2024-01-04']
+    assert list(hasil['Jumlah']) == [10, 10, 10]
+
+
+def test_rollup_ikut_tambah_log_dan_muat_ulang(log):
+    awal = utils.get_rollup_log(log)['Jumlah'].sum()
+    utils.tambah_log(log, 'DOC999', 'CREATE', 'staff')
+    assert utils.get_rollup_log(log)['Jumlah'].sum() == awal + 1
+
+    # Rollup dibuang dari memori: dimuat dari file rollup lalu dikejar ke log terbaru
+    utils._ROLLUP_AKTIF.pop(os.path.abspath(log), None)
+    pd.testing.assert_frame_equal(
+        utils.get_rollup_log(log, per='Aksi').reset_index(drop=True),
+        _hitung_mentah(log, 'hari', 'Aksi'), check_dtype=False)
@@ -0,0 +1,99 @@
+'''
+Test alokasi ID dari sequence persisten (alokasi_id_dokumen, alokasi_sequence)
+'''
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+import utils
+
+
+def test_seed_dari_id_yang_sudah_ada(tmp_path):
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, pd.DataFrame({'ID': ['DOC001', 'DOC007', 'LAIN99']}, columns=utils.COLUMNS_MASTER))
+
+    assert utils.intip_id_dokumen(file_path) == 'DOC008'
+    assert utils.alokasi_id_dokumen(file_path, jumlah=3) == ['DOC008', 'DOC009', 'DOC010']
+    assert utils.alokasi_id_dokumen(file_path) == ['DOC011']
+
+
+def test_format_per_tahun_dan_cabang(tmp_path):
+    file_path = str(tmp_path / 'master.csv')
+    utils.init_master_csv(file_path)
+
+    format_id = '{cabang}/DOC-{tahun}-{nomor:04d}'
+    assert utils.alokasi_id_dokumen(file_path, format_id=format_id, cabang='JKT', tahun=2025) == ['JKT/DOC-2025-0001']
+    assert utils.alokasi_id_dokumen(file_path, format_id=format_id, cabang='BDG', tahun=2025) == ['BDG/DOC-2025-0001']
+    assert utils.alokasi_id_dokumen(file_path, format_id=format_id, cabang='JKT', tahun=2026) == ['JKT/DOC-2026-0001']
+
+
+def test_alokasi_bersamaan_tidak_pernah_ganda(tmp_path):
+    path_seq = str(tmp_path / 'sequences.json')
+    hasil = []
+
+    def ambil():
+        for _ in range(25):
+            hasil.extend(utils.alokasi_sequence(path_seq, 'uji', jumlah=2))
+
+    threads = [threading.Thread(target=ambil) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(hasil) == list(range(1, 401))
+    assert json.load(open(path_seq))['uji'] == 400
+
+
+def test_sequence_log_tidak_di_bawah_id_di_file(tmp_path):
+    file_path = str(tmp_path / 'log.csv')
+    utils.save_data(file_path, pd.DataFrame({'ID_Log': [1, 2, 41], 'Aksi': ['a', 'b', 'c']}))
+
+    with utils.kunci_file(file_path):
+        assert utils.alokasi_id_log(file_path, jumlah=2) == [42, 43]
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'master.csv')
+    utils.init_master_csv(file_path)
+    return file_path
+
+
+def hitung_load(monkeypatch):
+    # Proses "dingin": tanpa cache data dan indeks, hitung pembacaan master
+    monkeypatch.setattr(utils, '_CACHE_DATA', utils.CacheLRU())
+    monkeypatch.setattr(utils, '_INDEKS_AKTIF', {})
+    dibaca = []
+    storage = utils.get_storage()
+    load_asli = storage.load
+    monkeypatch.setattr(storage, 'load', lambda *a, **k: dibaca.append(a) or load_asli(*a, **k))
+    return dibaca
+
+
+def test_alokasi_tidak_memuat_master_setelah_penulisan_aplikasi(master, monkeypatch):
+    id_awal = utils.tambah_dokumen(master, {'judul': 'Satu'})
+    utils.tambah_dokumen(master, {'judul': 'Dua'})
+    utils.update_dokumen(master, id_awal, {'Judul': 'Satu diubah'})
+    utils.hapus_dokumen(master, id_awal)
+
+    dibaca = hitung_load(monkeypatch)
+    with utils.kunci_file(master):
+        assert utils.alokasi_id_dokumen(master, jumlah=2) == ['DOC003', 'DOC004']
+    assert dibaca == []
+
+
+def test_edit_di_luar_aplikasi_menaikkan_sequence(master, monkeypatch):
+    utils.tambah_dokumen(master, {'judul': 'Satu'})
+    # ID besar ditambahkan langsung ke file (mis. diedit di Excel)
+    with open(master, 'a', encoding='utf-8') as f:
+        f.write('DOC050;Manual;Memo;Rak A;2025-01-01 08:00:00;;Aktif;;1\n')
+
+    dibaca = hitung_load(monkeypatch)
+    assert utils.alokasi_id_dokumen(master) == ['DOC051']
+    assert len(dibaca) == 1                     # kolom ID dibaca sekali
+    assert utils.alokasi_id_dokumen(master) == ['DOC052']
+    assert len(dibaca) == 1
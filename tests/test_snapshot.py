@@ -0,0 +1,104 @@
+'''
+Test snapshot Arrow dan pembacaan delta CSV (baca_snapshot)
+'''
+import os
+
+import pandas as pd
+import pytest
+
+import utils
+
+if not utils.SNAPSHOT_AKTIF:
+    pytest.skip("snapshot butuh pyarrow", allow_module_level=True)
+
+
+def buat_log(folder, jumlah):
+    file_path = os.path.join(folder, 'log.csv')
+    utils.save_data(file_path, pd.DataFrame({
+        'ID_Log': range(1, jumlah + 1),
+        'Aksi': [f"Aksi {i:05d}" for i in range(1, jumlah + 1)]
+    }))
+    return file_path
+
+
+def tambah_baris(file_path, id_log):
+    df = pd.DataFrame({'ID_Log': [id_log], 'Aksi': [f"Aksi {id_log:05d}"]})
+    with utils.kunci_file(file_path):
+        assert utils.append_csv(file_path, df)
+
+
+def test_append_dibaca_sebagai_delta(tmp_path):
+    file_path = buat_log(str(tmp_path), 5000)
+    tambah_baris(file_path, 5001)
+
+    _, meta = utils._buka_snapshot(file_path)
+    assert utils._status_snapshot(file_path, meta, utils.tanda_file(file_path)) == 'append'
+    df = utils.baca_snapshot(file_path)
+    assert len(df) == 5001 and df['Aksi'].iloc[-1] == 'Aksi 05001'
+
+
+def test_edit_di_tengah_lalu_file_bertambah_dianggap_basi(tmp_path):
+    file_path = buat_log(str(tmp_path), 20000)
+    tambah_baris(file_path, 20001)
+
+    # Edit manual di tengah file (panjang sama, di luar blok awal/akhir),
+    # lalu file bertambah lewat append biasa
+    with open(file_path, 'r+b') as f:
+        isi = f.read()
+        f.seek(0)
+        f.write(isi.replace(b'Aksi 10000', b'Ubah 10000'))
+    tambah_baris(file_path, 20002)
+
+    _, meta = utils._buka_snapshot(file_path)
+    assert utils._status_snapshot(file_path, meta, utils.tanda_file(file_path)) is None
+    df = utils.load_data(file_path)
+    assert len(df) == 20002 and df['Aksi'].iloc[9999] == 'Ubah 10000'
+
+
+def test_append_di_luar_append_csv_dianggap_basi(tmp_path):
+    file_path = buat_log(str(tmp_path), 100)
+    with open(file_path, 'ab') as f:
+        f.write(b'101;Aksi 00101\n')
+
+    _, meta = utils._buka_snapshot(file_path)
+    assert utils._status_snapshot(file_path, meta, utils.tanda_file(file_path)) is None
+    assert len(utils.load_data(file_path)) == 101
+
+
+def test_status_snapshot_tidak_membaca_csv(tmp_path, monkeypatch):
+    file_path = buat_log(str(tmp_path), 100)
+    for i in range(101, 111):
+        tambah_baris(file_path, i)
+    _, meta = utils._buka_snapshot(file_path)
+    tanda = utils.tanda_file(file_path)
+
+    dibuka = []
+    buka = open
+    monkeypatch.setattr('builtins.open', lambda path, *a, **k: dibuka.append(str(path)) or buka(path, *a, **k))
+    assert utils._status_snapshot(file_path, meta, tanda) == 'append'
+    assert dibuka == [utils.path_rantai_snapshot(file_path)]
+
+
+def test_snapshot_baru_memulai_rantai_baru(tmp_path):
+    file_path = buat_log(str(tmp_path), 100)
+    tambah_baris(file_path, 101)
+    assert os.path.exists(utils.path_rantai_snapshot(file_path))
+    utils.save_data(file_path, utils.load_data(file_path))
+    assert not os.path.exists(utils.path_rantai_snapshot(file_path))
+    tambah_baris(file_path, 102)
+    assert list(utils.baca_snapshot(file_path)['ID_Log'].iloc[-2:]) == [101, 102]
+
+
+def test_isi_lama_diubah_lalu_append_dianggap_basi(tmp_path):
+    file_path = buat_log(str(tmp_path), 50)
+    # Ubah isi lama tanpa mengubah panjang file (inode tetap), lalu append
+    with open(file_path, 'r+b') as f:
+        isi = f.read()
+        f.seek(0)
+        f.write(isi.replace(b'Aksi 00050', b'Ubah 00050'))
+    tambah_baris(file_path, 51)
+
+    _, meta = utils._buka_snapshot(file_path)
+    assert utils._status_snapshot(file_path, meta, utils.tanda_file(file_path)) is None
+    df = utils.load_data(file_path)
+    assert list(df['Aksi'].iloc[-2:]) == ['Ubah 00050', 'Aksi 00051']
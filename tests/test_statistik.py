@@ -0,0 +1,67 @@
+'''
+Test counter statistik dokumen (IndeksStatistik, get_statistik)
+'''
+import pickle
+
+import pandas as pd
+
+import utils
+
+
+def data_dokumen(jumlah):
+    return pd.DataFrame({
+        'ID': [f"DOC{i:04d}" for i in range(jumlah)],
+        'Jenis': [['Memo', 'Surat', 'Laporan'][i % 3] for i in range(jumlah)],
+        'Status': [['Aktif', 'Arsip'][i % 2] for i in range(jumlah)],
+        'Lokasi_Fisik': [f"Rak {i % 5}" for i in range(jumlah)]
+    })
+
+
+def hitungan_asli(df):
+    return {kolom: {str(k): int(v) for k, v in df[kolom].value_counts().items()}
+            for kolom in utils.KOLOM_STATISTIK}
+
+
+def test_delta_sama_dengan_value_counts():
+    df = data_dokumen(2000)
+    indeks = utils.IndeksStatistik()
+    indeks.bangun(df.iloc[:5])
+    for i in range(5, len(df)):
+        assert indeks.tambah(df.iloc[i:i + 1])
+    assert indeks.ubah(7, {'Status': 'Dihapus'})
+    assert indeks.hapus(0) and indeks.hapus(500)
+    assert indeks.hapus(indeks.jumlah - 1)
+    assert indeks.ubah(6, {'Jenis': 'Memo'})    # baris DOC0007 setelah DOC0000 dihapus
+
+    df.loc[7, ['Status', 'Jenis']] = ['Dihapus', 'Memo']
+    df = df.drop(index=[0, 501, 1999])
+    assert indeks.total == len(df)
+    assert indeks.hitungan == hitungan_asli(df)
+    # Kapasitas digandakan, bukan disalin tiap insert
+    assert len(indeks.kode['Jenis']) < 2 * indeks.slot_terpakai
+
+
+def test_slot_mati_terlalu_banyak_memicu_bangun_ulang():
+    indeks = utils.IndeksStatistik()
+    indeks.bangun(data_dokumen(3000))
+    jumlah_hapus = 0
+    while indeks.hapus(0):
+        jumlah_hapus += 1
+    assert jumlah_hapus == 1001
+
+
+def test_get_statistik_dan_indeks_format_lama(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, data_dokumen(9).reindex(columns=utils.COLUMNS_MASTER))
+    stats = utils.get_statistik(file_path)
+    assert stats['total'] == 9 and stats['per_jenis'] == {'Memo': 3, 'Surat': 3, 'Laporan': 3}
+
+    # File .idx dari format lama (tanpa format_file) dibangun ulang
+    path = utils.path_indeks(file_path, 'statistik')
+    indeks = pickle.load(open(path, 'rb'))
+    del indeks.format_file
+    pickle.dump(indeks, open(path, 'wb'))
+    utils._INDEKS_AKTIF.clear()
+    assert utils._muat_indeks(file_path, 'statistik', indeks.tanda, indeks.engine) is None
+    assert utils.get_statistik(file_path) == stats
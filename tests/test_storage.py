@@ -0,0 +1,74 @@
+'''
+Test storage engine CSV dan SQLite di balik load_data/save_data
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+def data_dokumen(jumlah):
+    return pd.DataFrame({
+        'ID': [f"DOC{i:03d}" for i in range(1, jumlah + 1)],
+        'Judul': [f"Judul {i}" for i in range(1, jumlah + 1)],
+        'Jenis': 'Memo',
+        'Lokasi_Fisik': 'Rak A',
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        'Keterangan': '',
+        'Status': 'Aktif',
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER)
+
+
+@pytest.fixture(params=['csv', 'sqlite'])
+def engine(request, monkeypatch):
+    monkeypatch.setattr(utils, 'STORAGE_ENGINE', request.param)
+    return utils.get_storage()
+
+
+def test_crud_lewat_engine(engine, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, data_dokumen(3))
+
+    assert utils.get_dokumen_by_id(file_path, 'DOC002')['Judul'] == 'Judul 2'
+    assert utils.update_dokumen(file_path, 'DOC002', {'Judul': 'Baru'})
+    assert utils.hapus_dokumen(file_path, 'DOC001')
+    id_baru = utils.tambah_dokumen(file_path, {'judul': 'Tambahan'})
+
+    df = utils.load_data(file_path)
+    assert list(df['ID']) == ['DOC002', 'DOC003', id_baru]
+    assert df.loc[df['ID'] == 'DOC002', 'Judul'].item() == 'Baru'
+    assert list(utils.load_data(file_path, kolom=['ID', 'Judul']).columns) == ['ID', 'Judul']
+
+
+def test_sqlite_migrasi_csv_lama(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, data_dokumen(4))     # CSV (engine default)
+
+    monkeypatch.setattr(utils, 'STORAGE_ENGINE', 'sqlite')
+    df = utils.load_data(file_path)
+    assert list(df['ID']) == ['DOC001', 'DOC002', 'DOC003', 'DOC004']
+    assert (tmp_path / utils.SQLITE_DB_NAME).exists()
+    assert utils.get_storage().get_by_key(file_path, 'ID', 'DOC003')['Judul'] == 'Judul 3'
+    assert utils.get_storage().tail(file_path, 2)['ID'].tolist() == ['DOC003', 'DOC004']
+
+
+def test_engine_tidak_dikenal():
+    with pytest.raises(ValueError):
+        utils.set_storage('parquet')
+
+
+def test_engine_dan_indeks_wajib_implementasi_method_abstrak():
+    class EngineSetengah(utils.StorageEngine):
+        def exists(self, file_path):
+            return False
+
+    class IndeksKosong(utils.IndeksData):
+        pass
+
+    with pytest.raises(TypeError):
+        EngineSetengah()
+    with pytest.raises(TypeError):
+        IndeksKosong()
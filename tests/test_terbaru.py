@@ -0,0 +1,64 @@
+'''
+Test pembacaan data terbaru dari ekor file (baca_ekor_csv, get_dokumen_terbaru,
+get_log_terbaru) dibanding load_data().tail
+'''
+import pandas as pd
+import pytest
+
+import utils
+
+
+def data_dokumen(jumlah):
+    return pd.DataFrame({
+        'ID': [f"DOC{i:03d}" for i in range(1, jumlah + 1)],
+        'Judul': [f"Judul {i}" for i in range(1, jumlah + 1)],
+        'Jenis': 'Memo',
+        'Lokasi_Fisik': 'Rak A',
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        # Sebagian keterangan multi-baris dan berisi kutip/separator
+        'Keterangan': [f'baris 1\nbaris "{i}"; akhir' if i % 3 == 0 else '' for i in range(1, jumlah + 1)],
+        'Status': 'Aktif',
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER)
+
+
+@pytest.mark.parametrize('n', [0, 1, 4, 29, 30, 50])
+def test_baca_ekor_csv_sama_dengan_tail(tmp_path, n):
+    file_path = str(tmp_path / 'master.csv')
+    utils._ENGINES['csv'].save(file_path, data_dokumen(30))
+
+    # Blok kecil agar batas blok jatuh di tengah nilai multi-baris
+    hasil = utils.baca_ekor_csv(file_path, n, blok=37)
+    harapan = utils.load_data(file_path).tail(n)
+    pd.testing.assert_frame_equal(hasil.reset_index(drop=True).fillna(''),
+                                  harapan.reset_index(drop=True).fillna(''), check_dtype=False)
+
+
+@pytest.mark.parametrize('nama_engine', ['csv', 'sqlite'])
+def test_get_dokumen_terbaru(tmp_path, monkeypatch, nama_engine):
+    monkeypatch.setattr(utils, 'STORAGE_ENGINE', nama_engine)
+    file_path = str(tmp_path / 'master.csv')
+    utils.save_data(file_path, data_dokumen(12))
+
+    assert list(utils.get_dokumen_terbaru(file_path, 5)['ID']) == ['DOC012', 'DOC011', 'DOC010',
+                                                                    'DOC009', 'DOC008']
+    assert len(utils.get_dokumen_terbaru(str(tmp_path / 'kosong.csv'))) == 0
+
+
+def test_get_log_terbaru_melengkapi_dari_arsip(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'LOG_PARTISI', 'bulanan')
+    file_path = str(tmp_path / 'log.csv')
+    sekarang = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+    waktu = ['2024-01-05 08:00:00', '2024-01-20 09:00:00', '2024-02-03 10:00:00', sekarang]
+    utils.save_data(file_path, pd.DataFrame({
+        'ID_Log': range(1, 5), 'Waktu': waktu, 'ID_Dokumen': 'DOC001', 'Aksi': 'Tambah', 'User': 'Admin'
+    }, columns=utils.COLUMNS_LOG))
+    utils.rotasi_log(file_path)
+    utils.kompres_partisi_log(file_path, sisakan=1)
+
+    # Partisi aktif hanya 1 baris: sisanya dari 2024-02.csv lalu 2024-01.csv.gz
+    assert list(utils.get_log_terbaru(file_path, 3)['ID_Log']) == [4, 3, 2]
+    assert list(utils.get_log_terbaru(file_path, 10)['ID_Log']) == [4, 3, 2, 1]
+    assert list(utils.get_log_terbaru(file_path, 5, mulai='2024-01-01',
+                                      sampai='2024-01-31')['ID_Log']) == [2, 1]
@@ -0,0 +1,62 @@
+'''
+Test optimistic concurrency dokumen (kolom Versi, KonflikVersi)
+'''
+import threading
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'data' / 'master.csv')
+    utils.init_master_csv(file_path)
+    return file_path
+
+
+def test_update_dengan_versi_usang_ditolak(master):
+    id_dokumen = utils.tambah_dokumen(master, {'judul': 'Awal'})
+    versi = utils.versi_dokumen(utils.get_dokumen_by_id(master, id_dokumen))
+
+    assert utils.update_dokumen(master, id_dokumen, {'Judul': 'Sesi A'}, versi=versi)
+    with pytest.raises(utils.KonflikVersi) as e:
+        utils.update_dokumen(master, id_dokumen, {'Judul': 'Sesi B'}, versi=versi)
+
+    assert (e.value.versi_dibaca, e.value.versi_sekarang) == (versi, versi + 1)
+    assert e.value.dokumen['Judul'] == 'Sesi A'
+    assert utils.get_dokumen_by_id(master, id_dokumen)['Judul'] == 'Sesi A'
+
+
+def test_hapus_dokumen_yang_sudah_diubah_atau_dihapus(master):
+    id_dokumen = utils.tambah_dokumen(master, {'judul': 'Awal'})
+    utils.update_dokumen(master, id_dokumen, {'Judul': 'Baru'})
+
+    with pytest.raises(utils.KonflikVersi):
+        utils.hapus_dokumen(master, id_dokumen, versi=1)
+    assert utils.hapus_dokumen(master, id_dokumen, versi=2)
+
+    with pytest.raises(utils.KonflikVersi) as e:
+        utils.hapus_dokumen(master, id_dokumen, versi=2)
+    assert e.value.versi_sekarang is None
+
+
+def test_update_bersamaan_hanya_satu_yang_menang(master):
+    id_dokumen = utils.tambah_dokumen(master, {'judul': 'Awal'})
+    hasil = []
+
+    def ubah(nama):
+        try:
+            hasil.append(utils.update_dokumen(master, id_dokumen, {'Judul': nama}, versi=1))
+        except utils.KonflikVersi:
+            hasil.append('konflik')
+
+    threads = [threading.Thread(target=ubah, args=(f"Sesi {i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(hasil, key=str) == [True] + ['konflik'] * 5
+    assert utils.versi_dokumen(utils.get_dokumen_by_id(master, id_dokumen)) == 2
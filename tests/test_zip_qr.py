@@ -0,0 +1,87 @@
+'''
+Test download ZIP QR Code (buat_zip_qr, _bersihkan_ekspor_qr)
+'''
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def master(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = str(tmp_path / 'data' / 'master.csv')
+    utils.save_data(file_path, pd.DataFrame({
+        'ID': [f"DOC{i:03d}" for i in range(1, 7)],
+        'Judul': [f"Judul {i}" for i in range(1, 7)],
+        'Jenis': ['Memo', 'Surat Masuk', 'Memo', 'Notulen', 'Memo', 'Surat Masuk'],
+        'Lokasi_Fisik': ['Rak A', 'Rak A', 'Rak B', 'Rak B', 'Rak A', 'Rak B'],
+        'Tanggal_Upload': '2025-01-01 08:00:00',
+        'Keterangan': '',
+        'Status': ['Aktif', 'Aktif', 'Arsip', 'Aktif', 'Arsip', 'Aktif'],
+        'QR_Path': '',
+        'Versi': 1
+    }, columns=utils.COLUMNS_MASTER))
+    # DOC006 sengaja tanpa file QR
+    for i in range(1, 6):
+        utils.generate_qr_code(f"DOC{i:03d}", f"qr/DOC{i:03d}.png")
+    return file_path
+
+
+def isi_zip(path):
+    with zipfile.ZipFile(path) as zipf:
+        return sorted(zipf.namelist())
+
+
+def test_filter_jenis_status_lokasi(master):
+    path, jumlah = utils.buat_zip_qr(master, 'qr', folder_ekspor='ekspor')
+    assert jumlah == 5 and isi_zip(path) == [f"DOC{i:03d}.png" for i in range(1, 6)]
+
+    path, jumlah = utils.buat_zip_qr(master, 'qr', jenis='Memo', folder_ekspor='ekspor')
+    assert isi_zip(path) == ['DOC001.png', 'DOC003.png', 'DOC005.png']
+    path, _ = utils.buat_zip_qr(master, 'qr', jenis='Memo', status='Aktif', folder_ekspor='ekspor')
+    assert isi_zip(path) == ['DOC001.png']
+    path, _ = utils.buat_zip_qr(master, 'qr', lokasi='Rak B', folder_ekspor='ekspor')
+    assert isi_zip(path) == ['DOC003.png', 'DOC004.png']
+
+    # Cocok dengan filter tapi tidak punya file QR
+    assert utils.buat_zip_qr(master, 'qr', jenis='Surat Masuk', lokasi='Rak B',
+                             folder_ekspor='ekspor') == (None, 0)
+    with zipfile.ZipFile(utils.buat_zip_qr(master, 'qr', jenis='Notulen', folder_ekspor='ekspor')[0]) as zipf:
+        assert zipf.read('DOC004.png') == utils._render_qr_png('DOC004')
+
+
+def test_zip_dipakai_ulang_sampai_qr_berubah(master, monkeypatch):
+    path, _ = utils.buat_zip_qr(master, 'qr', folder_ekspor='ekspor')
+    tanda = utils.tanda_file(path)
+
+    ditulis = []
+    write_asli = zipfile.ZipFile.write
+    monkeypatch.setattr(zipfile.ZipFile, 'write',
+                        lambda self, *args, **kwargs: ditulis.append(args) or write_asli(self, *args, **kwargs))
+    assert utils.buat_zip_qr(master, 'qr', folder_ekspor='ekspor')[0] == path
+    assert ditulis == [] and utils.tanda_file(path)[:2] == tanda[:2]
+
+    # QR salah satu dokumen dibuat ulang dengan isi lain -> ZIP baru
+    utils.generate_qr_code('DOC002 baru', 'qr/DOC002.png')
+    path_baru, jumlah = utils.buat_zip_qr(master, 'qr', folder_ekspor='ekspor')
+    assert path_baru != path and jumlah == 5 and len(ditulis) == 5
+    with zipfile.ZipFile(path_baru) as zipf:
+        assert zipf.read('DOC002.png') == utils._render_qr_png('DOC002 baru')
+
+
+def test_zip_lama_dibersihkan(master, monkeypatch):
+    monkeypatch.setattr(utils, 'MAKS_ZIP_QR', 2)
+    lama = []
+    for i, jenis in enumerate(['Semua', 'Memo', 'Notulen']):
+        path, _ = utils.buat_zip_qr(master, 'qr', jenis=jenis, folder_ekspor='ekspor')
+        os.utime(path, ns=(i * 10**9, i * 10**9))     # urutan terakhir dipakai pasti
+        lama.append(path)
+
+    path, _ = utils.buat_zip_qr(master, 'qr', jenis='Memo', status='Arsip', folder_ekspor='ekspor')
+    zip_ada = sorted(os.path.join('ekspor', f) for f in os.listdir('ekspor') if f.endswith('.zip'))
+    assert zip_ada == sorted([lama[2], path])
+    assert not [f for f in os.listdir('ekspor') if f.endswith('.tmp')]
@@ -11,9 +11,40 @@ import cv2                              # baca gambar dan scan QR code
 import os                               # operasi file dan folder
 import shutil                           # operasi file dan folder
 import zipfile                          # buat file ZIP untuk backup
-from datetime import datetime           # tanggal dan waktu
-from pyzbar.pyzbar import decode        # scan QR code dari gambar
-from PIL import Image                   # manipulasi gambar
+import gzip                             # kompresi partisi log lama
+import zlib                             # kompresi gambar halaman PDF label
+import sqlite3                          # storage engine SQLite
+import csv                              # tulis/baca baris CSV satu per satu
+import io                               # buffer teks di memori
+import json                             # metadata snapshot
+import hashlib                          # sidik jari isi file
+import pickle                           # simpan indeks ke disk
+import atexit                           # simpan indeks saat aplikasi berhenti
+import time                             # jeda penyimpanan indeks
+import re                               # pola format ID
+import string                           # parsing format ID
+import unicodedata                      # hapus aksen untuk indeks teks
+import bisect                           # pencarian prefix di kosakata indeks
+import math                             # skor relevansi (idf)
+import threading                        # lock antar sesi Streamlit
+import multiprocessing                  # worker generate QR batch
+from abc import ABC, abstractmethod     # interface storage engine dan indeks
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing, contextmanager
+from functools import lru_cache         # cache hasil tokenisasi teks
+from collections import OrderedDict, deque  # cache LRU, antrean hasil worker
+from datetime import datetime, date     # tanggal dan waktu
+from PIL import Image, ImageDraw, ImageFont  # manipulasi gambar, lembar label
+try:
+    import fcntl                        # file lock antar proses (Linux/macOS)
+except ImportError:
+    fcntl = None                        # Windows: hanya lock antar thread
+try:
+    import pyarrow as pa                # snapshot kolomnar (Arrow IPC)
+    import pyarrow.ipc                  # noqa: F401 - modul pa.ipc
+except ImportError:
+    pa = None                           # tanpa pyarrow: baca CSV saja
+from openpyxl import load_workbook      # baca file Excel per baris (import massal)
 import plotly.graph_objects as go       # buat grafik
 
 '''
@@ -26,7 +57,8 @@ COLUMNS_MASTER = ['ID',             # ID dokumen
                   'Tanggal_Upload', # tanggal dan waktu upload
                   'Keterangan',     # keterangan tambahan
                   'Status',         # status dokumen
-                  'QR_Path']        # path file QR code
+                  'QR_Path',        # path file QR code
+                  'Versi']          # versi baris, naik tiap update (optimistic concurrency)
 
 COLUMNS_LOG = ['ID_Log',        # ID log
                'ID_Dokumen',    # ID dokumen terkait
@@ -75,325 +107,3371 @@ LOKASI_LIST = [
 CHART_COLORS = ['#8b5cf6', '#06b6d4', '#10b981', '#f59e0b', 
                 '#ef4444', '#ec4899', '#3b82f6', '#84cc16', '#f97316', '#6366f1']
 
-# FUNGSI LOAD & SAVE DATA
-def load_data(file_path):
-    # Muat data dari file CSV dengan penanganan error yang lebih baik
-    if os.path.exists(file_path):
+# FUNGSI FILE LOCK & APPEND CSV
+'''
+Penulisan append-only: baris baru ditulis langsung di akhir file CSV
+(satu baris = satu write) di bawah file lock, sehingga biaya per event O(1)
+dan tidak bergantung pada ukuran file.
+'''
+# Lock antar thread dalam satu proses (Streamlit melayani tiap sesi di thread terpisah)
+_KUNCI_PROSES = {}
+_KUNCI_PROSES_GUARD = threading.Lock()
+_KUNCI_LOKAL = threading.local()        # kedalaman lock per thread (agar bisa nested)
+
+# Tanda file (inode, ukuran, mtime) terakhir yang ditulis oleh proses ini,
+# dipakai untuk tahu apakah file diubah pihak lain sejak penulisan terakhir
+_TANDA_FILE_CSV = {}
+
+# Cache counter ID: (file_path, kolom) -> (tanda file, ID terakhir)
+_COUNTER_ID = {}
+
+
+def tanda_file(file_path):
+    # Tanda versi file: (inode, ukuran, mtime), None jika file tidak ada
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+@contextmanager
+def kunci_file(file_path):
+    '''
+    Kunci eksklusif untuk menulis file
+    ----------------------------------
+    - Antar thread: threading.RLock per file
+    - Antar proses: fcntl.flock pada file <file_path>.lock (jika tersedia)
+    Boleh dipanggil bertingkat (nested) dari thread yang sama.
+    '''
+    path = os.path.abspath(file_path)
+    with _KUNCI_PROSES_GUARD:
+        lock = _KUNCI_PROSES.setdefault(path, threading.RLock())
+    
+    with lock:
+        kedalaman = getattr(_KUNCI_LOKAL, 'kedalaman', {})
+        _KUNCI_LOKAL.kedalaman = kedalaman
+        if kedalaman.get(path, 0) > 0 or fcntl is None:
+            # Sudah memegang flock (nested) atau OS tanpa fcntl
+            kedalaman[path] = kedalaman.get(path, 0) + 1
+            try:
+                yield
+            finally:
+                kedalaman[path] -= 1
+            return
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.lock', 'a') as f_lock:
+            fcntl.flock(f_lock, fcntl.LOCK_EX)
+            kedalaman[path] = 1
+            try:
+                yield
+            finally:
+                kedalaman[path] = 0
+                fcntl.flock(f_lock, fcntl.LOCK_UN)
+
+
+def _baca_header_csv(file_path):
+    # Baca nama kolom dari baris pertama file CSV, None jika file kosong/tidak ada
+    try:
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            baris = f.readline()
+    except OSError:
+        return None
+    if not baris.strip():
+        return None
+    return next(csv.reader([baris.rstrip('\r\n')], delimiter=';'))
+
+
+def _akhir_baris_csv(file_path):
+    # Ikuti jenis akhir baris file yang sudah ada ('\r\n' atau '\n')
+    try:
+        with open(file_path, 'rb') as f:
+            baris = f.readline()
+    except OSError:
+        return os.linesep
+    if baris.endswith(b'\r\n'):
+        return '\r\n'
+    return '\n' if baris.endswith(b'\n') else os.linesep
+
+
+def _baca_ekor_bytes(file_path, min_baris=2, blok=4096):
+    # Baca bytes dari akhir file sampai minimal berisi min_baris baris
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b''
+        while pos > 0:
+            baca = min(blok, pos)
+            pos -= baca
+            f.seek(pos)
+            buf = f.read(baca) + buf
+            if buf.count(b'\n') > min_baris:
+                break
+    return buf, pos
+
+
+def baca_ekor_csv(file_path, n, blok=8192):
+    '''
+    Ambil n record terakhir file CSV tanpa membaca seluruh file
+    -----------------------------------------------------------
+    File dibaca mundur per blok. Newline adalah batas record hanya jika
+    jumlah tanda kutip sesudahnya (sampai akhir file) genap, jadi nilai
+    multi-baris dalam kutip (mis. Keterangan) tidak ikut terpotong.
+    Hanya header + n record terakhir yang di-parse.
+    Return DataFrame (urutan sesuai file), None jika file tidak ada/kosong.
+    '''
+    header = _baca_header_csv(file_path)
+    if header is None:
+        return None
+    n = max(0, int(n))
+    
+    with open(file_path, 'rb') as f:
+        awal_data = len(f.readline())       # byte pertama sesudah baris header
+        f.seek(0, os.SEEK_END)
+        ukuran = f.tell()
+        
+        # Newline penutup di akhir file bukan batas antar record
+        akhir = ukuran
+        f.seek(max(awal_data, ukuran - 2))
+        ujung = f.read()
+        if ujung.endswith(b'\n'):
+            akhir -= 1
+        
+        mulai = awal_data
+        kutip = 0
+        ditemukan = 0
+        pos = akhir
+        while pos > awal_data and ditemukan < n:
+            baca = min(blok, pos - awal_data)
+            pos -= baca
+            f.seek(pos)
+            potongan = f.read(baca)
+            i = len(potongan)
+            while ditemukan < n:
+                j = potongan.rfind(b'\n', 0, i)
+                kutip += potongan.count(b'"', j + 1, i)
+                if j < 0:
+                    break
+                if kutip % 2 == 0:
+                    ditemukan += 1
+                    mulai = pos + j + 1
+                i = j
+        
+        if n == 0:
+            mulai = akhir
+        elif ditemukan < n:
+            mulai = awal_data               # record di file kurang dari n: ambil semua
+        f.seek(mulai)
+        data = f.read(akhir - mulai)
+    
+    teks = io.StringIO(';'.join(header) + '\n' + data.decode('utf-8', errors='replace'))
+    df = pd.read_csv(teks, sep=';')
+    if 'ID' in df.columns:
+        df['ID'] = df['ID'].astype(str).str.strip()
+    return df
+
+
+def pulihkan_ekor_csv(file_path):
+    '''
+    Pemulihan setelah crash
+    -----------------------
+    Jika proses mati di tengah penulisan, baris terakhir bisa terpotong
+    (tidak diakhiri newline). Baris terpotong dibuang, baris lengkap yang
+    hanya kurang newline diberi newline. Kembalikan baris data terakhir
+    (list nilai) atau None jika file belum punya baris data.
+    Panggil di dalam kunci_file().
+    '''
+    header = _baca_header_csv(file_path)
+    if header is None:
+        return None
+    
+    buf, pos = _baca_ekor_bytes(file_path)
+    if not buf.endswith(b'\n'):
+        potongan = buf[buf.rfind(b'\n') + 1:]
+        nilai = next(csv.reader([potongan.decode('utf-8', errors='replace')], delimiter=';'), [])
+        with open(file_path, 'r+b') as f:
+            if len(nilai) == len(header) or b'\n' not in buf:
+                # baris lengkap (atau hanya header) tanpa newline: tambahkan newline
+                f.seek(0, os.SEEK_END)
+                f.write(_akhir_baris_csv(file_path).encode('utf-8'))
+            else:
+                # baris terpotong: buang
+                print(f"Warning: Membuang baris terpotong di akhir {file_path}")
+                f.truncate(pos + buf.rfind(b'\n') + 1)
+        buf, pos = _baca_ekor_bytes(file_path)
+    
+    baris = buf.rstrip(b'\r\n').split(b'\n')
+    if pos == 0 and len(baris) <= 1:
+        return None     # hanya ada header
+    terakhir = baris[-1].rstrip(b'\r').decode('utf-8-sig', errors='replace')
+    return next(csv.reader([terakhir], delimiter=';'), None)
+
+
+def id_berikutnya_csv(file_path, kolom):
+    '''
+    ID berikutnya untuk file CSV yang append-only (mis. ID_Log di log.csv)
+    ----------------------------------------------------------------------
+    Counter di-cache di memori. Selama file tidak diubah pihak lain
+    (tanda file sama dengan penulisan terakhir), counter dipakai langsung.
+    Jika berbeda (restart, crash, edit manual), counter dibangun ulang dari
+    baris terakhir file. Panggil di dalam kunci_file().
+    '''
+    tanda = tanda_file(file_path)
+    cache = _COUNTER_ID.get((file_path, kolom))
+    if cache is not None and cache[0] == tanda:
+        return cache[1] + 1
+    
+    # Recovery: bangun ulang counter dari ekor file
+    header = _baca_header_csv(file_path)
+    terakhir = pulihkan_ekor_csv(file_path)
+    id_terakhir = 0
+    if terakhir is not None and header is not None and kolom in header:
+        try:
+            id_terakhir = int(float(terakhir[header.index(kolom)]))
+        except (ValueError, IndexError):
+            # ekor rusak, terpaksa scan seluruh kolom
+            df = pd.read_csv(file_path, sep=';', encoding='utf-8-sig', usecols=[kolom])
+            id_terakhir = int(pd.to_numeric(df[kolom], errors='coerce').max()) if len(df) > 0 else 0
+    
+    _COUNTER_ID[(file_path, kolom)] = (tanda_file(file_path), id_terakhir)
+    return id_terakhir + 1
+
+
+def _format_baris_csv(df, akhir_baris=os.linesep):
+    # Format baris DataFrame menjadi teks CSV (';') tanpa header
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=';', lineterminator=akhir_baris)
+    for row in df.astype(object).where(pd.notna(df), '').values.tolist():
+        writer.writerow(row)
+    return output.getvalue()
+
+
+def append_csv(file_path, df_baru):
+    '''
+    Tambahkan baris ke akhir file CSV dengan satu kali write
+    Kolom diurutkan sesuai header file. Kembalikan False jika kolom tidak cocok
+    (pemanggil harus menulis ulang file). Panggil di dalam kunci_file().
+    '''
+    header = _baca_header_csv(file_path)
+    if header is None or not set(df_baru.columns) <= set(header):
+        return False
+    
+    # Pastikan file berakhir dengan newline yang utuh sebelum menambah baris
+    if _TANDA_FILE_CSV.get(file_path) != tanda_file(file_path):
+        pulihkan_ekor_csv(file_path)
+    
+    teks = _format_baris_csv(df_baru.reindex(columns=header), _akhir_baris_csv(file_path))
+    tanda_sebelum = tanda_file(file_path)
+    with open(file_path, 'ab') as f:
+        f.write(teks.encode('utf-8'))
+    tanda_baru = tanda_file(file_path)
+    _catat_rantai_snapshot(file_path, tanda_sebelum, tanda_baru)
+    invalidasi_cache_data(file_path)
+    
+    # Geser counter yang masih valid agar tidak perlu recovery di event berikutnya
+    for (path, kolom), (tanda, id_terakhir) in list(_COUNTER_ID.items()):
+        if path != file_path or tanda != tanda_sebelum:
+            continue
+        try:
+            id_baru = int(pd.to_numeric(df_baru[kolom]).max()) if kolom in df_baru.columns else id_terakhir
+        except (ValueError, TypeError):
+            _COUNTER_ID.pop((path, kolom), None)
+            continue
+        _COUNTER_ID[(path, kolom)] = (tanda_baru, max(id_terakhir, id_baru))
+    _TANDA_FILE_CSV[file_path] = tanda_baru
+    return True
+
+
+# FUNGSI CACHE DATA
+'''
+Cache DataFrame bersama untuk seluruh proses (dipakai semua sesi browser)
+--------------------------------------------------------------------------
+- Kunci: (engine, path absolut), divalidasi dengan tanda file (inode, ukuran, mtime)
+- Pemanggil menerima salinan DataFrame: perubahan oleh pemanggil tidak
+  pernah mengubah isi cache
+- Setiap penulisan lewat storage engine langsung menghapus entry terkait
+- Total memori dibatasi CACHE_DATA_MAKS_MB, entry paling lama tidak
+  dipakai (LRU) dibuang lebih dulu
+- versi_data(): versi dataset yang naik di setiap penulisan, dipakai sebagai
+  bagian kunci cache turunan (mis. cache hasil query)
+'''
+CACHE_DATA_MAKS_MB = float(os.environ.get('SMDOK_CACHE_MB', 256))
+
+
+class CacheLRU:
+    '''
+    Cache LRU dengan batas memori, dipakai bersama semua sesi
+    ---------------------------------------------------------
+    Dipakai cache data, cache QR, cache grafik dan cache hasil query.
+    Total ukuran entry disimpan sebagai running total, jadi simpan() dan
+    eviction O(1) per entry tanpa menjumlah ulang seluruh cache.
+    Batas (MB) diberikan pemanggil saat simpan() agar mengikuti konstanta
+    CACHE_*_MAKS_MB modul yang sedang berlaku.
+    '''
+
+    def __init__(self):
+        self.entry = OrderedDict()      # kunci -> (nilai, ukuran byte)
+        self.ukuran = 0
+        self.stats = {'hit': 0, 'miss': 0, 'eviction': 0}
+        self.lock = threading.RLock()
+
+    def ambil(self, kunci):
+        # Nilai untuk kunci (ditandai baru dipakai), None jika tidak ada;
+        # hit/miss dicatat pemanggil lewat catat() setelah nilai divalidasi
+        with self.lock:
+            entry = self.entry.get(kunci)
+            if entry is None:
+                return None
+            self.entry.move_to_end(kunci)
+            return entry[0]
+
+    def catat(self, hit):
+        with self.lock:
+            self.stats['hit' if hit else 'miss'] += 1
+
+    def simpan(self, kunci, nilai, ukuran, maks_mb):
+        # Simpan entry lalu buang entry LRU sampai total di bawah batas;
+        # entry yang lebih besar dari batas tidak disimpan (return False)
+        batas = maks_mb * 1024 * 1024
+        with self.lock:
+            self.hapus(kunci)
+            if ukuran > batas:
+                return False
+            self.entry[kunci] = (nilai, ukuran)
+            self.ukuran += ukuran
+            while self.ukuran > batas:
+                _, (_, dibuang) = self.entry.popitem(last=False)
+                self.ukuran -= dibuang
+                self.stats['eviction'] += 1
+            return True
+
+    def hapus(self, kunci):
+        with self.lock:
+            entry = self.entry.pop(kunci, None)
+            if entry is not None:
+                self.ukuran -= entry[1]
+
+    def hapus_jika(self, syarat):
+        # Hapus semua entry yang kuncinya memenuhi syarat(kunci)
+        with self.lock:
+            for kunci in [k for k in self.entry if syarat(k)]:
+                self.hapus(kunci)
+
+    def kosongkan(self):
+        with self.lock:
+            self.entry.clear()
+            self.ukuran = 0
+
+    def statistik(self, maks_mb):
+        # Hit/miss/eviction, jumlah entry dan memori terpakai
+        with self.lock:
+            total = self.stats['hit'] + self.stats['miss']
+            return {
+                'hit': self.stats['hit'],
+                'miss': self.stats['miss'],
+                'eviction': self.stats['eviction'],
+                'hit_rate': self.stats['hit'] / total if total else 0.0,
+                'entry': len(self.entry),
+                'ukuran_mb': self.ukuran / (1024 * 1024),
+                'maks_mb': maks_mb
+            }
+
+
+_CACHE_DATA = CacheLRU()            # kunci -> {'tanda', 'df'}
+_CACHE_DATA_LOCK = threading.RLock()
+_VERSI_DATA = {}                    # path absolut (None = semua file) -> counter penulisan
+
+
+def _kunci_cache_data(storage, file_path, kolom=None):
+    return (storage.nama, os.path.abspath(file_path), tuple(kolom) if kolom else None)
+
+
+def muat_dengan_cache(storage, file_path, kolom=None, salin=True):
+    # Muat data lewat storage engine, pakai cache jika file belum berubah
+    # kolom: proyeksi, hanya kolom ini yang dimuat (None = semua kolom)
+    # salin=False: kembalikan objek cache langsung (hanya untuk pembacaan
+    # internal yang dijamin tidak mengubah DataFrame)
+    kunci = _kunci_cache_data(storage, file_path, kolom)
+    kunci_penuh = _kunci_cache_data(storage, file_path)
+    tanda = storage.tanda(file_path)     # diambil sebelum load agar aman dari race
+    
+    with _CACHE_DATA_LOCK:
+        for k in (kunci, kunci_penuh):
+            entry = _CACHE_DATA.ambil(k)
+            if entry is not None and tanda is not None and entry['tanda'] == tanda:
+                df = entry['df']
+                if k != kunci:
+                    # proyeksi dari data penuh yang sudah ada di cache
+                    if any(c not in df.columns for c in kolom):
+                        continue
+                    df = df[list(kolom)]
+                _CACHE_DATA.catat(hit=True)
+                return df.copy() if salin else df
+        _CACHE_DATA.catat(hit=False)
+    
+    df = storage.load(file_path, kolom=kolom)
+    if tanda is None or len(df.columns) == 0:
+        return df   # file tidak ada / gagal dibaca: jangan di-cache
+    
+    ukuran = int(df.memory_usage(index=True, deep=True).sum())
+    with _CACHE_DATA_LOCK:
+        _CACHE_DATA.simpan(kunci, {'tanda': tanda, 'df': df}, ukuran, CACHE_DATA_MAKS_MB)
+    return df.copy() if salin else df
+
+
+def versi_data(file_path):
+    '''
+    Versi dataset file_path, berubah setiap kali data ditulis
+    - counter penulisan di proses ini (naik di invalidasi_cache_data, yang
+      dipanggil semua jalur tulis storage engine)
+    - engine + tanda storage, agar perubahan dari proses lain juga terdeteksi
+    '''
+    storage = get_storage()
+    return _counter_versi(file_path) + (storage.nama, storage.tanda(file_path))
+
+
+def _counter_versi(file_path):
+    # Bagian versi_data() dari counter penulisan di proses ini (tanpa akses disk)
+    with _CACHE_DATA_LOCK:
+        return (_VERSI_DATA.get(None, 0), _VERSI_DATA.get(os.path.abspath(file_path), 0))
+
+
+def invalidasi_cache_data(file_path=None):
+    # Hapus entry cache untuk file tertentu (semua engine), atau seluruh cache
+    # sekaligus menaikkan versi data file tersebut (lihat versi_data)
+    with _CACHE_DATA_LOCK:
+        if file_path is None:
+            _VERSI_DATA[None] = _VERSI_DATA.get(None, 0) + 1
+            _CACHE_DATA.kosongkan()
+            return
+        path = os.path.abspath(file_path)
+        _VERSI_DATA[path] = _VERSI_DATA.get(path, 0) + 1
+        _CACHE_DATA.hapus_jika(lambda kunci: kunci[1] == path)
+
+
+def get_statistik_cache():
+    # Statistik cache: jumlah hit/miss/eviction, entry dan memori terpakai
+    return _CACHE_DATA.statistik(CACHE_DATA_MAKS_MB)
+
+
+# FUNGSI SNAPSHOT KOLOMNAR
+'''
+Snapshot kolomnar (Arrow IPC / Feather v2, tanpa kompresi) di samping tiap CSV
+-----------------------------------------------------------------------------
+- Ditulis ulang oleh save_data, contoh: data/master.csv -> data/master.arrow
+- load_data membaca snapshot lewat memory-map: hanya kolom yang diminta yang
+  disentuh, tanpa parsing teks CSV
+- Baris yang di-append ke CSV setelah snapshot dibuat (log.csv) dibaca sebagai
+  delta dari offset terakhir; snapshot diperbarui setelah delta cukup besar
+- Delta hanya dipakai jika CSV sampai ke kondisinya sekarang lewat append
+  yang tercatat: append_csv menulis tanda file sebelum -> sesudah tiap append
+  ke data/<nama>.rantai, dan rantai itu harus tersambung dari tanda saat
+  snapshot ditulis sampai tanda CSV sekarang (tanpa membaca isi CSV lama).
+  Perubahan lain (edit manual, proses lain di luar append_csv) = baca ulang
+  CSV penuh
+- CSV tetap menjadi format utama untuk interchange/export
+Butuh pyarrow; jika tidak terpasang, aplikasi kembali membaca CSV saja.
+'''
+SNAPSHOT_AKTIF = pa is not None and os.environ.get('SMDOK_SNAPSHOT', '1') != '0'
+
+# Delta CSV di atas ukuran ini (bytes) memicu penulisan ulang snapshot
+SNAPSHOT_MAKS_DELTA = 256 * 1024
+
+
+def path_snapshot(file_path):
+    # data/master.csv -> data/master.arrow
+    return os.path.splitext(file_path)[0] + '.arrow'
+
+
+def path_rantai_snapshot(file_path):
+    # data/log.csv -> data/log.rantai (langkah append sejak snapshot ditulis)
+    return os.path.splitext(file_path)[0] + '.rantai'
+
+
+def _catat_rantai_snapshot(file_path, tanda_sebelum, tanda_baru):
+    # Catat satu append (tanda sebelum -> sesudah) selama snapshot ada;
+    # dipanggil append_csv di dalam kunci_file()
+    if not SNAPSHOT_AKTIF or tanda_sebelum is None or tanda_baru is None:
+        return
+    if not os.path.exists(path_snapshot(file_path)):
+        return
+    with open(path_rantai_snapshot(file_path), 'a') as f:
+        f.write(';'.join(str(x) for x in (*tanda_sebelum, *tanda_baru)) + '\n')
+
+
+def _rantai_tersambung(file_path, meta, tanda):
+    # True jika tanda CSV sekarang dicapai dari tanda snapshot hanya lewat
+    # append yang tercatat; langkah yang tidak tersambung diabaikan
+    posisi = (meta['ino'], meta['ukuran'], meta['mtime_ns'])
+    try:
+        with open(path_rantai_snapshot(file_path)) as f:
+            for baris in f:
+                try:
+                    langkah = tuple(int(x) for x in baris.split(';'))
+                except ValueError:
+                    continue    # baris terpotong
+                if len(langkah) == 6 and langkah[:3] == posisi:
+                    posisi = langkah[3:]
+    except OSError:
+        return False
+    return posisi == tuple(tanda)
+
+
+def tulis_snapshot(file_path, df, tanda=None):
+    '''
+    Tulis snapshot Arrow untuk file CSV (atomic: file sementara + os.replace)
+    tanda = tanda_file(file_path) saat df dibaca/ditulis
+    '''
+    if not SNAPSHOT_AKTIF or file_path.endswith('.gz'):
+        # file terkompresi (partisi log lama) sengaja tidak diberi snapshot
+        return False
+    tanda = tanda or tanda_file(file_path)
+    if tanda is None:
+        return False
+    try:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # kolom campuran (angka + teks): simpan sebagai teks
+            df = df.copy()
+            for k in df.columns[df.dtypes == object]:
+                df[k] = df[k].where(df[k].isna(), df[k].astype(str))
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        
+        meta = dict(table.schema.metadata or {})
+        meta[b'smdok'] = json.dumps({
+            'ino': tanda[0], 'ukuran': tanda[1], 'mtime_ns': tanda[2]
+        }).encode('utf-8')
+        table = table.replace_schema_metadata(meta)
+        
+        path = path_snapshot(file_path)
+        path_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(path_tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path_tmp, path)
+        # Rantai append mulai dari snapshot baru (langkah lama tidak berguna lagi;
+        # append di antara replace dan remove hanya membuat baca berikutnya parse penuh)
+        try:
+            os.remove(path_rantai_snapshot(file_path))
+        except FileNotFoundError:
+            pass
+        return True
+    except Exception as e:
+        print(f"Warning: Gagal menulis snapshot {file_path}: {e}")
+        return False
+
+
+def _buka_snapshot(file_path):
+    # Memory-map snapshot, kembalikan (table, metadata) atau (None, None)
+    path = path_snapshot(file_path)
+    if not SNAPSHOT_AKTIF or not os.path.exists(path):
+        return None, None
+    try:
+        source = pa.memory_map(path, 'r')
+        table = pa.ipc.open_file(source).read_all()     # zero-copy di atas mmap
+        meta = json.loads((table.schema.metadata or {}).get(b'smdok', b'null'))
+        return table, meta
+    except Exception as e:
+        print(f"Warning: Snapshot {path} tidak bisa dibaca: {e}")
+        return None, None
+
+
+def _status_snapshot(file_path, meta, tanda):
+    # 'segar' = sama dengan CSV, 'append' = CSV hanya bertambah di akhir, None = basi
+    if meta is None or tanda is None:
+        return None
+    if [meta['ino'], meta['ukuran'], meta['mtime_ns']] == list(tanda):
+        return 'segar'
+    if meta['ino'] == tanda[0] and tanda[1] > meta['ukuran'] and _rantai_tersambung(file_path, meta, tanda):
+        return 'append'
+    return None
+
+
+def _ke_pandas(table):
+    # Arrow -> pandas; nilai kosong di kolom teks dibuat NaN seperti read_csv
+    df = table.to_pandas()
+    for k in df.columns[df.dtypes == object]:
+        df[k] = df[k].where(df[k].notna(), np.nan)
+    return df
+
+
+def baca_snapshot(file_path, kolom=None, tanda=None):
+    '''
+    Baca data dari snapshot (proyeksi kolom opsional)
+    Kembalikan None jika snapshot tidak ada atau sudah basi.
+    '''
+    table, meta = _buka_snapshot(file_path)
+    tanda = tanda or tanda_file(file_path)
+    status = _status_snapshot(file_path, meta, tanda)
+    if status is None:
+        return None
+    
+    if kolom is not None:
+        if any(k not in table.column_names for k in kolom):
+            return None
+        table = table.select(kolom)     # proyeksi, zero-copy
+    df = _ke_pandas(table)
+    
+    if status == 'append':
+        # Parse hanya bytes yang ditambahkan sejak snapshot dibuat
+        with open(file_path, 'rb') as f:
+            header = f.readline()
+            f.seek(meta['ukuran'])
+            delta = f.read(tanda[1] - meta['ukuran'])
+        df_delta = pd.read_csv(io.BytesIO(header + delta), sep=';',
+                               encoding='utf-8-sig', usecols=kolom)
+        if len(df_delta) > 0:
+            df = pd.concat([df, df_delta], ignore_index=True)
+        if kolom is None and len(delta) > SNAPSHOT_MAKS_DELTA:
+            tulis_snapshot(file_path, df, tanda)
+    return df
+
+
+def baca_kolom(file_path, kolom):
+    '''
+    Akses satu kolom tanpa copy (Series ArrowDtype di atas memory-map)
+    Dipakai untuk agregasi (value_counts) yang tidak butuh seluruh tabel.
+    Jika snapshot tidak segar / engine bukan CSV, ambil dari load_data.
+    '''
+    if get_storage().nama == 'csv':
+        table, meta = _buka_snapshot(file_path)
+        if _status_snapshot(file_path, meta, tanda_file(file_path)) == 'segar':
+            if kolom not in table.column_names:
+                return pd.Series(dtype=object)
+            return pd.Series(pd.arrays.ArrowExtensionArray(table.column(kolom)), name=kolom)
+    df = load_data(file_path, kolom=[kolom])
+    return df[kolom] if kolom in df.columns else pd.Series(dtype=object)
+
+
+# FUNGSI STORAGE ENGINE
+'''
+Storage engine adalah lapisan penyimpanan di balik load_data/save_data.
+Semua fungsi CRUD memanggil engine, sehingga format penyimpanan bisa diganti
+tanpa mengubah main.py. Engine yang tersedia:
+- 'csv'    : file CSV dengan pemisah ';' (default, format asli aplikasi)
+- 'sqlite' : database SQLite di data/smdok.db dengan index per kolom
+Pilih engine lewat environment variable SMDOK_STORAGE atau fungsi set_storage().
+'''
+STORAGE_ENGINE = os.environ.get('SMDOK_STORAGE', 'csv')
+
+# Nama file database SQLite (disimpan di folder yang sama dengan file CSV)
+SQLITE_DB_NAME = 'smdok.db'
+
+# Skema tabel SQLite: kolom kunci (primary key) dan kolom yang diberi index
+# Nama tabel diambil dari nama file CSV, misalnya data/master.csv -> master
+SKEMA_SQLITE = {
+    'master': {'kunci': 'ID', 'indeks': ['Jenis', 'Status', 'Lokasi_Fisik']},
+    'log': {'kunci': 'ID_Log', 'indeks': ['ID_Dokumen']},
+    'users': {'kunci': 'username', 'indeks': []}
+}
+
+# Kolom yang disimpan sebagai INTEGER di SQLite, sisanya TEXT
+KOLOM_INTEGER = ['ID_Log', 'Versi']
+
+
+class StorageEngine(ABC):
+    '''
+    Interface dasar storage engine
+    ------------------------------
+    Engine turunan wajib mengimplementasikan exists(), load() dan save().
+    Operasi per baris (append, get/update/delete by key) punya implementasi
+    default berbasis load + save, engine yang lebih pintar boleh override.
+    Parameter posisi (opsional) adalah posisi baris dari indeks ID, dipakai
+    untuk melewati scan kolom kunci.
+    '''
+    nama = None
+    pakai_indeks_memori = True      # lookup ID lewat IndeksID di memori
+
+    @abstractmethod
+    def exists(self, file_path):
+        ...
+
+    @abstractmethod
+    def load(self, file_path, kolom=None):
+        # kolom: daftar kolom yang dimuat (proyeksi), None = semua kolom
+        ...
+
+    @abstractmethod
+    def save(self, file_path, df):
+        ...
+
+    def tanda(self, file_path):
+        # Tanda versi data untuk validasi cache (None = tidak ada data)
+        return tanda_file(file_path)
+
+    def muat(self, file_path):
+        # load() lewat cache bersama (dipakai operasi baca di bawah)
+        return muat_dengan_cache(self, file_path)
+
+    def append(self, file_path, df_baru):
+        # Tambah baris baru di akhir data
+        df = self.muat(file_path)
+        if len(df) == 0:
+            df = df_baru
+        else:
+            df = pd.concat([df, df_baru], ignore_index=True)
+        return self.save(file_path, df)
+
+    def tail(self, file_path, n):
+        # Ambil n baris terakhir (urutan sesuai urutan simpan)
+        return self.muat(file_path).tail(n)
+
+    def nilai_maks(self, file_path, kolom):
+        # Ambil nilai terbesar di kolom, None jika data kosong
+        df = self.muat(file_path)
+        if len(df) == 0 or kolom not in df.columns:
+            return None
+        try:
+            return df[kolom].max()
+        except Exception:
+            return None
+
+    def id_berikutnya(self, file_path, kolom):
+        # ID numerik berikutnya = nilai terbesar + 1 (panggil di dalam kunci_file)
+        terakhir = self.nilai_maks(file_path, kolom)
+        return int(terakhir) + 1 if terakhir is not None else 1
+
+    def get_by_key(self, file_path, kolom, nilai):
+        # Ambil satu baris (dictionary) berdasarkan nilai kolom kunci
+        df = self.muat(file_path)
+        if len(df) == 0 or kolom not in df.columns:
+            return None
+        result = df[df[kolom].astype(str).str.strip() == str(nilai).strip()]
+        if len(result) > 0:
+            return result.iloc[0].to_dict()
+        return None
+
+    def posisi_cocok(self, df, kolom, nilai, posisi):
+        # Cek apakah posisi dari indeks memang berisi nilai kunci yang dicari
+        return (posisi is not None and 0 <= posisi < len(df)
+                and str(df[kolom].iat[posisi]).strip() == str(nilai).strip())
+
+    def update_by_key(self, file_path, kolom, nilai, data, posisi=None):
+        # Update baris pertama yang cocok, True jika berhasil
+        df = self.muat(file_path)
+        if len(df) == 0 or kolom not in df.columns:
+            return False
+        if self.posisi_cocok(df, kolom, nilai, posisi):
+            idx = df.index[[posisi]]
+        else:
+            idx = df[df[kolom].astype(str).str.strip() == str(nilai).strip()].index
+        if len(idx) == 0:
+            return False
+        for key, value in data.items():
+            if key in df.columns:
+                # kolom kosong (float NaN) perlu diubah ke object sebelum diisi teks
+                if isinstance(value, str) and df[key].dtype != object:
+                    df[key] = df[key].astype(object)
+                df.loc[idx[0], key] = value
+        return self.save(file_path, df)
+
+    def delete_by_key(self, file_path, kolom, nilai, posisi=None):
+        # Hapus baris yang cocok, kembalikan jumlah baris yang terhapus
+        # posisi hanya boleh diisi jika kunci dijamin unik (lihat IndeksID.duplikat)
+        df = self.muat(file_path)
+        if len(df) == 0 or kolom not in df.columns:
+            return 0
+        if self.posisi_cocok(df, kolom, nilai, posisi):
+            if not self.save(file_path, df.drop(index=df.index[posisi])):
+                return 0
+            return 1
+        mask = df[kolom].astype(str).str.strip() == str(nilai).strip()
+        jumlah_terhapus = int(mask.sum())
+        if jumlah_terhapus != 1:
+            # Jangan simpan jika tidak ada / lebih dari 1 baris yang cocok
+            return jumlah_terhapus
+        if not self.save(file_path, df[~mask].copy()):
+            return 0
+        return jumlah_terhapus
+
+
+class CSVStorage(StorageEngine):
+    '''
+    Engine CSV: format asli aplikasi (pemisah ';', encoding utf-8-sig)
+    '''
+    nama = 'csv'
+
+    def exists(self, file_path):
+        return os.path.exists(file_path)
+
+    def load(self, file_path, kolom=None):
+        # Muat data dari file CSV dengan penanganan error yang lebih baik
+        if os.path.exists(file_path):
+            try:
+                # Baca dari snapshot kolomnar (memory-map) jika masih sesuai CSV
+                tanda = tanda_file(file_path)
+                df = baca_snapshot(file_path, kolom, tanda)
+                if df is None:
+                    # Baca file CSV dengan pandas
+                    # (snapshot aktif: baca semua kolom agar snapshot bisa diperbarui)
+                    df = pd.read_csv(file_path, 
+                                     sep=';',               # gunakan pemisah titik koma
+                                     encoding='utf-8-sig',  # encoding UTF-8 dengan BOM
+                                     usecols=None if SNAPSHOT_AKTIF else kolom)
+                    if SNAPSHOT_AKTIF:
+                        tulis_snapshot(file_path, df, tanda)
+                        if kolom is not None:
+                            df = df[list(kolom)]
+                # PERBAIKAN: Pastikan kolom ID adalah string jika ada
+                if 'ID' in df.columns:
+                    df['ID'] = df['ID'].astype(str).str.strip()
+                return df
+            except Exception as e:
+                # jika gagal, kembalikan DataFrame kosong
+                print(f"Error loading {file_path}: {e}")
+                return pd.DataFrame()
+        
+        # jika file tidak ada, kembalikan DataFrame kosong
+        return pd.DataFrame()
+
+    def save(self, file_path, df):
         try:
-            # Baca file CSV dengan pandas
-            df = pd.read_csv(file_path, 
-                             sep=';',               # gunakan pemisah titik koma
-                             encoding='utf-8-sig')  # encoding UTF-8 dengan BOM
-            # PERBAIKAN: Pastikan kolom ID adalah string jika ada
-            if 'ID' in df.columns:
-                df['ID'] = df['ID'].astype(str).str.strip()
-            return df
+            # Buat folder jika belum ada
+            os.makedirs(os.path.dirname(file_path) if os.path.dirname(file_path) else '.', exist_ok=True)
+            
+            # Penulis saling menunggu lewat kunci_file; pembaca tidak pernah
+            # menunggu karena file ditulis ke file sementara lalu di-rename
+            # (pembaca melihat file lama utuh atau file baru utuh)
+            with kunci_file(file_path):
+                path_tmp = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                # Simpan DataFrame ke file CSV dengan pandas
+                df.to_csv(path_tmp,
+                          index=False,          # tanpa index
+                          sep=';',              # gunakan pemisah titik koma
+                          encoding='utf-8-sig') # encoding UTF-8 dengan BOM
+                os.replace(path_tmp, file_path)
+                _TANDA_FILE_CSV[file_path] = tanda_file(file_path)
+                tulis_snapshot(file_path, df, _TANDA_FILE_CSV[file_path])
+                invalidasi_cache_data(file_path)
+            return True
+        except Exception as e:
+            print(f"Error saving {file_path}: {e}")
+            return False
+
+    def append(self, file_path, df_baru):
+        # Append-only: tulis baris baru di akhir file tanpa menulis ulang isinya
+        with kunci_file(file_path):
+            if _baca_header_csv(file_path) is None:
+                return self.save(file_path, df_baru)
+            if append_csv(file_path, df_baru):
+                return True
+            # Kolom baru belum ada di header: tulis ulang seluruh file
+            return super().append(file_path, df_baru)
+
+    def tail(self, file_path, n):
+        # Baca mundur dari akhir file: biaya tetap, tidak bergantung ukuran file
+        try:
+            df = baca_ekor_csv(file_path, n)
+        except Exception as e:
+            print(f"Warning: Gagal membaca ekor {file_path}, memuat seluruh file: {e}")
+            df = None
+        return df if df is not None else super().tail(file_path, n)
+
+    def id_berikutnya(self, file_path, kolom):
+        # Counter di-cache, recovery dari ekor file (lihat id_berikutnya_csv)
+        if _baca_header_csv(file_path) is None:
+            return 1
+        return id_berikutnya_csv(file_path, kolom)
+
+
+class SQLiteStorage(StorageEngine):
+    '''
+    Engine SQLite: satu database untuk semua tabel
+    ----------------------------------------------
+    - Primary key di ID / ID_Log / username, index di Jenis, Status,
+      Lokasi_Fisik dan ID_Dokumen (lihat SKEMA_SQLITE)
+    - Urutan baris mengikuti rowid, jadi tail() tetap = data terbaru
+    - File CSV lama di-migrasi otomatis saat tabel pertama kali diakses
+    '''
+    nama = 'sqlite'
+    pakai_indeks_memori = False     # lookup lewat primary key SQLite
+
+    def __init__(self):
+        self._tabel_siap = set()    # cache tabel yang sudah dicek/migrasi
+
+    def _db_path(self, file_path):
+        return os.path.join(os.path.dirname(file_path) or '.', SQLITE_DB_NAME)
+
+    def _nama_tabel(self, file_path):
+        return os.path.splitext(os.path.basename(file_path))[0]
+
+    def tanda(self, file_path):
+        # Database + file WAL (penulisan mode WAL belum tentu mengubah file .db)
+        db = self._db_path(file_path)
+        tanda_db = tanda_file(db)
+        if tanda_db is None:
+            return tanda_file(file_path)    # belum migrasi: ikuti file CSV
+        return (tanda_db, tanda_file(db + '-wal'))
+
+    def _connect(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self._db_path(file_path), timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')     # pembaca tidak menunggu penulis
+        return conn
+
+    def _tabel_ada(self, conn, tabel):
+        cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (tabel,))
+        return cur.fetchone() is not None
+
+    def _kolom_tabel(self, conn, tabel):
+        return [row[1] for row in conn.execute(f'PRAGMA table_info("{tabel}")')]
+
+    def _buat_tabel(self, conn, tabel, kolom):
+        # Buat tabel beserta primary key dan index sesuai SKEMA_SQLITE
+        skema = SKEMA_SQLITE.get(tabel, {'kunci': None, 'indeks': []})
+        definisi = []
+        for k in kolom:
+            tipe = 'INTEGER' if k in KOLOM_INTEGER else 'TEXT'
+            if k == skema['kunci']:
+                tipe += ' PRIMARY KEY'
+            definisi.append(f'"{k}" {tipe}')
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{tabel}" ({", ".join(definisi)})')
+        for k in skema['indeks']:
+            if k in kolom:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{tabel}_{k}" ON "{tabel}" ("{k}")')
+
+    def _pastikan_kolom(self, conn, tabel, kolom):
+        # Tambah kolom baru jika DataFrame punya kolom yang belum ada di tabel
+        ada = self._kolom_tabel(conn, tabel)
+        for k in kolom:
+            if k not in ada:
+                tipe = 'INTEGER' if k in KOLOM_INTEGER else 'TEXT'
+                conn.execute(f'ALTER TABLE "{tabel}" ADD COLUMN "{k}" {tipe}')
+
+    def _migrasi(self, conn, file_path, tabel):
+        # Migrasi data dari file CSV lama (hanya sekali, saat tabel belum ada)
+        kunci = (self._db_path(file_path), tabel)
+        if kunci in self._tabel_siap:
+            return
+        if not self._tabel_ada(conn, tabel) and os.path.exists(file_path):
+            df = _ENGINES['csv'].load(file_path)
+            if len(df.columns) > 0:
+                self._buat_tabel(conn, tabel, list(df.columns))
+                self._insert(conn, tabel, df)
+                conn.commit()
+                print(f"Migrasi {file_path} ke SQLite: {len(df)} baris")
+        self._tabel_siap.add(kunci)
+
+    def _insert(self, conn, tabel, df):
+        if len(df) == 0:
+            return
+        kolom = list(df.columns)
+        nama_kolom = ', '.join(f'"{k}"' for k in kolom)
+        placeholder = ', '.join('?' for _ in kolom)
+        # NaN diubah menjadi NULL
+        rows = df.astype(object).where(pd.notna(df), None).values.tolist()
+        conn.executemany(f'INSERT INTO "{tabel}" ({nama_kolom}) VALUES ({placeholder})', rows)
+
+    def _query(self, file_path, sql, params=()):
+        # Jalankan SELECT dan kembalikan DataFrame (kosong jika tabel tidak ada)
+        tabel = self._nama_tabel(file_path)
+        try:
+            with closing(self._connect(file_path)) as conn:
+                self._migrasi(conn, file_path, tabel)
+                if not self._tabel_ada(conn, tabel):
+                    return pd.DataFrame()
+                return pd.read_sql_query(sql.format(tabel=f'"{tabel}"'), conn, params=params)
         except Exception as e:
-            # jika gagal, kembalikan DataFrame kosong
             print(f"Error loading {file_path}: {e}")
             return pd.DataFrame()
-    
-    # jika file tidak ada, kembalikan DataFrame kosong
-    return pd.DataFrame()
 
+    def exists(self, file_path):
+        # Dianggap ada jika tabel sudah ada atau masih ada CSV yang akan dimigrasi
+        if os.path.exists(file_path):
+            return True
+        if not os.path.exists(self._db_path(file_path)):
+            return False
+        with closing(self._connect(file_path)) as conn:
+            return self._tabel_ada(conn, self._nama_tabel(file_path))
+
+    def load(self, file_path, kolom=None):
+        pilih = ', '.join(f'"{k}"' for k in kolom) if kolom else '*'
+        return self._query(file_path, f'SELECT {pilih} FROM {{tabel}} ORDER BY rowid')
+
+    def save(self, file_path, df):
+        # Ganti seluruh isi tabel dalam satu transaksi
+        tabel = self._nama_tabel(file_path)
+        try:
+            with closing(self._connect(file_path)) as conn:
+                self._migrasi(conn, file_path, tabel)
+                with conn:
+                    self._buat_tabel(conn, tabel, list(df.columns))
+                    self._pastikan_kolom(conn, tabel, list(df.columns))
+                    conn.execute(f'DELETE FROM "{tabel}"')
+                    self._insert(conn, tabel, df)
+            invalidasi_cache_data(file_path)
+            return True
+        except Exception as e:
+            print(f"Error saving {file_path}: {e}")
+            return False
+
+    def append(self, file_path, df_baru):
+        tabel = self._nama_tabel(file_path)
+        try:
+            with closing(self._connect(file_path)) as conn:
+                self._migrasi(conn, file_path, tabel)
+                with conn:
+                    self._buat_tabel(conn, tabel, list(df_baru.columns))
+                    self._pastikan_kolom(conn, tabel, list(df_baru.columns))
+                    self._insert(conn, tabel, df_baru)
+            invalidasi_cache_data(file_path)
+            return True
+        except Exception as e:
+            print(f"Error saving {file_path}: {e}")
+            return False
+
+    def tail(self, file_path, n):
+        df = self._query(file_path, 'SELECT * FROM {tabel} ORDER BY rowid DESC LIMIT ?', (int(n),))
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def nilai_maks(self, file_path, kolom):
+        df = self._query(file_path, f'SELECT MAX("{kolom}") AS maks FROM {{tabel}}')
+        if len(df) == 0 or pd.isna(df['maks'].iloc[0]):
+            return None
+        return df['maks'].iloc[0]
+
+    def get_by_key(self, file_path, kolom, nilai):
+        df = self._query(file_path, f'SELECT * FROM {{tabel}} WHERE "{kolom}" = ? LIMIT 1',
+                         (str(nilai).strip(),))
+        if len(df) > 0:
+            return df.iloc[0].to_dict()
+        return None
+
+    def update_by_key(self, file_path, kolom, nilai, data, posisi=None):
+        tabel = self._nama_tabel(file_path)
+        try:
+            with closing(self._connect(file_path)) as conn:
+                self._migrasi(conn, file_path, tabel)
+                if not self._tabel_ada(conn, tabel):
+                    return False
+                ada = self._kolom_tabel(conn, tabel)
+                data = {k: v for k, v in data.items() if k in ada}
+                if not data:
+                    return False
+                set_sql = ', '.join(f'"{k}" = ?' for k in data)
+                with conn:
+                    # rowid terkecil = baris pertama yang cocok (sama dengan engine CSV)
+                    cur = conn.execute(
+                        f'UPDATE "{tabel}" SET {set_sql} WHERE rowid = '
+                        f'(SELECT MIN(rowid) FROM "{tabel}" WHERE "{kolom}" = ?)',
+                        list(data.values()) + [str(nilai).strip()])
+                invalidasi_cache_data(file_path)
+                return cur.rowcount > 0
+        except Exception as e:
+            print(f"Error saving {file_path}: {e}")
+            return False
+
+    def delete_by_key(self, file_path, kolom, nilai, posisi=None):
+        tabel = self._nama_tabel(file_path)
+        try:
+            with closing(self._connect(file_path)) as conn:
+                self._migrasi(conn, file_path, tabel)
+                if not self._tabel_ada(conn, tabel):
+                    return 0
+                nilai = str(nilai).strip()
+                jumlah = conn.execute(f'SELECT COUNT(*) FROM "{tabel}" WHERE "{kolom}" = ?',
+                                      (nilai,)).fetchone()[0]
+                if jumlah != 1:
+                    return jumlah
+                with conn:
+                    conn.execute(f'DELETE FROM "{tabel}" WHERE "{kolom}" = ?', (nilai,))
+                invalidasi_cache_data(file_path)
+                return jumlah
+        except Exception as e:
+            print(f"Error saving {file_path}: {e}")
+            return 0
+
+
+# Daftar engine yang tersedia
+_ENGINES = {
+    'csv': CSVStorage(),
+    'sqlite': SQLiteStorage()
+}
+
+
+def get_storage():
+    # Ambil storage engine yang sedang aktif
+    return _ENGINES.get(STORAGE_ENGINE, _ENGINES['csv'])
+
+
+def set_storage(nama):
+    # Ganti storage engine aktif ('csv' atau 'sqlite')
+    global STORAGE_ENGINE
+    if nama not in _ENGINES:
+        raise ValueError(f"Storage engine tidak dikenal: {nama}")
+    STORAGE_ENGINE = nama
+
+# FUNGSI LOAD & SAVE DATA
+def load_data(file_path, kolom=None, ctx=None):
+    # Muat data dari storage engine aktif (DataFrame kosong jika gagal)
+    # kolom: muat hanya kolom tertentu, mis. ['Jenis', 'Status']
+    # ctx: KonteksData rerun ini, file yang sudah dimuat dipakai ulang
+    # Hasil dibagikan lewat cache proses, lihat muat_dengan_cache()
+    if ctx is not None:
+        return ctx.muat(file_path, kolom)
+    return muat_dengan_cache(get_storage(), file_path, kolom)
+
+
+def save_data(file_path, df):
+    '''
+    Simpan DataFrame ke storage engine aktif
+    DIPERBAIKI: Menambahkan try-except untuk penanganan error
+    '''
+    return get_storage().save(file_path, df)
+
+
+class KonteksData:
+    '''
+    Konteks data per rerun Streamlit (unit of work)
+    -----------------------------------------------
+    Dibuat sekali di awal rerun lalu diteruskan ke fungsi utils lewat
+    argumen ctx. Tiap file dimuat paling banyak sekali (lazy) dan dipakai
+    bersama semua helper di render yang sama, sehingga satu halaman melihat
+    satu versi data yang konsisten.
+    - Penulisan lewat utils di rerun yang sama menaikkan counter versi,
+      data file tersebut dimuat ulang saat diminta lagi
+    - Permintaan sebagian kolom dilayani dari data penuh yang sudah dimuat
+    '''
+
+    def __init__(self):
+        self.data = {}          # (path absolut, kolom) -> (counter versi, df)
+        self.dimuat = 0         # load yang benar-benar dijalankan
+        self.dihindari = 0      # load yang dilayani dari konteks
+
+    def muat(self, file_path, kolom=None):
+        path = os.path.abspath(file_path)
+        kunci = (path, tuple(kolom) if kolom else None)
+        versi = _counter_versi(file_path)
+        for k in (kunci, (path, None)):
+            entry = self.data.get(k)
+            if entry is None or entry[0] != versi:
+                continue
+            df = entry[1]
+            if k != kunci:
+                # proyeksi dari data penuh yang sudah dimuat
+                if any(c not in df.columns for c in kolom):
+                    continue
+                df = df[list(kolom)]
+            self.dihindari += 1
+            return df.copy()
+        
+        df = muat_dengan_cache(get_storage(), file_path, kolom, salin=False)
+        self.data[kunci] = (versi, df)
+        self.dimuat += 1
+        return df.copy()
+
+    def ekor(self, file_path, n):
+        # n baris terakhir dari data penuh yang sudah dimuat, None jika belum ada
+        entry = self.data.get((os.path.abspath(file_path), None))
+        if entry is None or entry[0] != _counter_versi(file_path):
+            return None
+        self.dihindari += 1
+        return entry[1].tail(n).copy()
+
+    def ringkasan(self):
+        # Jumlah file dimuat dan load yang dihindari di rerun ini
+        return {'dimuat': self.dimuat, 'dihindari': self.dihindari, 'file': len(self.data)}
+
+# FUNGSI INDEKS DATA
+'''
+Indeks di atas data (mis. master.csv) yang dipakai ulang antar rerun/sesi
+-------------------------------------------------------------------------
+- Posisi baris = urutan baris di DataFrame hasil load_data()
+- Divalidasi dengan tanda storage; jika file diubah di luar aplikasi,
+  indeks dibangun ulang secara lazy saat pertama kali dipakai
+- Setiap penulisan CRUD mengirim delta (tambah/ubah/hapus) ke indeks yang
+  sedang dimuat, jadi indeks tidak perlu dibangun ulang
+- Disimpan ke disk (data/<nama_file>.<nama_indeks>.idx) agar start cepat
+'''
+# Jeda minimal (detik) antar penyimpanan indeks ke disk setelah delta
+INDEKS_SIMPAN_DETIK = 5
+
+_INDEKS_AKTIF = {}                  # (path absolut, nama indeks) -> objek indeks
+_INDEKS_LOCK = threading.RLock()
+_JENIS_INDEKS = {}                  # nama indeks -> class
+
+
+class IndeksData(ABC):
+    '''
+    Base class indeks
+    -----------------
+    Turunan wajib mengimplementasikan bangun(df). Method delta
+    (tambah/ubah/hapus) mengembalikan False jika delta tidak bisa
+    diterapkan, sehingga indeks dibangun ulang dari data.
+    '''
+    nama = None
+    FORMAT = 1                      # naikkan jika isi pickle berubah (file lama dibangun ulang)
+
+    def __init__(self):
+        self.format_file = self.FORMAT
+        self.tanda = None           # tanda storage saat indeks sesuai data
+        self.engine = None          # nama storage engine
+        self.jumlah = 0             # jumlah baris yang diindeks
+        self.disimpan = 0.0         # waktu terakhir disimpan ke disk
+        self.kotor = False          # ada delta yang belum disimpan
+
+    @abstractmethod
+    def bangun(self, df):
+        ...
+
+    def tambah(self, df_baru):
+        # Baris baru di posisi self.jumlah .. self.jumlah + len(df_baru) - 1
+        return False
+
+    def ubah(self, pos, data):
+        # Kolom di data (dictionary) pada baris pos diubah
+        return False
+
+    def hapus(self, pos):
+        # Baris pos dihapus, baris sesudahnya bergeser satu posisi
+        return False
+
+    @staticmethod
+    def _perbesar(array, dipakai, minimal, isi):
+        # Array dengan kapasitas >= minimal (digandakan), isi [:dipakai] disalin
+        if minimal <= len(array):
+            return array
+        baru = np.full(max(minimal, len(array) * 2, 1024), isi, dtype=array.dtype)
+        baru[:dipakai] = array[:dipakai]
+        return baru
+
+
+def path_indeks(file_path, nama):
+    # data/master.csv + 'id' -> data/master.id.idx
+    return f"{os.path.splitext(file_path)[0]}.{nama}.idx"
+
+
+def _simpan_indeks(file_path, indeks):
+    # Simpan indeks ke disk (atomic: file sementara + os.replace)
+    path = path_indeks(file_path, indeks.nama)
+    path_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(path_tmp, 'wb') as f:
+            pickle.dump(indeks, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path_tmp, path)
+        indeks.disimpan = time.time()
+        indeks.kotor = False
+    except Exception as e:
+        print(f"Warning: Gagal menyimpan indeks {path}: {e}")
+
+
+def _muat_indeks(file_path, nama, tanda, engine):
+    # Muat indeks dari disk jika masih sesuai dengan data
+    path = path_indeks(file_path, nama)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            indeks = pickle.load(f)
+    except Exception as e:
+        print(f"Warning: Indeks {path} rusak, dibangun ulang: {e}")
+        return None
+    if not isinstance(indeks, _JENIS_INDEKS[nama]) or indeks.tanda != tanda or indeks.engine != engine:
+        return None
+    if getattr(indeks, 'format_file', 1) != indeks.FORMAT:
+        return None
+    return indeks
+
+
+def ambil_indeks(file_path, nama, ctx=None):
+    '''
+    Ambil indeks yang sesuai dengan isi data saat ini
+    Urutan: memori -> file .idx di disk -> bangun ulang dari load_data()
+    ctx: KonteksData rerun ini, dipakai jika indeks harus dibangun ulang
+    '''
+    storage = get_storage()
+    kunci = (os.path.abspath(file_path), nama)
+    tanda = storage.tanda(file_path)
+    with _INDEKS_LOCK:
+        indeks = _INDEKS_AKTIF.get(kunci)
+        if indeks is not None and tanda is not None and indeks.tanda == tanda and indeks.engine == storage.nama:
+            return indeks
+        
+        indeks = _muat_indeks(file_path, nama, tanda, storage.nama)
+        if indeks is None:
+            indeks = _JENIS_INDEKS[nama]()
+            indeks.bangun(load_data(file_path, ctx=ctx))
+            indeks.tanda = tanda
+            indeks.engine = storage.nama
+            if tanda is not None:
+                _simpan_indeks(file_path, indeks)
+        _INDEKS_AKTIF[kunci] = indeks
+        return indeks
+
+
+def indeks_dimuat(file_path):
+    # True jika ada indeks milik file_path yang sedang dimuat di memori
+    path = os.path.abspath(file_path)
+    with _INDEKS_LOCK:
+        return any(kunci[0] == path for kunci in _INDEKS_AKTIF)
+
+
+def kabari_indeks(file_path, tanda_lama, aksi, *args):
+    '''
+    Terapkan delta penulisan ke semua indeks milik file_path yang sedang dimuat
+    aksi: 'tambah' (df_baru), 'ubah' (pos, data) atau 'hapus' (pos)
+    tanda_lama = tanda storage sebelum penulisan; panggil di dalam kunci_file()
+    '''
+    path = os.path.abspath(file_path)
+    tanda_baru = get_storage().tanda(file_path)
+    with _INDEKS_LOCK:
+        for kunci, indeks in list(_INDEKS_AKTIF.items()):
+            if kunci[0] != path:
+                continue
+            if (indeks.tanda != tanda_lama or any(a is None for a in args)
+                    or not getattr(indeks, aksi)(*args)):
+                # indeks sudah basi / delta tidak didukung: bangun ulang nanti
+                del _INDEKS_AKTIF[kunci]
+                continue
+            indeks.tanda = tanda_baru
+            indeks.kotor = True
+            if time.time() - indeks.disimpan >= INDEKS_SIMPAN_DETIK:
+                _simpan_indeks(file_path, indeks)
+
+
+@atexit.register
+def _simpan_semua_indeks():
+    # Simpan delta indeks yang belum tertulis saat proses berhenti
+    with _INDEKS_LOCK:
+        for (path, nama), indeks in _INDEKS_AKTIF.items():
+            if indeks.kotor:
+                _simpan_indeks(path, indeks)
+
+
+class IndeksID(IndeksData):
+    '''
+    Hash index ID dokumen -> posisi baris, lookup O(1)
+    ID yang muncul lebih dari sekali dicatat di 'duplikat' (posisi = kemunculan pertama)
+    '''
+    nama = 'id'
+
+    def bangun(self, df):
+        self.ids = df['ID'].astype(str).str.strip().tolist() if 'ID' in df.columns else []
+        self.posisi = {}
+        self.duplikat = set()
+        for pos, id_dokumen in enumerate(self.ids):
+            if id_dokumen in self.posisi:
+                self.duplikat.add(id_dokumen)
+            else:
+                self.posisi[id_dokumen] = pos
+        self.jumlah = len(df)
+
+    def cari(self, id_dokumen):
+        # Posisi baris untuk ID, None jika tidak ada
+        return self.posisi.get(str(id_dokumen).strip())
+
+    def tambah(self, df_baru):
+        if 'ID' not in df_baru.columns:
+            return False
+        for id_dokumen in df_baru['ID'].astype(str).str.strip():
+            if id_dokumen in self.posisi:
+                self.duplikat.add(id_dokumen)
+            else:
+                self.posisi[id_dokumen] = len(self.ids)
+            self.ids.append(id_dokumen)
+        self.jumlah = len(self.ids)
+        return True
+
+    def ubah(self, pos, data):
+        # ID tidak berubah: posisi tetap sama
+        return 'ID' not in data
+
+    def hapus(self, pos):
+        if pos >= len(self.ids) or self.ids[pos] in self.duplikat:
+            return False
+        del self.posisi[self.ids.pop(pos)]
+        for p in range(pos, len(self.ids)):
+            self.posisi[self.ids[p]] = p
+        self.jumlah = len(self.ids)
+        return True
+
+
+_JENIS_INDEKS[IndeksID.nama] = IndeksID
+
+
+'''
+Indeks teks (inverted index) untuk pencarian dokumen
+----------------------------------------------------
+- Kata dinormalisasi: huruf kecil, aksen dihapus, hanya huruf/angka
+- Stemming sederhana bahasa Indonesia (partikel, kata ganti, -kan/-an,
+  awalan me-/pe-/ber-/ter-/di-/ke-/se-), kata asli tetap ikut diindeks
+- Kata terakhir di query dicocokkan sebagai prefix (cari sambil mengetik)
+- Skor = jumlah idf x bobot kolom; kecocokan di ID/Judul lebih tinggi
+'''
+# Kolom yang diindeks beserta bobot relevansinya
+BOBOT_KOLOM_TEKS = {
+    'ID': 5.0,
+    'Judul': 3.0,
+    'Jenis': 2.0,
+    'Lokasi_Fisik': 1.5,
+    'Keterangan': 1.0
+}
+
+# Batas jumlah kata kosakata yang dipakai untuk satu prefix
+PREFIX_MAKS = 200
+
+_PARTIKEL = ('lah', 'kah', 'tah', 'pun')
+_KATA_GANTI = ('nya', 'ku', 'mu')
+_AKHIRAN = ('kan', 'an')
+_AWALAN = ('meng', 'meny', 'mem', 'men', 'me', 'peng', 'peny', 'pem', 'pen', 'per', 'pe',
+           'ber', 'be', 'ter', 'di', 'ke', 'se')
+
+
+def normalisasi_teks(teks):
+    # Teks -> list kata (huruf kecil, tanpa aksen, hanya huruf dan angka)
+    if teks is None or (isinstance(teks, float) and math.isnan(teks)):
+        return []
+    teks = unicodedata.normalize('NFKD', str(teks)).encode('ascii', 'ignore').decode('ascii')
+    return re.findall(r'[a-z0-9]+', teks.lower())
+
+
+@lru_cache(maxsize=65536)
+def stem_kata(kata):
+    # Stemming sederhana: buang imbuhan selama sisa kata minimal 4 huruf
+    if len(kata) <= 4 or not kata.isalpha():
+        return kata
+    for daftar in (_PARTIKEL, _KATA_GANTI, _AKHIRAN):
+        for imbuhan in daftar:
+            if kata.endswith(imbuhan) and len(kata) - len(imbuhan) >= 4:
+                kata = kata[:-len(imbuhan)]
+                break
+    for awalan in _AWALAN:
+        if kata.startswith(awalan) and len(kata) - len(awalan) >= 4:
+            return kata[len(awalan):]
+    return kata
+
+
+@lru_cache(maxsize=65536)
+def _kata_indeks_teks(teks):
+    hasil = []
+    for kata in normalisasi_teks(teks):
+        hasil.append(kata)
+        stem = stem_kata(kata)
+        if stem != kata:
+            hasil.append(stem)
+        if not kata.isalpha() and not kata.isdigit():
+            hasil.extend(re.findall(r'[a-z]+|[0-9]+', kata))
+    return tuple(hasil)
+
+
+def kata_indeks(teks):
+    '''
+    Daftar term untuk diindeks: kata asli, hasil stem, dan potongan
+    huruf/angka dari kata campuran (doc001 -> doc001, doc, 001)
+    Nilai yang sering berulang (Jenis, Lokasi) cukup diproses sekali.
+    '''
+    if teks is None or (isinstance(teks, float) and math.isnan(teks)):
+        return ()
+    return _kata_indeks_teks(str(teks))
+
+
+class IndeksTeks(IndeksData):
+    '''
+    Inverted index term -> {ID dokumen: bobot} untuk cari_dokumen()
+    Posting memakai ID dokumen (bukan posisi), jadi hapus baris tidak
+    perlu menggeser posting.
+    '''
+    nama = 'teks'
+
+    def bangun(self, df):
+        self.postings = {}          # term -> {ID: bobot}
+        self.dokumen = {}           # ID -> {kolom: tuple term} (untuk delta)
+        self.ids = []               # ID per posisi baris
+        self.duplikat = set()
+        self._kosakata = None       # daftar term terurut (dibuat saat dibutuhkan)
+        self.jumlah = 0
+        return self.tambah(df)
+
+    def _indeks_kolom(self, id_dokumen, kolom, nilai):
+        terms = kata_indeks(nilai)
+        bobot = BOBOT_KOLOM_TEKS[kolom]
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                self._kosakata = None
+            posting[id_dokumen] = posting.get(id_dokumen, 0.0) + bobot
+        self.dokumen[id_dokumen][kolom] = terms
+
+    def _hapus_kolom(self, id_dokumen, kolom):
+        bobot = BOBOT_KOLOM_TEKS[kolom]
+        for term in self.dokumen[id_dokumen].pop(kolom, ()):
+            posting = self.postings.get(term)
+            if posting is None or id_dokumen not in posting:
+                continue
+            posting[id_dokumen] -= bobot
+            if posting[id_dokumen] <= 1e-9:
+                del posting[id_dokumen]
+                if not posting:
+                    del self.postings[term]
+                    self._kosakata = None
+
+    def tambah(self, df_baru):
+        if 'ID' not in df_baru.columns:
+            return False
+        kolom_ada = [k for k in BOBOT_KOLOM_TEKS if k in df_baru.columns]
+        for row in df_baru[kolom_ada].itertuples(index=False):
+            row = dict(zip(kolom_ada, row))
+            id_dokumen = str(row['ID']).strip()
+            self.ids.append(id_dokumen)
+            if id_dokumen in self.dokumen:
+                # ID ganda: posting digabung, hapus/ubah memicu bangun ulang
+                self.duplikat.add(id_dokumen)
+                continue
+            self.dokumen[id_dokumen] = {}
+            for kolom in kolom_ada:
+                self._indeks_kolom(id_dokumen, kolom, row[kolom])
+        self.jumlah = len(self.ids)
+        return True
+
+    def ubah(self, pos, data):
+        if 'ID' in data or pos >= len(self.ids) or self.ids[pos] in self.duplikat:
+            return False
+        id_dokumen = self.ids[pos]
+        for kolom, nilai in data.items():
+            if kolom in BOBOT_KOLOM_TEKS:
+                self._hapus_kolom(id_dokumen, kolom)
+                self._indeks_kolom(id_dokumen, kolom, nilai)
+        return True
+
+    def hapus(self, pos):
+        if pos >= len(self.ids) or self.ids[pos] in self.duplikat:
+            return False
+        id_dokumen = self.ids.pop(pos)
+        for kolom in list(self.dokumen[id_dokumen]):
+            self._hapus_kolom(id_dokumen, kolom)
+        del self.dokumen[id_dokumen]
+        self.jumlah = len(self.ids)
+        return True
+
+    def _kandidat_prefix(self, prefix):
+        # Term kosakata yang diawali prefix (paling banyak PREFIX_MAKS, df terbesar)
+        if self._kosakata is None:
+            self._kosakata = sorted(self.postings)
+        awal = bisect.bisect_left(self._kosakata, prefix)
+        akhir = bisect.bisect_left(self._kosakata, prefix + '\x7f')
+        kandidat = self._kosakata[awal:akhir]
+        if len(kandidat) > PREFIX_MAKS:
+            kandidat = sorted(kandidat, key=lambda t: -len(self.postings[t]))[:PREFIX_MAKS]
+        return kandidat
+
+    def cari(self, query, prefix=True):
+        '''
+        Cari dokumen yang mengandung semua kata di query (AND)
+        prefix=True: kata terakhir dicocokkan sebagai awalan kata
+        Return list (ID, skor) urut dari skor tertinggi
+        '''
+        kata_query = normalisasi_teks(query)
+        if not kata_query:
+            return []
+        total = max(len(self.dokumen), 1)
+        skor = None
+        for i, kata in enumerate(kata_query):
+            terms = {kata, stem_kata(kata)}
+            if prefix and i == len(kata_query) - 1:
+                terms.update(self._kandidat_prefix(kata))
+            
+            # Skor kata ini per dokumen = skor term terbaik yang cocok
+            skor_kata = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + total / len(posting))
+                for id_dokumen, bobot in posting.items():
+                    nilai = idf * bobot
+                    if nilai > skor_kata.get(id_dokumen, 0.0):
+                        skor_kata[id_dokumen] = nilai
+            
+            if skor is None:
+                skor = skor_kata
+            else:
+                skor = {d: skor[d] + skor_kata[d] for d in skor.keys() & skor_kata.keys()}
+            if not skor:
+                return []
+        return sorted(skor.items(), key=lambda x: (-x[1], x[0]))
+
+
+_JENIS_INDEKS[IndeksTeks.nama] = IndeksTeks
+
+
+'''
+Indeks trigram untuk pencarian toleran salah ketik
+--------------------------------------------------
+- Judul + Keterangan dipecah menjadi trigram per kata (' notulen ' -> ' no',
+  'not', ..., 'en '); posting tiap trigram berupa array numpy int32
+- Skor = bagian trigram query yang ada di dokumen (0..1), dihitung sekaligus
+  untuk semua dokumen dengan np.bincount; ambang diatur lewat
+  SMDOK_FUZZY_AMBANG (default 0.6)
+- 'notulem rapat' tetap menemukan 'Notulen Rapat'
+'''
+FUZZY_AMBANG = float(os.environ.get('SMDOK_FUZZY_AMBANG', '0.6'))
+
+# Kolom yang diindeks trigram
+KOLOM_TRIGRAM = ('Judul', 'Keterangan')
+
+
+def trigram_teks(teks):
+    # Himpunan trigram dari semua kata di teks (kata diberi spasi di kiri-kanan)
+    hasil = set()
+    for kata in normalisasi_teks(teks):
+        kata = f" {kata} "
+        hasil.update(kata[i:i + 3] for i in range(len(kata) - 2))
+    return hasil
+
+
+def _gabung_teks_trigram(nilai):
+    # Teks yang diindeks trigram dari {kolom: nilai}, urut sesuai KOLOM_TRIGRAM
+    return ' '.join(str(nilai[k]) for k in KOLOM_TRIGRAM if k in nilai and pd.notna(nilai[k]))
+
+
+class IndeksTrigram(IndeksData):
+    '''
+    Inverted index trigram -> array slot dokumen
+    Tiap versi dokumen menempati satu slot; update/hapus hanya menandai slot
+    lama tidak aktif. Jika slot mati terlalu banyak, delta ditolak sehingga
+    indeks dibangun ulang (dipadatkan).
+    Array per slot (n_trigram, aktif) punya kapasitas cadangan (digandakan
+    saat penuh), hanya [:len(ids)] yang berlaku.
+    '''
+    nama = 'trigram'
+    FORMAT = 2
+
+    def bangun(self, df):
+        self.ids = []               # ID dokumen per slot
+        self.teks = []              # {kolom: nilai} per slot, untuk delta ubah
+        self.slot = {}              # ID -> slot aktif
+        self.urutan = []            # slot per posisi baris
+        self.duplikat = set()
+        self.postings = {}          # trigram -> np.ndarray slot (int32)
+        self._buffer = {}           # trigram -> list slot baru (digabung saat dicari)
+        
+        daftar = {}
+        n_trigram = []
+        kolom_ada = [k for k in KOLOM_TRIGRAM if k in df.columns]
+        ids = df['ID'].astype(str).str.strip().tolist() if 'ID' in df.columns else [''] * len(df)
+        teks = zip(*[df[k].tolist() for k in kolom_ada]) if kolom_ada else [()] * len(df)
+        for id_dokumen, nilai in zip(ids, teks):
+            nilai = dict(zip(kolom_ada, nilai))
+            slot = self._slot_baru(id_dokumen, nilai)
+            trigram = trigram_teks(_gabung_teks_trigram(nilai))
+            n_trigram.append(len(trigram))
+            for t in trigram:
+                daftar.setdefault(t, []).append(slot)
+        self.postings = {t: np.array(v, dtype=np.int32) for t, v in daftar.items()}
+        self.n_trigram = np.array(n_trigram, dtype=np.int32)
+        self.aktif = np.ones(len(self.ids), dtype=bool)
+        self.jumlah = len(self.urutan)
+
+    def _slot_baru(self, id_dokumen, nilai):
+        slot = len(self.ids)
+        self.ids.append(id_dokumen)
+        self.teks.append(nilai)
+        if id_dokumen in self.slot:
+            self.duplikat.add(id_dokumen)
+        self.slot[id_dokumen] = slot
+        self.urutan.append(slot)
+        return slot
+
+    def _tambah_slot(self, id_dokumen, nilai):
+        # Slot baru lewat delta: posting masuk buffer dulu
+        slot = self._slot_baru(id_dokumen, nilai)
+        trigram = trigram_teks(_gabung_teks_trigram(nilai))
+        for t in trigram:
+            self._buffer.setdefault(t, []).append(slot)
+        if slot >= len(self.aktif):
+            # Penuh: gandakan kapasitas (biaya salin teramortisasi O(1) per slot)
+            kapasitas = max(slot + 1, len(self.aktif) * 2, 1024)
+            n_trigram = np.zeros(kapasitas, dtype=np.int32)
+            n_trigram[:slot] = self.n_trigram[:slot]
+            aktif = np.zeros(kapasitas, dtype=bool)
+            aktif[:slot] = self.aktif[:slot]
+            self.n_trigram, self.aktif = n_trigram, aktif
+        self.n_trigram[slot] = len(trigram)
+        self.aktif[slot] = True
+        return slot
+
+    def _terlalu_banyak_slot_mati(self):
+        mati = len(self.ids) - len(self.urutan)
+        return mati > max(1000, len(self.urutan) // 2)
+
+    def tambah(self, df_baru):
+        if 'ID' not in df_baru.columns:
+            return False
+        kolom_ada = [k for k in KOLOM_TRIGRAM if k in df_baru.columns]
+        for row in df_baru[['ID'] + kolom_ada].itertuples(index=False):
+            self._tambah_slot(str(row[0]).strip(), dict(zip(kolom_ada, row[1:])))
+        self.jumlah = len(self.urutan)
+        return True
+
+    def ubah(self, pos, data):
+        if 'ID' in data or pos >= len(self.urutan):
+            return False
+        if not any(k in data for k in KOLOM_TRIGRAM):
+            return True
+        lama = self.urutan[pos]
+        if self.ids[lama] in self.duplikat or self._terlalu_banyak_slot_mati():
+            return False
+        id_dokumen = self.ids[lama]
+        # Kolom yang tidak ada di slot lama (mis. indeks dibangun tanpa
+        # Keterangan) tetap ikut diindeks jika diubah
+        nilai = {**self.teks[lama], **{k: data[k] for k in KOLOM_TRIGRAM if k in data}}
+        self.aktif[lama] = False
+        del self.slot[id_dokumen]
+        baru = self._tambah_slot(id_dokumen, nilai)
+        self.urutan.pop()       # _tambah_slot menaruh slot baru di akhir urutan
+        self.urutan[pos] = baru
+        return True
+
+    def hapus(self, pos):
+        if pos >= len(self.urutan):
+            return False
+        slot = self.urutan[pos]
+        if self.ids[slot] in self.duplikat or self._terlalu_banyak_slot_mati():
+            return False
+        self.urutan.pop(pos)
+        self.aktif[slot] = False
+        del self.slot[self.ids[slot]]
+        self.jumlah = len(self.urutan)
+        return True
+
+    def _posting(self, t):
+        # Posting trigram; buffer delta digabung ke array numpy saat pertama dicari
+        tambahan = self._buffer.pop(t, None)
+        if tambahan is not None:
+            lama = self.postings.get(t)
+            baru = np.array(tambahan, dtype=np.int32)
+            self.postings[t] = baru if lama is None else np.concatenate([lama, baru])
+        return self.postings.get(t)
+
+    def cari(self, query, ambang=None):
+        '''
+        Cari dokumen yang mirip query (toleran salah ketik)
+        ambang: skor minimal 0..1 (default FUZZY_AMBANG)
+        Return list (ID, skor) urut dari skor tertinggi
+        '''
+        ambang = FUZZY_AMBANG if ambang is None else ambang
+        trigram_query = trigram_teks(query)
+        if not trigram_query or len(self.ids) == 0:
+            return []
+        posting = [p for p in (self._posting(t) for t in trigram_query) if p is not None]
+        if not posting:
+            return []
+        cocok = np.bincount(np.concatenate(posting), minlength=len(self.ids))
+        skor = cocok / len(trigram_query)
+        kandidat = np.nonzero((skor >= ambang) & self.aktif[:len(self.ids)])[0]
+        if len(kandidat) == 0:
+            return []
+        # Urut: skor tertinggi, lalu dokumen yang lebih mirip secara keseluruhan (Jaccard)
+        jaccard = cocok[kandidat] / (len(trigram_query) + self.n_trigram[kandidat] - cocok[kandidat])
+        urutan = np.lexsort((-jaccard, -skor[kandidat]))
+        return [(self.ids[s], float(skor[s])) for s in kandidat[urutan]]
+
+
+_JENIS_INDEKS[IndeksTrigram.nama] = IndeksTrigram
+
+
+# Kolom kategori yang punya bitmap faset (filter dropdown + hitungan)
+KOLOM_FASET = ('Jenis', 'Status', 'Lokasi_Fisik')
+
+
+class IndeksFaset(IndeksData):
+    '''
+    Bitmap per nilai kolom kategori: bitmap[kolom][nilai] = array bool per slot baris
+    ---------------------------------------------------------------------------------
+    - Filter gabungan = irisan bitmap (&), tanpa membandingkan isi kolom
+    - Hitungan per nilai = jumlah bit aktif (np.count_nonzero) setelah diiris
+      dengan mask pencarian, jadi tidak perlu scan ulang data
+    - urutan = slot per posisi baris; baris yang dihapus meninggalkan slot
+      mati (semua bitnya dimatikan), bitmap tidak pernah digeser saat hapus.
+      Jika slot mati terlalu banyak, delta ditolak sehingga indeks dibangun
+      ulang (dipadatkan)
+    - Array bitmap dan urutan punya kapasitas cadangan (digandakan saat penuh),
+      hanya [:slot_terpakai] / [:jumlah] yang berlaku
+    '''
+    nama = 'faset'
+    FORMAT = 2
+
+    def bangun(self, df):
+        self.bitmap = {kolom: {} for kolom in KOLOM_FASET}
+        self.jumlah = len(df)
+        self.kapasitas = len(df)
+        self.slot_terpakai = len(df)
+        self.urutan = np.arange(len(df), dtype=np.int32)
+        for kolom in KOLOM_FASET:
+            if kolom not in df.columns:
+                continue
+            kode, nilai_unik = pd.factorize(df[kolom])
+            for i, nilai in enumerate(nilai_unik):
+                self.bitmap[kolom][str(nilai)] = kode == i
+
+    def _per_posisi(self, bitmap):
+        # Bitmap slot -> bitmap per posisi baris (tanpa salin jika belum ada slot mati)
+        if self.slot_terpakai == self.jumlah:
+            return bitmap[:self.jumlah]
+        return bitmap[self.urutan[:self.jumlah]]
+
+    def ambil(self, kolom, nilai):
+        # Bitmap baris dengan kolom == nilai (array kosong/False jika tidak ada)
+        bitmap = self.bitmap.get(kolom, {}).get(str(nilai))
+        return self._per_posisi(bitmap) if bitmap is not None else np.zeros(self.jumlah, dtype=bool)
+
+    def semua(self, kolom):
+        # {nilai: bitmap} semua nilai kolom (sepanjang jumlah baris)
+        return {nilai: self._per_posisi(bitmap) for nilai, bitmap in self.bitmap.get(kolom, {}).items()}
+
+    def hitung(self, kolom, mask=None):
+        # Jumlah baris per nilai kolom, opsional hanya di baris mask
+        hasil = {}
+        for nilai, bitmap in self.bitmap.get(kolom, {}).items():
+            # Slot mati tidak punya bit aktif, jadi tanpa mask cukup hitung per slot
+            jumlah = np.count_nonzero(bitmap[:self.slot_terpakai] if mask is None
+                                      else self._per_posisi(bitmap) & mask)
+            if jumlah > 0:
+                hasil[nilai] = int(jumlah)
+        return hasil
+
+    def _set(self, kolom, nilai, slot):
+        if pd.isna(nilai):
+            return
+        nilai = str(nilai)
+        if nilai not in self.bitmap[kolom]:
+            self.bitmap[kolom][nilai] = np.zeros(self.kapasitas, dtype=bool)
+        self.bitmap[kolom][nilai][slot] = True
+
+    def tambah(self, df_baru):
+        n = len(df_baru)
+        awal = self.slot_terpakai
+        if awal + n > self.kapasitas:
+            # Penuh: gandakan kapasitas (biaya salin teramortisasi O(1) per baris)
+            for kolom in KOLOM_FASET:
+                for nilai, bitmap in self.bitmap[kolom].items():
+                    self.bitmap[kolom][nilai] = self._perbesar(bitmap, awal, awal + n, False)
+            self.kapasitas = max(awal + n, self.kapasitas * 2, 1024)
+        self.urutan = self._perbesar(self.urutan, self.jumlah, self.jumlah + n, 0)
+        self.urutan[self.jumlah:self.jumlah + n] = np.arange(awal, awal + n, dtype=np.int32)
+        self.slot_terpakai += n
+        self.jumlah += n
+        for kolom in KOLOM_FASET:
+            if kolom in df_baru.columns:
+                for i, nilai in enumerate(df_baru[kolom].tolist()):
+                    self._set(kolom, nilai, awal + i)
+        return True
+
+    def _kosongkan_slot(self, slot, kolom):
+        for bitmap in self.bitmap[kolom].values():
+            bitmap[slot] = False
+
+    def ubah(self, pos, data):
+        if pos >= self.jumlah:
+            return False
+        slot = self.urutan[pos]
+        for kolom in KOLOM_FASET:
+            if kolom in data:
+                self._kosongkan_slot(slot, kolom)
+                self._set(kolom, data[kolom], slot)
+        return True
+
+    def hapus(self, pos):
+        mati = self.slot_terpakai - self.jumlah
+        if pos >= self.jumlah or mati > max(1000, self.jumlah // 2):
+            return False
+        slot = self.urutan[pos]
+        for kolom in KOLOM_FASET:
+            self._kosongkan_slot(slot, kolom)
+        # Geser posisi sesudah pos di tempat; slot lama jadi slot mati
+        self.urutan[pos:self.jumlah - 1] = self.urutan[pos + 1:self.jumlah]
+        self.jumlah -= 1
+        return True
+
+
+_JENIS_INDEKS[IndeksFaset.nama] = IndeksFaset
+
+
+# Nama kolom -> nama kunci di hasil get_statistik
+KOLOM_STATISTIK = {'Jenis': 'per_jenis', 'Status': 'per_status', 'Lokasi_Fisik': 'per_lokasi'}
+
+
+class IndeksStatistik(IndeksData):
+    '''
+    Counter statistik dokumen (total, per_jenis, per_status, per_lokasi)
+    --------------------------------------------------------------------
+    - hitungan[kolom][nilai] diperbarui dari delta tambah/ubah/hapus, jadi
+      get_statistik cukup membaca counter (O(1), tanpa value_counts)
+    - kode[kolom] = kode nilai per slot (-1 = kosong), dibutuhkan untuk tahu
+      counter mana yang dikurangi saat baris diubah/dihapus
+    - urutan = slot per posisi baris; baris yang dihapus meninggalkan slot
+      mati, array kode tidak pernah disalin saat hapus. Jika slot mati
+      terlalu banyak, delta ditolak sehingga indeks dibangun ulang (dipadatkan)
+    - Array kode dan urutan punya kapasitas cadangan (digandakan saat penuh)
+    '''
+    nama = 'statistik'
+    FORMAT = 2
+
+    def bangun(self, df):
+        self.jumlah = len(df)
+        self.total = len(df) if any(kolom in df.columns for kolom in KOLOM_STATISTIK) else 0
+        self.slot_terpakai = len(df)
+        self.urutan = np.arange(len(df), dtype=np.int32)
+        self.nilai = {kolom: [] for kolom in KOLOM_STATISTIK}          # kode -> nilai
+        self.kode_nilai = {kolom: {} for kolom in KOLOM_STATISTIK}     # nilai -> kode
+        self.kode = {kolom: np.full(len(df), -1, dtype=np.int32) for kolom in KOLOM_STATISTIK}
+        self.hitungan = {kolom: {} for kolom in KOLOM_STATISTIK}
+        for kolom in KOLOM_STATISTIK:
+            if kolom not in df.columns:
+                continue
+            kode, nilai_unik = pd.factorize(df[kolom])
+            self.nilai[kolom] = [str(n) for n in nilai_unik]
+            self.kode_nilai[kolom] = {n: i for i, n in enumerate(self.nilai[kolom])}
+            self.kode[kolom] = kode.astype(np.int32)
+            jumlah = np.bincount(kode[kode >= 0], minlength=len(nilai_unik))
+            self.hitungan[kolom] = {n: int(j) for n, j in zip(self.nilai[kolom], jumlah) if j > 0}
+
+    def _kode_nilai(self, kolom, nilai):
+        # Kode untuk nilai (ditambahkan jika nilai baru), -1 untuk nilai kosong
+        if pd.isna(nilai):
+            return -1
+        nilai = str(nilai)
+        if nilai not in self.kode_nilai[kolom]:
+            self.kode_nilai[kolom][nilai] = len(self.nilai[kolom])
+            self.nilai[kolom].append(nilai)
+        return self.kode_nilai[kolom][nilai]
+
+    def _geser(self, kolom, kode, arah):
+        # Tambah/kurangi counter nilai dengan kode tersebut
+        if kode < 0:
+            return
+        nilai = self.nilai[kolom][kode]
+        jumlah = self.hitungan[kolom].get(nilai, 0) + arah
+        if jumlah > 0:
+            self.hitungan[kolom][nilai] = jumlah
+        else:
+            self.hitungan[kolom].pop(nilai, None)
+
+    def tambah(self, df_baru):
+        n = len(df_baru)
+        awal = self.slot_terpakai
+        for kolom in KOLOM_STATISTIK:
+            isi = df_baru[kolom].tolist() if kolom in df_baru.columns else [None] * n
+            kode = np.array([self._kode_nilai(kolom, v) for v in isi], dtype=np.int32)
+            for k in kode:
+                self._geser(kolom, k, 1)
+            self.kode[kolom] = self._perbesar(self.kode[kolom], awal, awal + n, -1)
+            self.kode[kolom][awal:awal + n] = kode
+        self.urutan = self._perbesar(self.urutan, self.jumlah, self.jumlah + n, 0)
+        self.urutan[self.jumlah:self.jumlah + n] = np.arange(awal, awal + n, dtype=np.int32)
+        self.slot_terpakai += n
+        self.jumlah += n
+        self.total = self.jumlah
+        return True
+
+    def ubah(self, pos, data):
+        if pos >= self.jumlah:
+            return False
+        slot = self.urutan[pos]
+        for kolom in KOLOM_STATISTIK:
+            if kolom in data:
+                self._geser(kolom, self.kode[kolom][slot], -1)
+                self.kode[kolom][slot] = self._kode_nilai(kolom, data[kolom])
+                self._geser(kolom, self.kode[kolom][slot], 1)
+        return True
+
+    def hapus(self, pos):
+        mati = self.slot_terpakai - self.jumlah
+        if pos >= self.jumlah or mati > max(1000, self.jumlah // 2):
+            return False
+        slot = self.urutan[pos]
+        for kolom in KOLOM_STATISTIK:
+            self._geser(kolom, self.kode[kolom][slot], -1)
+        # Geser posisi sesudah pos di tempat; slot lama jadi slot mati
+        self.urutan[pos:self.jumlah - 1] = self.urutan[pos + 1:self.jumlah]
+        self.jumlah -= 1
+        self.total = self.jumlah
+        return True
+
+
+_JENIS_INDEKS[IndeksStatistik.nama] = IndeksStatistik
+
+
+# FUNGSI INISIALISASI
+def init_folders():
+    """
+    Buat folder yang diperlukan
+    ---------------------------
+    Folder yang dibuat:
+    - data/: untuk menyimpan file data CSV 
+    - qr/: untuk menyimpan file QR code
+    """
+    os.makedirs("data", exist_ok=True)  # buat folder data jika belum ada
+    os.makedirs("qr", exist_ok=True)    # buat folder qr jika belum ada
+
+
+def init_master_csv(file_path):
+    # Inisialisasi file master dokumen
+    if not get_storage().exists(file_path):
+        # file belum ada, buat baru dengan kolom yang sudah didefinisikan
+        df = pd.DataFrame(columns=COLUMNS_MASTER)
+        save_data(file_path, df)
+    
+    # Data lama tanpa kolom Versi: tambahkan sekali dengan versi awal 1
+    with kunci_file(file_path):
+        df = load_data(file_path)
+        if len(df.columns) > 0 and 'Versi' not in df.columns:
+            df = df.copy()
+            df['Versi'] = 1
+            save_data(file_path, df)
+    return load_data(file_path)
+
+
+def init_log_csv(file_path):
+    # Inisialisasi file log aktivitas
+    if not get_storage().exists(file_path):
+        df = pd.DataFrame(columns=COLUMNS_LOG)
+        save_data(file_path, df)
+    # Pindahkan log periode lama ke partisi arsip (lihat rotasi_log)
+    rotasi_log(file_path)
+    return load_data(file_path)
+
+
+def init_users_csv(file_path):
+    """
+    Inisialisasi file users dengan default users (admin, staff)
+    """
+    if not get_storage().exists(file_path):
+        # Buat user default: admin, staff
+        df = pd.DataFrame({
+            'username': ['admin', 'staff'],
+            'password': ['admin123', 'staff123'],
+            'role': ['admin', 'staff']
+        })
+        save_data(file_path, df)
+    return load_data(file_path)
+
+# FUNGSI GENERATE ID
+'''
+Alokasi ID dengan sequence persisten (data/sequences.json)
+----------------------------------------------------------
+- Nomor terakhir tiap sequence disimpan di file, dilindungi kunci_file(),
+  sehingga dua sesi tidak pernah mendapat ID yang sama
+- O(1): tidak perlu memuat master.csv / log.csv (kecuali seed pertama kali)
+- Pengaman edit di luar aplikasi: sequence menyimpan tanda master saat
+  alokasi, digeser oleh setiap penulisan aplikasi (geser_tanda_sequence).
+  Jika tanda master berbeda dari catatan itu, kolom ID dibaca sekali dan
+  sequence dinaikkan ke nomor terbesar yang ada
+- Bisa reservasi satu blok ID sekaligus (import massal)
+- Format ID bisa diatur, placeholder: {nomor}, {tahun}, {cabang}
+  contoh: 'DOC{nomor:03d}' -> DOC001 ... DOC999, DOC1000 (lebar bertambah)
+          'DOC-{tahun}-{nomor:05d}' -> DOC-2025-00001 (sequence per tahun)
+          '{cabang}/DOC{nomor:04d}' -> JKT/DOC0001 (sequence per cabang)
+'''
+FORMAT_ID_DOKUMEN = os.environ.get('SMDOK_FORMAT_ID', 'DOC{nomor:03d}')
+CABANG_DEFAULT = os.environ.get('SMDOK_CABANG', '')
+
+
+def path_sequence(file_path):
+    # File sequence disimpan di folder yang sama dengan file data
+    return os.path.join(os.path.dirname(file_path) or '.', 'sequences.json')
+
+
+def _baca_sequence(path_seq):
+    try:
+        with open(path_seq, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Warning: {path_seq} rusak, sequence di-seed ulang: {e}")
+        return {}
+
+
+def _tulis_sequence(path_seq, data):
+    # Tulis atomic (file sementara + os.replace) agar tidak rusak saat crash
+    path_tmp = f"{path_seq}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(path_tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(path_tmp, path_seq)
+
+
+def alokasi_sequence(path_seq, nama, jumlah=1, seed=None, minimal=0, catatan=None):
+    '''
+    Reservasi blok nomor dari sequence
+    ----------------------------------
+    Kembalikan list nomor [terakhir+1 .. terakhir+jumlah].
+    seed: fungsi yang mengembalikan nomor terakhir jika sequence belum ada
+    minimal: nomor terakhir yang sudah pasti terpakai (sequence tidak boleh di bawahnya)
+    catatan: dictionary kunci tambahan yang ikut ditulis (mis. tanda master)
+    '''
+    with kunci_file(path_seq):
+        data = _baca_sequence(path_seq)
+        terakhir = data.get(nama)
+        if terakhir is None:
+            terakhir = seed() if seed is not None else 0
+        terakhir = max(int(terakhir), int(minimal or 0))
+        data[nama] = terakhir + jumlah
+        data.update(catatan or {})
+        _tulis_sequence(path_seq, data)
+    return list(range(terakhir + 1, terakhir + jumlah + 1))
+
+
+def _pola_id(format_id, tahun, cabang):
+    # Regex untuk mengenali ID sesuai format (nomor di grup 1)
+    regex = ''
+    for literal, field, spec, _ in string.Formatter().parse(format_id):
+        regex += re.escape(literal)
+        if field is None:
+            continue
+        if field == 'nomor':
+            regex += r'(\d+)'
+        elif field == 'tahun':
+            regex += re.escape(format(tahun, spec or ''))
+        elif field == 'cabang':
+            regex += re.escape(format(cabang, spec or ''))
+        else:
+            raise ValueError(f"Placeholder tidak dikenal di format ID: {{{field}}}")
+    return '^' + regex + '$'
+
+
+def _nomor_terakhir_dokumen(file_path, pola):
+    # Seed sequence: nomor terbesar dari ID yang sudah ada (hanya sekali)
+    df = load_data(file_path, kolom=['ID'])
+    if len(df) == 0 or 'ID' not in df.columns:
+        return 0
+    nomor = df['ID'].astype(str).str.strip().str.extract(pola, expand=False)
+    nomor = pd.to_numeric(nomor, errors='coerce').dropna()
+    return int(nomor.max()) if len(nomor) > 0 else 0
+
+
+def _tanda_sequence(file_path):
+    # Tanda storage master dalam bentuk yang sama setelah disimpan ke JSON
+    return json.loads(json.dumps(get_storage().tanda(file_path)))
+
+
+def geser_tanda_sequence(file_path, tanda_lama):
+    '''
+    Catat penulisan master oleh aplikasi (tanda_lama -> tanda sekarang)
+    Catatan tanda sequence dokumen yang sama dengan tanda_lama digeser ke
+    tanda baru, jadi alokasi berikutnya tidak perlu membaca kolom ID.
+    Catatan yang sudah berbeda dibiarkan (ada perubahan dari luar).
+    Panggil di dalam kunci_file(file_path) setelah penulisan.
+    '''
+    tanda_lama = json.loads(json.dumps(tanda_lama))
+    path_seq = path_sequence(file_path)
+    with kunci_file(path_seq):
+        data = _baca_sequence(path_seq)
+        kunci = [k for k, v in data.items() if k.startswith('tanda|dokumen|') and v == tanda_lama]
+        if not kunci:
+            return
+        tanda_baru = _tanda_sequence(file_path)
+        for k in kunci:
+            data[k] = tanda_baru
+        _tulis_sequence(path_seq, data)
+
+
+def alokasi_id_dokumen(file_path, jumlah=1, format_id=None, cabang=None, tahun=None):
+    '''
+    Reservasi ID dokumen baru (satu atau satu blok untuk import massal)
+    Kembalikan list ID, contoh: ['DOC006', 'DOC007']
+    '''
+    format_id = format_id or FORMAT_ID_DOKUMEN
+    cabang = CABANG_DEFAULT if cabang is None else cabang
+    tahun = tahun or datetime.now().year
+    pola = _pola_id(format_id, tahun, cabang)
+    nama_seq = f"dokumen|{pola}"
+    
+    # Master diubah di luar aplikasi sejak alokasi/penulisan terakhir (atau
+    # belum pernah dicatat): sequence tidak boleh di bawah nomor yang sudah ada
+    path_seq = path_sequence(file_path)
+    kunci_tanda = f"tanda|{nama_seq}"
+    tanda = _tanda_sequence(file_path)
+    minimal = 0
+    if _baca_sequence(path_seq).get(kunci_tanda) != tanda:
+        minimal = _nomor_terakhir_dokumen(file_path, pola)
+    
+    nomor = alokasi_sequence(path_seq, nama_seq, jumlah, minimal=minimal, catatan={kunci_tanda: tanda},
+                             seed=lambda: _nomor_terakhir_dokumen(file_path, pola))
+    return [format_id.format(nomor=n, tahun=tahun, cabang=cabang) for n in nomor]
+
+
+def intip_id_dokumen(file_path, format_id=None, cabang=None, tahun=None):
+    # ID dokumen berikutnya tanpa reservasi (untuk preview di form Tambah)
+    format_id = format_id or FORMAT_ID_DOKUMEN
+    cabang = CABANG_DEFAULT if cabang is None else cabang
+    tahun = tahun or datetime.now().year
+    pola = _pola_id(format_id, tahun, cabang)
+    terakhir = _baca_sequence(path_sequence(file_path)).get(f"dokumen|{pola}")
+    if terakhir is None:
+        terakhir = _nomor_terakhir_dokumen(file_path, pola)
+    return format_id.format(nomor=int(terakhir) + 1, tahun=tahun, cabang=cabang)
+
+
+def alokasi_id_log(file_path, jumlah=1):
+    '''
+    Reservasi ID_Log baru. Sequence tidak pernah di bawah ID_Log terakhir
+    di file (counter O(1) dari ekor file), jadi aman setelah restore backup.
+    Panggil di dalam kunci_file(file_path).
+    '''
+    terakhir_di_file = get_storage().id_berikutnya(file_path, 'ID_Log') - 1
+    # Partisi aktif bisa kosong setelah rotasi: ID_Log di arsip ikut dihitung
+    terakhir_di_file = max(terakhir_di_file, _id_log_maks_arsip(file_path))
+    return alokasi_sequence(path_sequence(file_path), 'log', jumlah, minimal=terakhir_di_file)
+
+# FUNGSI CRUD DOKUMEN
+def tambah_dokumen(file_path, data):
+    # Tambah dokumen baru ke database
+    storage = get_storage()
+    
+    # Lock: ID baru dan penulisan tidak boleh diselingi sesi lain
+    with kunci_file(file_path):
+        tanda_lama = storage.tanda(file_path)
+        
+        # Buat ID dokumen baru dari sequence (tanpa memuat master)
+        new_id = alokasi_id_dokumen(file_path)[0]
+        qr_path = f"qr/{new_id}.png"    # path file QR code
+        
+        # Buat dictionary dokumen baru
+        # PERBAIKAN: Menambahkan strip() untuk menghilangkan whitespace
+        dokumen_baru = {
+            'ID': new_id,
+            'Judul': str(data.get('judul', '')).strip(),
+            'Jenis': str(data.get('jenis', '')).strip(),
+            'Lokasi_Fisik': str(data.get('lokasi', '')).strip(),
+            'Tanggal_Upload': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'Keterangan': str(data.get('keterangan', '')).strip(),
+            'Status': str(data.get('status', 'Aktif')).strip(),
+            'QR_Path': qr_path,
+            'Versi': 1
+        }
+        
+        # Konversi ke DataFrame 1 baris
+        df_baru = pd.DataFrame([dokumen_baru])
+        
+        # Simpan data (append ke storage engine) dan perbarui indeks
+        if storage.append(file_path, df_baru):
+            kabari_indeks(file_path, tanda_lama, 'tambah', df_baru)
+            geser_tanda_sequence(file_path, tanda_lama)
+    
+    # Generate QR code
+    generate_qr_code(new_id, qr_path, id_dokumen=new_id)
+    
+    return new_id   # kembalikan ID dokumen baru untuk ditampilkan ke user
+
+
+def _posisi_dokumen(file_path, id_dokumen):
+    # Posisi baris dokumen dari hash index ID (None jika tidak ada / ID ganda)
+    storage = get_storage()
+    if not storage.pakai_indeks_memori and not indeks_dimuat(file_path):
+        return None     # engine punya primary key dan tidak ada indeks yang perlu delta
+    indeks = ambil_indeks(file_path, 'id')
+    if id_dokumen in indeks.duplikat:
+        return None
+    return indeks.cari(id_dokumen)
+
+
+def get_dokumen_by_id(file_path, id_dokumen):
+    # Ambil dokumen berdasarkan ID
+    # PERBAIKAN: Konversi ke string untuk perbandingan yang konsisten
+    id_dokumen = str(id_dokumen).strip()
+    storage = get_storage()
+    
+    # SQLite: cari lewat primary key
+    if not storage.pakai_indeks_memori:
+        return storage.get_by_key(file_path, 'ID', id_dokumen)
+    
+    # Lookup O(1) lewat hash index ID -> posisi baris
+    pos = ambil_indeks(file_path, 'id').cari(id_dokumen)
+    if pos is None:
+        return None
+    df = muat_dengan_cache(storage, file_path, salin=False)    # hanya dibaca
+    if storage.posisi_cocok(df, 'ID', id_dokumen, pos):
+        return df.iloc[pos].to_dict()
+    
+    # Indeks tidak sinkron dengan data (file berubah di tengah jalan): scan biasa
+    return storage.get_by_key(file_path, 'ID', id_dokumen)
+
+
+class KonflikVersi(Exception):
+    '''
+    Dokumen sudah diubah / dihapus sesi lain sejak dibaca
+    -----------------------------------------------------
+    Dilempar update_dokumen / hapus_dokumen jika parameter versi tidak sama
+    dengan kolom Versi saat ini (optimistic concurrency).
+    versi_sekarang None berarti dokumen sudah dihapus.
+    '''
+    def __init__(self, id_dokumen, versi_dibaca, versi_sekarang, dokumen=None):
+        self.id_dokumen = id_dokumen
+        self.versi_dibaca = versi_dibaca
+        self.versi_sekarang = versi_sekarang
+        self.dokumen = dokumen      # isi dokumen terbaru (None jika sudah dihapus)
+        if versi_sekarang is None:
+            pesan = f"Dokumen {id_dokumen} sudah dihapus pengguna lain"
+        else:
+            pesan = (f"Dokumen {id_dokumen} sudah diubah pengguna lain "
+                     f"(versi {versi_dibaca} -> {versi_sekarang})")
+        super().__init__(pesan)
+
+
+def versi_dokumen(dok):
+    # Nilai kolom Versi sebagai int (data lama tanpa Versi dianggap 0)
+    if dok is None:
+        return None
+    try:
+        return int(float(dok.get('Versi')))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _cek_versi(id_dokumen, dok, versi):
+    # Lempar KonflikVersi jika versi yang dibaca pemanggil sudah usang
+    if versi is not None and versi_dokumen(dok) != int(versi):
+        raise KonflikVersi(id_dokumen, int(versi), versi_dokumen(dok), dok)
+
+
+def update_dokumen(file_path, id_dokumen, data, versi=None):
+    '''
+    Update dokumen berdasarkan ID
+    versi: nilai kolom Versi saat dokumen dibaca. Jika diisi dan dokumen sudah
+    diubah sesi lain, update dibatalkan dengan KonflikVersi.
+    '''
+    # PERBAIKAN: Konversi ke string
+    id_dokumen = str(id_dokumen).strip()
+    storage = get_storage()
+    
+    with kunci_file(file_path):
+        tanda_lama = storage.tanda(file_path)
+        
+        # Cek versi di dalam lock agar tidak ada penulis lain di antaranya
+        dok = get_dokumen_by_id(file_path, id_dokumen)
+        _cek_versi(id_dokumen, dok, versi)
+        if dok is None:
+            return False
+        data = dict(data, Versi=versi_dokumen(dok) + 1)
+        pos = _posisi_dokumen(file_path, id_dokumen)
+        
+        # Update kolom yang ada di data lalu simpan
+        berhasil = storage.update_by_key(file_path, 'ID', id_dokumen, data, posisi=pos)
+        if berhasil:
+            kabari_indeks(file_path, tanda_lama, 'ubah', pos, data)
+            geser_tanda_sequence(file_path, tanda_lama)
+    return berhasil
+
+
+def hapus_dokumen(file_path, id_dokumen, versi=None):
+    # Hapus dokumen berdasarkan ID (versi: lihat update_dokumen)
+    storage = get_storage()
+    
+    # Konversi ID ke string dan strip whitespace
+    id_dokumen = str(id_dokumen).strip()
+    
+    with kunci_file(file_path):
+        # Cek apakah ID ada di database
+        dok = get_dokumen_by_id(file_path, id_dokumen)
+        if dok is None and versi is None:
+            print(f"ID {id_dokumen} tidak ditemukan di database")
+            return False  # ID tidak ditemukan
+        _cek_versi(id_dokumen, dok, versi)
+        
+        # Hapus file QR terlebih dahulu jika ada
+        qr_path = f"qr/{id_dokumen}.png"
+        if os.path.exists(qr_path):
+            try:
+                os.remove(qr_path)
+            except Exception as e:
+                print(f"Warning: Gagal menghapus QR file: {e}")
+        
+        tanda_lama = storage.tanda(file_path)
+        pos = _posisi_dokumen(file_path, id_dokumen)
+        
+        # Hapus lewat storage engine, hasilnya jumlah baris yang terhapus
+        # (engine tidak menyimpan apa pun jika jumlahnya bukan 1)
+        jumlah_terhapus = storage.delete_by_key(file_path, 'ID', id_dokumen, posisi=pos)
+        if jumlah_terhapus == 1:
+            kabari_indeks(file_path, tanda_lama, 'hapus', pos)
+            geser_tanda_sequence(file_path, tanda_lama)
+            # Entri manifest QR ikut dibuang (tidak menunggu generate batch)
+            perbarui_manifest_qr(os.path.dirname(qr_path), [], [], [], hapus=[id_dokumen])
+    
+    if jumlah_terhapus != 1:
+        # Sesuatu yang salah terjadi
+        print(f"Warning: Expected 1 deletion, got {jumlah_terhapus}")
+        
+        # Jika lebih dari 1 cocok, ini bug serius - data tidak disimpan!
+        if jumlah_terhapus > 1:
+            print("CRITICAL: Multiple deletions detected, aborting save!")
+        return False
+    
+    return True
+
+
+def get_semua_dokumen(file_path, ctx=None):
+    # Ambil semua dokumen dari database
+    return load_data(file_path, ctx=ctx)
+
+# FUNGSI IMPORT MASSAL
+'''
+Import dokumen massal dari file CSV / Excel
+-------------------------------------------
+- File dibaca per chunk (UKURAN_CHUNK_IMPORT baris), tidak dimuat sekaligus
+- Validasi Jenis/Status/Lokasi dilakukan per kolom (vectorized), bukan per baris
+- ID dialokasikan satu blok, semua baris valid ditulis dalam satu append
+  dan dicatat dengan satu log ringkasan (IMPORT_MASSAL) di lock yang sama.
+  Log ringkasan bersifat best-effort: master dan log adalah dua file, jadi
+  jika log gagal ditulis (atau proses mati di antaranya) dokumen tetap
+  tersimpan dan hasil import memberi tahu lewat 'log' = False
+- Nomor baris di laporan error = nomor baris asli di file (header = baris 1),
+  baris kosong dilewati tanpa menggeser nomor
+- QR code dibuat di thread background, progres bisa dipantau lewat
+  get_status_qr() tanpa menahan penulisan data
+Kolom yang dikenali (tidak case sensitive): Judul, Jenis, Lokasi / Lokasi_Fisik,
+Status, Keterangan. Status kosong diisi 'Aktif'.
+'''
+UKURAN_CHUNK_IMPORT = 5000
+
+# Nama kolom di file import -> kolom master
+_KOLOM_IMPORT = {
+    'judul': 'Judul',
+    'jenis': 'Jenis',
+    'lokasi': 'Lokasi_Fisik',
+    'lokasi_fisik': 'Lokasi_Fisik',
+    'lokasi fisik': 'Lokasi_Fisik',
+    'status': 'Status',
+    'keterangan': 'Keterangan'
+}
 
-def save_data(file_path, df):
-    '''
-    Simpan DataFrame ke file CSV
-    DIPERBAIKI: Menambahkan try-except untuk penanganan error
-    '''
-    try:
-        # Buat folder jika belum ada
-        os.makedirs(os.path.dirname(file_path) if os.path.dirname(file_path) else '.', exist_ok=True)
-        
-        # Simpan DataFrame ke file CSV dengan pandas
-        df.to_csv(file_path,
-                  index=False,          # tanpa index
-                  sep=';',              # gunakan pemisah titik koma
-                  encoding='utf-8-sig') # encoding UTF-8 dengan BOM
-        return True
-    except Exception as e:
-        print(f"Error saving {file_path}: {e}")
-        return False
+# Status antrean QR background: job_id -> dict progres. Job yang sudah
+# selesai dibuang setelah JOB_QR_TTL_DETIK (_SELESAI_QR: job_id -> waktu selesai)
+_ANTREAN_QR = {}
+_SELESAI_QR = {}
+_KUNCI_ANTREAN_QR = threading.Lock()
+JOB_QR_TTL_DETIK = 3600
 
-# FUNGSI INISIALISASI
-def init_folders():
-    """
-    Buat folder yang diperlukan
-    ---------------------------
-    Folder yang dibuat:
-    - data/: untuk menyimpan file data CSV 
-    - qr/: untuk menyimpan file QR code
-    """
-    os.makedirs("data", exist_ok=True)  # buat folder data jika belum ada
-    os.makedirs("qr", exist_ok=True)    # buat folder qr jika belum ada
 
+def _pangkas_job_qr():
+    # Buang job selesai yang lebih lama dari JOB_QR_TTL_DETIK (panggil dengan _KUNCI_ANTREAN_QR)
+    batas = time.time() - JOB_QR_TTL_DETIK
+    for job_id in [j for j, waktu in _SELESAI_QR.items() if waktu < batas]:
+        _ANTREAN_QR.pop(job_id, None)
+        del _SELESAI_QR[job_id]
 
-def init_master_csv(file_path):
-    # Inisialisasi file master dokumen
-    if not os.path.exists(file_path):
-        # file belum ada, buat baru dengan kolom yang sudah didefinisikan
-        df = pd.DataFrame(columns=COLUMNS_MASTER)
-        save_data(file_path, df)
-    return load_data(file_path)
 
+def _daftarkan_job_qr(job_id, status):
+    # Catat job baru di antrean (sekalian memangkas job lama), return dict status
+    with _KUNCI_ANTREAN_QR:
+        _pangkas_job_qr()
+        _ANTREAN_QR[job_id] = status
+    return status
 
-def init_log_csv(file_path):
-    # Inisialisasi file log aktivitas
-    if not os.path.exists(file_path):
-        df = pd.DataFrame(columns=COLUMNS_LOG)
-        save_data(file_path, df)
-    return load_data(file_path)
 
+def _perbarui_job_qr(status, **nilai):
+    # Ubah dict status job dari thread pekerja (get_status_qr menyalinnya di lock yang sama)
+    with _KUNCI_ANTREAN_QR:
+        status.update(nilai)
 
-def init_users_csv(file_path):
-    """
-    Inisialisasi file users dengan default users (admin, staff)
-    """
-    if not os.path.exists(file_path):
-        # Buat user default: admin, staff
-        df = pd.DataFrame({
-            'username': ['admin', 'staff'],
-            'password': ['admin123', 'staff123'],
-            'role': ['admin', 'staff']
-        })
-        save_data(file_path, df)
-    return load_data(file_path)
 
-# FUNGSI GENERATE ID
-def generate_id_dokumen(df):
-    # Generate ID dokumen baru
-    if len(df) == 0 or 'ID' not in df.columns:
-        return "DOC001"
-    
-    try:
-        # PERBAIKAN: Pastikan ID adalah string
-        df['ID'] = df['ID'].astype(str).str.strip()
-        
-        # Ambil ID terakhir (bukan kosong)
-        last_id = df['ID'].dropna().iloc[-1] if len(df['ID'].dropna()) > 0 else "DOC000"
-        
-        # Ekstrak nomor dari ID terakhir dan tambah 1
-        num = int(str(last_id).replace("DOC", "")) + 1
-        
-        # Format kembali dengan 3 digit
-        return f"DOC{num:03d}"
-    except:
-        # Jika ada error, gunakan panjang df + 1
-        return f"DOC{len(df)+1:03d}"
+def _selesaikan_job_qr(job_id, **nilai):
+    # Tandai job selesai, sekalian nilai status terakhir (satu kali lock)
+    with _KUNCI_ANTREAN_QR:
+        _ANTREAN_QR[job_id].update(nilai, jalan=False)
+        _SELESAI_QR[job_id] = time.time()
 
 
-def generate_id_log(df):
-    # Generate ID log baru
-    if len(df) == 0 or 'ID_Log' not in df.columns:
-        return 1    # mulai dari 1
-    try:
-        # Ambil ID_Log terbesar dan tambah 1
-        return int(df['ID_Log'].max()) + 1
-    except:
-        return len(df) + 1
+def _normalisasi_kolom_import(df):
+    # Samakan nama kolom file import dengan kolom master
+    df = df.rename(columns=lambda k: _KOLOM_IMPORT.get(str(k).strip().lower(), str(k).strip()))
+    for kolom in ['Judul', 'Jenis', 'Lokasi_Fisik', 'Status', 'Keterangan']:
+        if kolom not in df.columns:
+            df[kolom] = ''
+    return df[['Judul', 'Jenis', 'Lokasi_Fisik', 'Status', 'Keterangan']].fillna('').astype(str)
 
-# FUNGSI CRUD DOKUMEN
-def tambah_dokumen(file_path, data):
-    # Tambah dokumen baru ke database
-    # Muat data master
-    df = load_data(file_path)
-    
-    # Buat ID dokumen baru
-    new_id = generate_id_dokumen(df)
-    qr_path = f"qr/{new_id}.png"    # path file QR code
-    
-    # Buat dictionary dokumen baru
-    # PERBAIKAN: Menambahkan strip() untuk menghilangkan whitespace
-    dokumen_baru = {
-        'ID': new_id,
-        'Judul': str(data.get('judul', '')).strip(),
-        'Jenis': str(data.get('jenis', '')).strip(),
-        'Lokasi_Fisik': str(data.get('lokasi', '')).strip(),
-        'Tanggal_Upload': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'Keterangan': str(data.get('keterangan', '')).strip(),
-        'Status': str(data.get('status', 'Aktif')).strip(),
-        'QR_Path': qr_path
-    }
+
+def baca_file_import(sumber, nama_file=None, ukuran_chunk=UKURAN_CHUNK_IMPORT):
+    '''
+    Generator chunk DataFrame dari file import (path atau file upload Streamlit)
+    Format ditentukan dari ekstensi nama_file (.csv / .xlsx)
+    Index tiap chunk = nomor baris di file (header = baris 1); baris yang
+    seluruh selnya kosong dilewati
+    '''
+    nama_file = nama_file or getattr(sumber, 'name', None) or str(sumber)
     
-    # Konversi ke DataFrame 1 baris
-    df_baru = pd.DataFrame([dokumen_baru])
+    if nama_file.lower().endswith(('.xlsx', '.xlsm')):
+        # Excel: openpyxl mode read_only membaca baris demi baris
+        wb = load_workbook(sumber, read_only=True, data_only=True)
+        try:
+            baris = wb.active.iter_rows(values_only=True)
+            header = next(baris, None)
+            if header is None:
+                return
+            header = [str(h) if h is not None else '' for h in header]
+            chunk, nomor_baris = [], []
+            for nomor, row in enumerate(baris, start=2):
+                if row is None or all(v is None for v in row):
+                    continue    # lewati baris kosong (nomor baris tetap dihitung)
+                # mode read_only: sel kosong di ujung baris tidak ikut dibaca
+                chunk.append(tuple(row[:len(header)]) + (None,) * (len(header) - len(row)))
+                nomor_baris.append(nomor)
+                if len(chunk) >= ukuran_chunk:
+                    yield pd.DataFrame(chunk, columns=header, index=nomor_baris)
+                    chunk, nomor_baris = [], []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header, index=nomor_baris)
+        finally:
+            wb.close()
+        return
     
-    # Gabungkan dengan data master
-    if len(df) == 0:
-        df = df_baru
+    # CSV: deteksi pemisah dari baris header (';' format aplikasi, ',' umum)
+    if hasattr(sumber, 'seek'):
+        sumber.seek(0)
+        header = sumber.readline()
+        sumber.seek(0)
     else:
-        df = pd.concat([df, df_baru], ignore_index=True)
+        with open(sumber, 'rb') as f:
+            header = f.readline()
+    if isinstance(header, bytes):
+        header = header.decode('utf-8-sig', errors='ignore')
+    sep = ';' if header.count(';') >= header.count(',') else ','
+    
+    # skip_blank_lines=False: index chunk tetap urut baris file
+    for chunk in pd.read_csv(sumber, sep=sep, encoding='utf-8-sig', dtype=str,
+                             keep_default_na=False, skip_blank_lines=False, chunksize=ukuran_chunk):
+        chunk.index = chunk.index + 2
+        chunk = chunk[(chunk.fillna('') != '').any(axis=1)]
+        if len(chunk) > 0:
+            yield chunk
+
+
+def validasi_import(df, baris_awal=None):
+    '''
+    Validasi satu chunk import secara vectorized
+    baris_awal: nomor baris file untuk baris pertama chunk (header = baris 1);
+    None = index df sudah berisi nomor baris (chunk dari baca_file_import)
+    Return (df_valid, df_error). df_error berisi kolom Baris dan Alasan.
+    '''
+    df = _normalisasi_kolom_import(df).apply(lambda kolom: kolom.str.strip())
+    if baris_awal is not None:
+        df.index = range(baris_awal, baris_awal + len(df))
     
-    # Simpan data dan generate QR code
-    save_data(file_path, df)
-    generate_qr_code(new_id, qr_path)
+    # Nilai dicocokkan tanpa beda huruf besar/kecil lalu diganti ke ejaan baku
+    df['Status'] = df['Status'].mask(df['Status'] == '', 'Aktif')
+    alasan = pd.Series('', index=df.index)
+    for kolom, daftar in [('Jenis', JENIS_DOKUMEN), ('Status', STATUS_DOKUMEN), ('Lokasi_Fisik', LOKASI_LIST)]:
+        baku = df[kolom].str.lower().map({v.lower(): v for v in daftar})
+        alasan = alasan.mask(baku.isna(), alasan + f"{kolom} tidak dikenal; ")
+        df[kolom] = baku.fillna(df[kolom])
+    alasan = alasan.mask(df['Judul'] == '', alasan + "Judul kosong; ")
     
-    return new_id   # kembalikan ID dokumen baru untuk ditampilkan ke user
+    salah = alasan != ''
+    df_error = df[salah].copy()
+    df_error.insert(0, 'Baris', df_error.index)
+    df_error['Alasan'] = alasan[salah].str.rstrip('; ')
+    return df[~salah], df_error.reset_index(drop=True)
 
 
-def get_dokumen_by_id(file_path, id_dokumen):
-    # Ambil dokumen berdasarkan ID
-    df = load_data(file_path)
+def import_dokumen_massal(file_path, file_log, sumber, nama_file=None, user="Admin",
+                          folder_qr="qr", ukuran_chunk=UKURAN_CHUNK_IMPORT, progress=None):
+    '''
+    Import dokumen massal dari file CSV / Excel
+    progress: callback opsional progress(jumlah_baris_dibaca) tiap chunk
+    Return dictionary:
+    - berhasil : jumlah dokumen yang ditambahkan
+    - id       : list ID dokumen baru
+    - error    : DataFrame baris yang ditolak (Baris = nomor baris di file, Alasan, ...)
+    - job_qr   : ID antrean QR background (None jika tidak ada dokumen baru)
+    - log      : False jika log ringkasan gagal ditulis (dokumen tetap tersimpan)
+    '''
+    storage = get_storage()
+    valid, error = [], []
+    dibaca = 0
     
-    # Cek apakah ada data dan kolom ID
-    if len(df) == 0 or 'ID' not in df.columns:
-        return None
+    # Baca dan validasi per chunk
+    for chunk in baca_file_import(sumber, nama_file, ukuran_chunk):
+        df_valid, df_error = validasi_import(chunk)
+        dibaca += len(chunk)
+        if len(df_valid) > 0:
+            valid.append(df_valid)
+        if len(df_error) > 0:
+            error.append(df_error)
+        if progress is not None:
+            progress(dibaca)
     
-    # PERBAIKAN: Konversi ke string untuk perbandingan yang konsisten
-    id_dokumen = str(id_dokumen).strip()
-    df['ID'] = df['ID'].astype(str).str.strip()
+    df_error = pd.concat(error, ignore_index=True) if error else pd.DataFrame(columns=['Baris', 'Alasan'])
+    hasil = {'berhasil': 0, 'id': [], 'error': df_error, 'job_qr': None, 'log': True}
+    if not valid:
+        return hasil
+    df_baru = pd.concat(valid, ignore_index=True)
     
-    # Filter data berdasarkan ID
-    result = df[df['ID'] == id_dokumen]
+    # Satu lock, satu blok ID, satu penulisan + log ringkasan
+    with kunci_file(file_path):
+        tanda_lama = storage.tanda(file_path)
+        id_baru = alokasi_id_dokumen(file_path, len(df_baru))
+        df_baru.insert(0, 'ID', id_baru)
+        df_baru['Tanggal_Upload'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        df_baru['QR_Path'] = [f"{folder_qr}/{i}.png" for i in id_baru]
+        df_baru['Versi'] = 1
+        df_baru = df_baru[COLUMNS_MASTER]
+        
+        if not storage.append(file_path, df_baru):
+            return hasil
+        kabari_indeks(file_path, tanda_lama, 'tambah', df_baru)
+        geser_tanda_sequence(file_path, tanda_lama)
+        
+        # Satu log ringkasan untuk seluruh import, langsung setelah append
+        # (best-effort, lihat keterangan FUNGSI IMPORT MASSAL)
+        try:
+            tambah_log(file_log, f"{id_baru[0]}..{id_baru[-1]}", "IMPORT_MASSAL", user)
+        except Exception as e:
+            print(f"Warning: Log import {id_baru[0]}..{id_baru[-1]} gagal ditulis: {e}")
+            hasil['log'] = False
     
-    if len(result) > 0:
-        # Ambil baris pertama dan konversi ke dictionary
-        return result.iloc[0].to_dict()
-    return None
+    hasil.update(berhasil=len(id_baru), id=id_baru,
+                 job_qr=antrekan_qr(id_baru, df_baru['QR_Path'].tolist(), folder_manifest=folder_qr))
+    return hasil
 
 
-def update_dokumen(file_path, id_dokumen, data):
-    # Update dokumen berdasarkan ID
-    df = load_data(file_path)
-    if len(df) == 0 or 'ID' not in df.columns:
-        return False
-    
-    # PERBAIKAN: Konversi ke string
-    id_dokumen = str(id_dokumen).strip()
-    df['ID'] = df['ID'].astype(str).str.strip()
+def antrekan_qr(daftar_id, daftar_path, workers=None, folder_manifest=None, hapus_manifest=()):
+    # Buat QR code di thread background (dibagi ke beberapa proses, lihat
+    # generate_qr_paralel), kembalikan job_id untuk get_status_qr()
+    # folder_manifest: hasilnya dicatat di manifest QR folder tersebut
+    # (hapus_manifest: ID yang entrinya dibuang, lihat perbarui_manifest_qr)
+    job_id = f"qr-{time.time_ns()}"
+    status = _daftarkan_job_qr(job_id, {'total': len(daftar_id), 'selesai': 0, 'gagal': 0, 'jalan': True})
     
-    # Cari index dokumen berdasarkan ID
-    idx = df[df['ID'] == id_dokumen].index
+    def kerja():
+        gagal = 0
+        try:
+            hasil = generate_qr_paralel(daftar_id, daftar_path, workers=workers, dengan_sidik=True,
+                                        progress=lambda selesai, total: _perbarui_job_qr(status, selesai=selesai))
+            if folder_manifest is not None:
+                perbarui_manifest_qr(folder_manifest, daftar_id, daftar_id, [sidik for _, sidik in hasil],
+                                     hapus=hapus_manifest)
+            for id_dokumen, (e, _) in zip(daftar_id, hasil):
+                if e is not None:
+                    print(f"Error generate QR {id_dokumen}: {e}")
+                    gagal += 1
+        except Exception as e:
+            print(f"Error generate QR: {e}")
+            with _KUNCI_ANTREAN_QR:
+                gagal = status['total'] - status['selesai']
+        _selesaikan_job_qr(job_id, gagal=gagal, selesai=status['total'])
     
-    if len(idx) > 0:
-        # Update kolom yang ada di data
-        for key, value in data.items():
-            if key in df.columns:
-                df.loc[idx[0], key] = value
-        # Simpan data
-        save_data(file_path, df)
-        return True
-    return False
+    threading.Thread(target=kerja, name=job_id, daemon=True).start()
+    return job_id
 
 
-def hapus_dokumen(file_path, id_dokumen):
-    # Hapus dokumen berdasarkan ID
-    df = load_data(file_path)
-    if len(df) == 0 or 'ID' not in df.columns:
+def get_status_qr(job_id):
+    # Progres antrean QR background (None jika job_id tidak dikenal atau
+    # sudah selesai lebih dari JOB_QR_TTL_DETIK yang lalu)
+    with _KUNCI_ANTREAN_QR:
+        _pangkas_job_qr()
+        status = _ANTREAN_QR.get(job_id)
+        return dict(status) if status is not None else None
+
+# FUNGSI LOG AKTIVITAS
+'''
+Partisi log berdasarkan waktu
+-----------------------------
+- data/log.csv hanya berisi partisi aktif (bulan berjalan), jadi append,
+  snapshot dan counter ID_Log tetap bekerja pada file kecil
+- Saat periode berganti, baris lama dipindah ke data/log_arsip/<periode>.csv
+  (contoh 2025-12.csv) dan dicatat di data/log_arsip/manifest.json
+  beserta Waktu paling awal/akhir, jumlah baris dan ID_Log terbesar
+- get_semua_log / get_log_terbaru menerima rentang tanggal dan hanya membuka
+  partisi yang beririsan dengan rentang tersebut
+- Partisi lama bisa dikompres (gzip) di tempat dan tetap bisa dibaca
+Periode diatur lewat SMDOK_LOG_PARTISI: 'harian', 'bulanan' (default),
+'tahunan' atau 'nonaktif'. Rotasi hanya dilakukan oleh engine CSV.
+'''
+LOG_PARTISI = os.environ.get('SMDOK_LOG_PARTISI', 'bulanan')
+
+# Format kunci periode untuk tiap granularitas partisi
+_FORMAT_PARTISI = {
+    'harian': '%Y-%m-%d',
+    'bulanan': '%Y-%m',
+    'tahunan': '%Y'
+}
+
+# Cache manifest di memori: path -> (tanda file, isi manifest)
+_CACHE_MANIFEST = {}
+
+
+def folder_partisi_log(file_path):
+    # data/log.csv -> data/log_arsip
+    return os.path.splitext(file_path)[0] + '_arsip'
+
+
+def _path_manifest_log(file_path):
+    return os.path.join(folder_partisi_log(file_path), 'manifest.json')
+
+
+def baca_manifest_log(file_path):
+    # Isi manifest partisi ({} jika log belum pernah dipartisi)
+    path = _path_manifest_log(file_path)
+    tanda = tanda_file(path)
+    if tanda is None:
+        return {}
+    cache = _CACHE_MANIFEST.get(path)
+    if cache is not None and cache[0] == tanda:
+        return cache[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except ValueError as e:
+        print(f"Warning: {path} rusak, partisi log diabaikan: {e}")
+        return {}
+    _CACHE_MANIFEST[path] = (tanda, manifest)
+    return manifest
+
+
+def _tulis_manifest_log(file_path, manifest):
+    # Tulis atomic (file sementara + os.replace)
+    path = _path_manifest_log(file_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    path_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(path_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path_tmp, path)
+    _CACHE_MANIFEST.pop(path, None)
+
+
+def _periode_waktu(waktu):
+    # Series Waktu -> Series kunci periode (NaN jika Waktu tidak valid)
+    format_periode = _FORMAT_PARTISI[LOG_PARTISI]
+    return pd.to_datetime(waktu, errors='coerce').dt.strftime(format_periode)
+
+
+def _batas_waktu(nilai, akhir=False):
+    '''
+    Ubah batas rentang (date / datetime / teks) ke teks 'YYYY-MM-DD HH:MM:SS'
+    yang bisa dibandingkan langsung dengan kolom Waktu.
+    akhir=True: tanggal tanpa jam dianggap sampai 23:59:59
+    '''
+    if nilai is None:
+        return None
+    if isinstance(nilai, datetime):
+        return nilai.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(nilai, date):
+        nilai = nilai.strftime("%Y-%m-%d")
+    nilai = str(nilai).strip()
+    if len(nilai) == 10:
+        nilai += ' 23:59:59' if akhir else ' 00:00:00'
+    return nilai
+
+
+def daftar_partisi_log(file_path, mulai=None, sampai=None):
+    '''
+    Daftar path partisi arsip yang beririsan dengan rentang [mulai, sampai],
+    urut dari yang paling lama. mulai/sampai berupa teks hasil _batas_waktu
+    '''
+    manifest = baca_manifest_log(file_path)
+    folder = folder_partisi_log(file_path)
+    hasil = []
+    for info in sorted(manifest.get('partisi', {}).values(), key=lambda x: x['mulai']):
+        if mulai is not None and info['sampai'] < mulai:
+            continue
+        if sampai is not None and info['mulai'] > sampai:
+            continue
+        hasil.append(os.path.join(folder, info['file']))
+    return hasil
+
+
+def _id_log_maks_arsip(file_path):
+    # ID_Log terbesar yang sudah dipindah ke arsip (0 jika belum ada)
+    partisi = baca_manifest_log(file_path).get('partisi', {})
+    return max([info['id_maks'] for info in partisi.values()], default=0)
+
+
+def _tambah_partisi_kompres(path, info, df_partisi):
+    # Gabung partisi gzip dengan baris baru lalu tulis ulang (atomic: file
+    # sementara + os.replace, arsip lama utuh jika penulisan gagal)
+    df_lama = _ENGINES['csv'].load(path)
+    if len(df_lama) < info['baris']:
+        print(f"Error: Partisi {path} tidak terbaca utuh, baris baru tidak diarsip")
         return False
+    path_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        pd.concat([df_lama, df_partisi], ignore_index=True).to_csv(
+            path_tmp, index=False, sep=';', encoding='utf-8-sig', compression='gzip')
+        os.replace(path_tmp, path)
+    except Exception as e:
+        print(f"Error menulis partisi {path}: {e}")
+        if os.path.exists(path_tmp):
+            os.remove(path_tmp)
+        return False
+    invalidasi_cache_data(path)
+    return True
+
+
+def _tulis_partisi_log(file_path, manifest, periode, df_partisi):
+    # Tambahkan baris ke file partisi periode tersebut dan perbarui manifest
+    csv_engine = _ENGINES['csv']
+    folder = folder_partisi_log(file_path)
+    info = manifest['partisi'].get(periode)
     
-    # Konversi ID ke string dan strip whitespace
-    id_dokumen = str(id_dokumen).strip()
-    
-    # Pastikan kolom ID juga string
-    df['ID'] = df['ID'].astype(str).str.strip()
-    
-    # Cek apakah ID ada di database
-    if id_dokumen not in df['ID'].values:
-        print(f"ID {id_dokumen} tidak ditemukan di database")
-        return False  # ID tidak ditemukan
-    
-    # Simpan jumlah data sebelum hapus untuk validasi
-    jumlah_sebelum = len(df)
+    if info is not None:
+        # Salinan: info di manifest hanya diganti setelah file partisi tertulis
+        info = dict(info)
+        # Lewati baris yang sudah pernah diarsip (rotasi sebelumnya terputus)
+        df_partisi = df_partisi[pd.to_numeric(df_partisi['ID_Log'], errors='coerce') > info['id_maks']]
+        if len(df_partisi) == 0:
+            return True
+        path = os.path.join(folder, info['file'])
+        if info.get('kompres'):
+            berhasil = _tambah_partisi_kompres(path, info, df_partisi)
+        else:
+            berhasil = csv_engine.append(path, df_partisi)
+    else:
+        info = {'file': f"{periode}.csv", 'mulai': None, 'sampai': None,
+                'baris': 0, 'id_maks': 0, 'kompres': False}
+        berhasil = csv_engine.save(os.path.join(folder, info['file']), df_partisi)
     
-    # Hapus file QR terlebih dahulu jika ada
-    qr_path = f"qr/{id_dokumen}.png"
-    if os.path.exists(qr_path):
-        try:
-            os.remove(qr_path)
-        except Exception as e:
-            print(f"Warning: Gagal menghapus QR file: {e}")
+    if not berhasil:
+        return False
     
-    # Filter dengan perbandingan string yang benar
-    df_filtered = df[df['ID'] != id_dokumen].copy()
+    waktu = df_partisi['Waktu'].astype(str)
+    info['mulai'] = min(x for x in [info['mulai'], waktu.min()] if x is not None)
+    info['sampai'] = max(x for x in [info['sampai'], waktu.max()] if x is not None)
+    info['baris'] += len(df_partisi)
+    info['id_maks'] = max(info['id_maks'], int(pd.to_numeric(df_partisi['ID_Log'], errors='coerce').max()))
+    manifest['partisi'][periode] = info
+    return True
+
+
+def rotasi_log(file_path):
+    '''
+    Pindahkan baris log dari periode lama ke partisi arsip.
+    Murah jika periode belum berganti (hanya cek manifest di memori).
+    Return jumlah baris yang dipindah.
+    '''
+    if LOG_PARTISI not in _FORMAT_PARTISI or get_storage().nama != 'csv':
+        return 0
     
-    # Validasi - pastikan hanya 1 data yang terhapus
-    jumlah_sesudah = len(df_filtered)
-    jumlah_terhapus = jumlah_sebelum - jumlah_sesudah
+    aktif = datetime.now().strftime(_FORMAT_PARTISI[LOG_PARTISI])
+    if baca_manifest_log(file_path).get('aktif') == aktif:
+        return 0
     
-    if jumlah_terhapus != 1:
-        # Sesuatu yang salah terjadi
-        print(f"Warning: Expected 1 deletion, got {jumlah_terhapus}")
+    with kunci_file(file_path):
+        # Cek ulang di dalam lock: sesi lain mungkin sudah merotasi
+        manifest = dict(baca_manifest_log(file_path))
+        if manifest.get('aktif') == aktif:
+            return 0
+        manifest['partisi'] = dict(manifest.get('partisi', {}))
         
-        # Jika tidak ada yang terhapus, return False
-        if jumlah_terhapus == 0:
-            return False
+        df = load_data(file_path)
+        dipindah = 0
+        if len(df) > 0 and 'Waktu' in df.columns and 'ID_Log' in df.columns:
+            periode = _periode_waktu(df['Waktu'])
+            # Baris dengan Waktu tidak valid tetap di partisi aktif
+            lama = periode.notna() & (periode != aktif)
+            if lama.any():
+                # Arsip ditulis dulu, baru partisi aktif dipangkas
+                for key, df_partisi in df[lama].groupby(periode[lama], sort=True):
+                    if not _tulis_partisi_log(file_path, manifest, key, df_partisi):
+                        return 0
+                _tulis_manifest_log(file_path, manifest)
+                if not save_data(file_path, df[~lama].reset_index(drop=True)):
+                    return 0
+                dipindah = int(lama.sum())
         
-        # Jika lebih dari 1 terhapus, ini bug serius - jangan simpan!
-        if jumlah_terhapus > 1:
-            print("CRITICAL: Multiple deletions detected, aborting save!")
-            return False
-    
-    # Simpan data yang sudah difilter
-    save_data(file_path, df_filtered)
-    return True
+        manifest['granularitas'] = LOG_PARTISI
+        manifest['aktif'] = aktif
+        _tulis_manifest_log(file_path, manifest)
+        return dipindah
 
 
-def get_semua_dokumen(file_path):
-    # Ambil semua dokumen dari database
-    return load_data(file_path)
+def kompres_partisi_log(file_path, sisakan=1):
+    '''
+    Kompres (gzip) partisi arsip lama di tempat: 2025-12.csv -> 2025-12.csv.gz
+    sisakan: jumlah partisi arsip terbaru yang dibiarkan tanpa kompresi
+    Partisi terkompresi tetap dibaca get_semua_log seperti biasa.
+    Return daftar periode yang dikompres.
+    '''
+    folder = folder_partisi_log(file_path)
+    dikompres = []
+    with kunci_file(file_path):
+        manifest = dict(baca_manifest_log(file_path))
+        manifest['partisi'] = dict(manifest.get('partisi', {}))
+        urutan = sorted(manifest['partisi'], key=lambda k: manifest['partisi'][k]['mulai'])
+        kandidat = urutan[:max(0, len(urutan) - sisakan)]
+        
+        for key in kandidat:
+            info = dict(manifest['partisi'][key])
+            if info.get('kompres'):
+                continue
+            path = os.path.join(folder, info['file'])
+            path_gz = path + '.gz'
+            path_tmp = f"{path_gz}.{os.getpid()}.tmp"
+            try:
+                with open(path, 'rb') as f_in, gzip.open(path_tmp, 'wb') as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+                os.replace(path_tmp, path_gz)
+            except OSError as e:
+                print(f"Error kompres partisi {path}: {e}")
+                continue
+            info['file'] = os.path.basename(path_gz)
+            info['kompres'] = True
+            manifest['partisi'][key] = info
+            # Manifest diperbarui sebelum file lama dihapus
+            _tulis_manifest_log(file_path, manifest)
+            for sisa in (path, path_snapshot(path), path_rantai_snapshot(path)):
+                if os.path.exists(sisa):
+                    os.remove(sisa)
+            invalidasi_cache_data(path)
+            dikompres.append(key)
+    return dikompres
+
+
+def get_info_partisi_log(file_path):
+    # Ringkasan partisi arsip untuk halaman pengaturan
+    folder = folder_partisi_log(file_path)
+    partisi = baca_manifest_log(file_path).get('partisi', {})
+    return pd.DataFrame([{
+        'Periode': key,
+        'File': info['file'],
+        'Mulai': info['mulai'],
+        'Sampai': info['sampai'],
+        'Baris': info['baris'],
+        'Kompres': info.get('kompres', False),
+        'Ukuran': get_file_size(os.path.join(folder, info['file']))
+    } for key, info in sorted(partisi.items(), key=lambda x: x[1]['mulai'])],
+        columns=['Periode', 'File', 'Mulai', 'Sampai', 'Baris', 'Kompres', 'Ukuran'])
+
+
+def hitung_log(file_path, ctx=None):
+    # Jumlah seluruh log (arsip dari manifest + partisi aktif), tanpa memuat arsip
+    arsip = sum(info['baris'] for info in baca_manifest_log(file_path).get('partisi', {}).values())
+    return arsip + len(load_data(file_path, kolom=['ID_Log'], ctx=ctx))
+
 
-# FUNGSI LOG AKTIVITAS
 def tambah_log(file_path, id_dokumen, aksi, user="Admin"):
-    # Tambah log aktivitas
-    df = load_data(file_path)
+    # Tambah log aktivitas (append-only, O(1) per event)
+    storage = get_storage()
     
-    # Buat dictionary log baru
-    log_baru = {
-        'ID_Log': generate_id_log(df),
-        'ID_Dokumen': str(id_dokumen).strip(),  # PERBAIKAN: strip whitespace
-        'Aksi': aksi,
-        'Waktu': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'User': user
-    }
+    # Pindahkan log periode lama ke arsip jika periode sudah berganti
+    rotasi_log(file_path)
+    
+    # Lock agar dua sesi tidak mendapat ID_Log yang sama
+    with kunci_file(file_path):
+        # Buat dictionary log baru, ID_Log dari sequence
+        log_baru = {
+            'ID_Log': alokasi_id_log(file_path)[0],
+            'ID_Dokumen': str(id_dokumen).strip(),  # PERBAIKAN: strip whitespace
+            'Aksi': aksi,
+            'Waktu': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'User': user
+        }
+        
+        # Konversi ke DataFrame dan tambahkan satu baris ke storage engine
+        tanda_lama = storage.tanda(file_path)
+        df_baru = pd.DataFrame([log_baru])
+        if storage.append(file_path, df_baru):
+            _kabari_rollup_log(file_path, tanda_lama, log_baru)
+
+
+def get_semua_log(file_path, mulai=None, sampai=None, ctx=None):
+    '''
+    Ambil log aktivitas, opsional dalam rentang tanggal [mulai, sampai]
+    (date, datetime atau teks 'YYYY-MM-DD'). Hanya partisi arsip yang
+    beririsan dengan rentang yang dibaca.
+    '''
+    mulai, sampai = _batas_waktu(mulai), _batas_waktu(sampai, akhir=True)
     
-    # Konversi ke DataFrame dan gabungkan
-    df_baru = pd.DataFrame([log_baru])
+    # Partisi arsip dibaca lewat engine CSV + cache bersama
+    bagian = [muat_dengan_cache(_ENGINES['csv'], path)
+              for path in daftar_partisi_log(file_path, mulai, sampai)]
     
-    if len(df) == 0:
-        df = df_baru
-    else:
-        df = pd.concat([df, df_baru], ignore_index=True)
+    # Partisi aktif dilewati jika rentang berakhir sebelum periode aktif
+    aktif = baca_manifest_log(file_path).get('aktif')
+    if sampai is None or aktif is None or sampai[:len(aktif)] >= aktif:
+        bagian.append(load_data(file_path, ctx=ctx))
     
-    save_data(file_path, df)
+    bagian = [df for df in bagian if len(df) > 0]
+    if len(bagian) == 0:
+        return load_data(file_path, ctx=ctx).iloc[0:0]
+    df = bagian[0] if len(bagian) == 1 else pd.concat(bagian, ignore_index=True)
+    
+    if (mulai is not None or sampai is not None) and 'Waktu' in df.columns:
+        waktu = df['Waktu'].astype(str)
+        mask = pd.Series(True, index=df.index)
+        if mulai is not None:
+            mask &= waktu >= mulai
+        if sampai is not None:
+            mask &= waktu <= sampai
+        df = df[mask]
+    return df
 
+# FUNGSI ROLLUP AKTIVITAS
+'''
+Ringkasan jumlah aktivitas per jam dan per hari, per User dan per Aksi
+----------------------------------------------------------------------
+- hitungan[grain][(periode, user, aksi)] = jumlah event; periode diambil
+  dari awalan teks Waktu ('YYYY-MM-DD HH' / 'YYYY-MM-DD'), tanpa parsing tanggal
+- tambah_log langsung menambah counter (O(1) per event)
+- id_maks = ID_Log terbesar yang sudah dihitung; log yang ditulis proses lain,
+  import massal atau dipindah rotasi dikejar dari baris ber-ID_Log > id_maks
+- Disimpan ke data/log.rollup.idx, grafik cukup membaca ringkasan ini
+'''
+# Panjang awalan teks Waktu untuk tiap grain
+GRAIN_ROLLUP = {'jam': 13, 'hari': 10}
+
+_ROLLUP_AKTIF = {}                  # path absolut log -> RollupLog
+_ROLLUP_LOCK = threading.RLock()
+
+
+class RollupLog:
+    nama = 'rollup'
+
+    def __init__(self):
+        self.id_maks = 0            # ID_Log terbesar yang sudah dihitung
+        self.tanda = None           # tanda storage log saat terakhir dikejar
+        self.engine = None
+        self.hitungan = {grain: {} for grain in GRAIN_ROLLUP}
+        self.versi = 0              # naik tiap counter berubah (cache tabel)
+        self.disimpan = 0.0
+        self.kotor = False
+
+    def __getstate__(self):
+        # Tabel hasil (cache) tidak ikut disimpan
+        state = self.__dict__.copy()
+        state.pop('_tabel', None)
+        return state
+
+    def catat(self, df_log):
+        # Tambahkan event di df_log (kolom ID_Log, Waktu, User, Aksi) ke counter
+        if len(df_log) == 0 or 'Waktu' not in df_log.columns:
+            return
+        waktu = df_log['Waktu'].astype(str)
+        user = df_log['User'].fillna('').astype(str) if 'User' in df_log.columns else ''
+        aksi = df_log['Aksi'].fillna('').astype(str) if 'Aksi' in df_log.columns else ''
+        for grain, panjang in GRAIN_ROLLUP.items():
+            kelompok = pd.DataFrame({'p': waktu.str[:panjang], 'u': user, 'a': aksi}).value_counts()
+            hitungan = self.hitungan[grain]
+            for kunci, jumlah in kelompok.items():
+                hitungan[kunci] = hitungan.get(kunci, 0) + int(jumlah)
+        id_log = pd.to_numeric(df_log['ID_Log'], errors='coerce') if 'ID_Log' in df_log.columns else None
+        if id_log is not None and id_log.notna().any():
+            self.id_maks = max(self.id_maks, int(id_log.max()))
+        self.versi += 1
+        self.kotor = True
+
+    def tabel(self, grain):
+        # Counter grain dalam bentuk DataFrame [Periode, User, Aksi, Jumlah] urut Periode
+        cache = getattr(self, '_tabel', {})
+        if grain not in cache or cache[grain][0] != self.versi:
+            data = self.hitungan[grain]
+            df = pd.DataFrame([(p, u, a, j) for (p, u, a), j in data.items()],
+                              columns=['Periode', 'User', 'Aksi', 'Jumlah'])
+            cache[grain] = (self.versi, df.sort_values('Periode', kind='stable', ignore_index=True))
+            self._tabel = cache
+        return cache[grain][1]
+
+
+def path_rollup_log(file_path):
+    # data/log.csv -> data/log.rollup.idx
+    return path_indeks(file_path, RollupLog.nama)
+
+
+def _kejar_rollup(file_path, rollup):
+    # Hitung log yang belum masuk rollup (ID_Log > id_maks): arsip lalu partisi aktif
+    manifest = baca_manifest_log(file_path)
+    folder = folder_partisi_log(file_path)
+    bagian = []
+    for info in sorted(manifest.get('partisi', {}).values(), key=lambda x: x['mulai']):
+        if info['id_maks'] > rollup.id_maks:
+            bagian.append(muat_dengan_cache(_ENGINES['csv'], os.path.join(folder, info['file'])))
+    tanda = get_storage().tanda(file_path)
+    if tanda is None or tanda != rollup.tanda or rollup.engine != get_storage().nama:
+        bagian.append(load_data(file_path))
+    
+    batas = rollup.id_maks
+    for df in bagian:
+        if len(df) == 0 or 'ID_Log' not in df.columns:
+            continue
+        baru = df[pd.to_numeric(df['ID_Log'], errors='coerce') > batas]
+        rollup.catat(baru)
+    rollup.tanda = tanda
+    rollup.engine = get_storage().nama
+
+
+def ambil_rollup_log(file_path):
+    '''
+    Ambil rollup aktivitas yang sudah mencakup semua log saat ini
+    Urutan: memori -> data/log.rollup.idx -> dihitung dari semua partisi
+    '''
+    path = os.path.abspath(file_path)
+    with _ROLLUP_LOCK:
+        rollup = _ROLLUP_AKTIF.get(path)
+        if rollup is None:
+            try:
+                with open(path_rollup_log(file_path), 'rb') as f:
+                    rollup = pickle.load(f)
+                if not isinstance(rollup, RollupLog):
+                    rollup = None
+            except FileNotFoundError:
+                rollup = None
+            except Exception as e:
+                print(f"Warning: Rollup {path_rollup_log(file_path)} rusak, dihitung ulang: {e}")
+                rollup = None
+            rollup = rollup or RollupLog()
+            _ROLLUP_AKTIF[path] = rollup
+        
+        _kejar_rollup(file_path, rollup)
+        if rollup.kotor and time.time() - rollup.disimpan >= INDEKS_SIMPAN_DETIK:
+            _simpan_indeks(file_path, rollup)
+        return rollup
+
+
+def _kabari_rollup_log(file_path, tanda_lama, log_baru):
+    # Dipanggil tambah_log setelah append (di dalam kunci_file): satu event langsung dihitung
+    with _ROLLUP_LOCK:
+        rollup = _ROLLUP_AKTIF.get(os.path.abspath(file_path))
+        if rollup is None or rollup.tanda != tanda_lama or log_baru['ID_Log'] != rollup.id_maks + 1:
+            return      # belum dimuat / tertinggal: dikejar saat dibaca
+        for grain, panjang in GRAIN_ROLLUP.items():
+            kunci = (log_baru['Waktu'][:panjang], str(log_baru['User']), str(log_baru['Aksi']))
+            rollup.hitungan[grain][kunci] = rollup.hitungan[grain].get(kunci, 0) + 1
+        rollup.id_maks = log_baru['ID_Log']
+        rollup.tanda = get_storage().tanda(file_path)
+        rollup.versi += 1
+        rollup.kotor = True
+
+
+@atexit.register
+def _simpan_semua_rollup():
+    # Simpan rollup yang belum tertulis saat proses berhenti
+    with _ROLLUP_LOCK:
+        for path, rollup in _ROLLUP_AKTIF.items():
+            if rollup.kotor:
+                _simpan_indeks(path, rollup)
+
+
+def get_rollup_log(file_path, mulai=None, sampai=None, grain='hari', per=None):
+    '''
+    Jumlah aktivitas per periode dari rollup (tanpa membaca log mentah)
+    grain: 'jam' atau 'hari'
+    per: None (total), 'User' atau 'Aksi' -> kolom tambahan untuk rincian
+    mulai/sampai: rentang tanggal seperti get_semua_log
+    Return DataFrame [Periode, (User|Aksi), Jumlah] urut Periode
+    '''
+    with _ROLLUP_LOCK:
+        tabel = ambil_rollup_log(file_path).tabel(grain)
+    mulai, sampai = _batas_waktu(mulai), _batas_waktu(sampai, akhir=True)
+    
+    # Periode terurut: rentang dipotong dengan binary search
+    periode = tabel['Periode']
+    awal = 0 if mulai is None else periode.searchsorted(mulai[:GRAIN_ROLLUP[grain]], side='left')
+    akhir = len(tabel) if sampai is None else periode.searchsorted(sampai[:GRAIN_ROLLUP[grain]], side='right')
+    tabel = tabel.iloc[awal:akhir]
+    
+    kolom = ['Periode'] + ([per] if per in ('User', 'Aksi') else [])
+    return tabel.groupby(kolom, sort=True)['Jumlah'].sum().reset_index()
 
-def get_semua_log(file_path):
-    # Ambil semua log aktivitas
-    return load_data(file_path)
 
 # FUNGSI QR CODE
-def generate_qr_code(data, output_path):
-    # Generate QR Code dan simpan ke file
+'''
+Generate QR Code
+----------------
+- _render_qr_png(): satu-satunya tempat QR dirender ke bytes PNG, dipakai
+  jalur serial maupun worker sehingga hasilnya identik byte per byte
+- generate_qr_paralel(): pekerjaan dipecah per chunk lalu dikerjakan
+  ProcessPoolExecutor (start method 'spawn', aman untuk server Streamlit
+  yang memakai banyak thread); jumlah worker lewat SMDOK_QR_WORKERS
+  (default = jumlah core CPU), 1 = serial di proses ini
+- PARAMETER_QR: parameter render (ikut dicatat di manifest QR, lihat
+  FUNGSI MANIFEST QR); file PNG yang isinya sudah sama tidak ditulis ulang
+- render_qr_cache() / baca_qr_png(): cache LRU bytes PNG bersama semua sesi
+  (preview form Tambah, st.image dan download_button); kunci = (isi,
+  parameter) atau (path, tanda file), batas SMDOK_CACHE_QR_MB
+'''
+QR_WORKERS = int(os.environ.get('SMDOK_QR_WORKERS', '0')) or (os.cpu_count() or 1)
+UKURAN_CHUNK_QR = 256
 
-    # Buat folder jika belum ada
-    os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
+PARAMETER_QR = {
+    'version': 1,               # ukuran QR code (1 = paling kecil)
+    'error_correction': 'L',    # tingkat koreksi kesalahan: L, M, Q, H
+    'box_size': 10,             # ukuran tiap kotak dalam pixel
+    'border': 4,                # lebar border dalam kotak
+    'fill_color': 'black',
+    'back_color': 'white'
+}
+
+_KOREKSI_QR = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H
+}
+
+
+def _render_qr_png(data, parameter=None):
+    # Render QR Code untuk data, kembalikan isi file PNG (bytes)
+    parameter = parameter or PARAMETER_QR
     
     # Buat objek QR Code
     qr = qrcode.QRCode(
-        version=1,                                          # ukuran QR code (1 = paling kecil)
-        error_correction=qrcode.constants.ERROR_CORRECT_L,  # tingkat koreksi kesalahan
-        box_size=10,                                        # ukuran tiap kotak dalam pixel
-        border=4                                            # lebar border dalam kotak
+        version=parameter['version'],
+        error_correction=_KOREKSI_QR[parameter['error_correction']],
+        box_size=parameter['box_size'],
+        border=parameter['border']
     )
     
     # Tambahkan data ke QR code
     qr.add_data(data)
     qr.make(fit=True)   # sesuaikan ukuran QR code dengan data
     
-    # Buat gambar QR code
-    img = qr.make_image(fill_color="black", back_color="white")
+    # Buat gambar QR code lalu encode ke PNG di memori
+    img = qr.make_image(fill_color=parameter['fill_color'], back_color=parameter['back_color'])
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+CACHE_QR_MAKS_MB = float(os.environ.get('SMDOK_CACHE_QR_MB', 16))
+_UKURAN_ENTRY_QR = 256               # perkiraan overhead per entry (kunci + objek bytes)
+
+_CACHE_QR = CacheLRU()              # kunci -> bytes PNG
+
+
+def _qr_dengan_cache(kunci, buat):
+    # Ambil bytes PNG dari cache, atau buat() lalu simpan (LRU berdasarkan ukuran)
+    png = _CACHE_QR.ambil(kunci)
+    _CACHE_QR.catat(hit=png is not None)
+    if png is not None:
+        return png
+    
+    png = buat()
+    _CACHE_QR.simpan(kunci, png, len(png) + _UKURAN_ENTRY_QR, CACHE_QR_MAKS_MB)
+    return png
+
+
+def render_qr_cache(data, parameter=None):
+    # Seperti _render_qr_png, tapi hasilnya di-cache per (isi, parameter)
+    parameter = parameter or PARAMETER_QR
+    kunci = ('render', str(data), tuple(sorted(parameter.items())))
+    return _qr_dengan_cache(kunci, lambda: _render_qr_png(str(data), parameter))
+
+
+def baca_qr_png(file_path):
+    # Isi file PNG QR dari cache (kunci ikut tanda file, jadi file yang dibuat
+    # ulang otomatis dibaca lagi), None jika file tidak ada
+    tanda = tanda_file(file_path)
+    if tanda is None:
+        return None
+    
+    def baca():
+        with open(file_path, 'rb') as f:
+            return f.read()
+    
+    try:
+        return _qr_dengan_cache(('file', os.path.abspath(file_path), tanda), baca)
+    except OSError:
+        return None
+
+
+def get_statistik_cache_qr():
+    # Statistik cache QR: hit/miss/eviction, entry dan memori terpakai
+    return _CACHE_QR.statistik(CACHE_QR_MAKS_MB)
+
+
+def _tulis_png_qr(output_path, png):
+    # Tulis PNG hanya jika isinya berbeda dari file yang ada (mtime file yang
+    # sama tidak berubah), return sidik file untuk manifest QR
+    try:
+        sama = os.path.getsize(output_path) == len(png)
+        if sama:
+            with open(output_path, 'rb') as f:
+                sama = f.read() == png
+    except OSError:
+        sama = False
+    if not sama:
+        with open(output_path, 'wb') as f:
+            f.write(png)
+    st = os.stat(output_path)
+    return {'sha256': hashlib.sha256(png).hexdigest(), 'ukuran': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def generate_qr_code(data, output_path, parameter=None, id_dokumen=None):
+    # Generate QR Code dan simpan ke file
+    # id_dokumen: jika diisi, hasilnya dicatat di manifest QR folder output
+    # (agar generate batch berikutnya tidak membuat ulang QR ini)
+
+    # Buat folder jika belum ada
+    folder = os.path.dirname(output_path) if os.path.dirname(output_path) else '.'
+    os.makedirs(folder, exist_ok=True)
+    
+    # Simpan gambar ke file
+    sidik = _tulis_png_qr(output_path, _render_qr_png(data, parameter))
+    if id_dokumen is not None:
+        perbarui_manifest_qr(folder, [id_dokumen], [data], [sidik], parameter=parameter)
+    
+    return output_path
+
+
+def _kerjakan_chunk_qr(pekerjaan):
+    # Dijalankan di worker: pekerjaan = (parameter, [(data, output_path)]),
+    # return (error, sidik file) per item (error None = berhasil)
+    parameter, daftar = pekerjaan
+    hasil = []
+    for data, output_path in daftar:
+        try:
+            folder = os.path.dirname(output_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            hasil.append((None, _tulis_png_qr(output_path, _render_qr_png(data, parameter))))
+        except Exception as e:
+            hasil.append((str(e), None))
+    return hasil
+
+
+def generate_qr_paralel(daftar_data, daftar_path, workers=None, ukuran_chunk=UKURAN_CHUNK_QR, progress=None,
+                        parameter=None, dengan_sidik=False):
+    '''
+    Generate banyak QR Code sekaligus memakai beberapa proses
+    daftar_data / daftar_path: isi QR dan path file PNG (berpasangan)
+    workers: jumlah proses (None = QR_WORKERS, 1 = serial)
+    progress: callback(selesai, total) setiap satu chunk selesai
+    parameter: parameter render (None = PARAMETER_QR)
+    Return list error per item (None = berhasil), urut sesuai input;
+    dengan_sidik=True: list (error, sidik file) untuk manifest QR
+    '''
+    pekerjaan = [(str(data), path) for data, path in zip(daftar_data, daftar_path)]
+    chunk = [(parameter, pekerjaan[i:i + ukuran_chunk]) for i in range(0, len(pekerjaan), ukuran_chunk)]
+    hasil = [None] * len(chunk)
+    workers = min(workers or QR_WORKERS, len(chunk))
+    selesai = 0
+    
+    def lapor(i, hasil_chunk):
+        nonlocal selesai
+        hasil[i] = hasil_chunk
+        selesai += len(hasil_chunk)
+        if progress:
+            progress(selesai, len(pekerjaan))
     
-    # Simpan gambar ke file
-    img.save(output_path)
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {pool.submit(_kerjakan_chunk_qr, c): i for i, c in enumerate(chunk)}
+                for future in as_completed(futures):
+                    lapor(futures[future], future.result())
+        except Exception as e:
+            # Worker gagal dijalankan: sisa chunk dikerjakan serial
+            print(f"Warning: Generate QR paralel gagal, lanjut serial: {e}")
     
-    return output_path
+    for i, c in enumerate(chunk):
+        if hasil[i] is None:
+            lapor(i, _kerjakan_chunk_qr(c))
+    if dengan_sidik:
+        return [item for hasil_chunk in hasil for item in hasil_chunk]
+    return [error for hasil_chunk in hasil for error, _ in hasil_chunk]
 
 
 def scan_qr_code(image_file):
     # Scan QR Code dari file gambar (upload atau camera input)
     try:
+        # pyzbar butuh library zbar sistem: diimpor di sini saja agar modul
+        # lain (dan test) tetap bisa dipakai tanpa zbar
+        from pyzbar.pyzbar import decode
+        
         cap = cv2.VideoCapture(0)
         
         if not cap.isOpened():
@@ -430,70 +3508,721 @@ def scan_qr_code(image_file):
         return None, f"Error: {str(e)}"
 
 
-def generate_qr_batch(file_path, output_folder):
-    # Generate QR Code untuk semua dokumen sekaligus
-    df = load_data(file_path)
+def generate_qr_batch(file_path, output_folder, workers=None, progress=None, paksa=False):
+    # Generate QR Code untuk semua dokumen yang QR-nya belum ada atau basi
+    # (lihat rencana_qr_batch; paksa=True: semua dokumen), return ID yang berhasil dibuat
+    rencana = rencana_qr_batch(file_path, output_folder, paksa=paksa)
     os.makedirs(output_folder, exist_ok=True)
+    daftar_id = rencana['perlu']
+    daftar_path = [f"{output_folder}/{id_dokumen}.png" for id_dokumen in daftar_id]
+    hasil = generate_qr_paralel(daftar_id, daftar_path, workers=workers, progress=progress, dengan_sidik=True)
+    perbarui_manifest_qr(output_folder, daftar_id, daftar_id, [sidik for _, sidik in hasil],
+                         hapus=rencana['usang'])
+    
+    # ID yang QR-nya berhasil dibuat
+    return [id_dokumen for id_dokumen, (e, _) in zip(daftar_id, hasil) if e is None]
+
+# FUNGSI MANIFEST QR
+'''
+Generate ulang QR secara inkremental
+------------------------------------
+- <folder QR>/manifest.json mencatat per ID: isi QR, sidik parameter render
+  (isi lengkap parameternya di bagian 'parameter'), sha256, ukuran dan mtime
+  file PNG
+- rencana_qr_batch() hanya memilih QR yang hilang, belum tercatat, isinya
+  berubah, parameternya berubah atau filenya diubah dari luar; file yang
+  ukuran + mtime-nya cocok dengan manifest tidak perlu dibaca sama sekali
+- PNG di folder QR tanpa dokumen (yatim) dilaporkan, hapus_qr_yatim()
+  membersihkannya
+- QR yang dibuat satu per satu (generate_qr_code dengan id_dokumen, mis. dari
+  tambah_dokumen) juga dicatat; hapus_dokumen membuang entrinya
+'''
+VERSI_MANIFEST_QR = 1
+
+_CACHE_RENCANA_QR = {}              # (file, folder, parameter, paksa) -> (versi, rencana)
+_CACHE_RENCANA_QR_LOCK = threading.Lock()
+ALASAN_QR = ['hilang', 'baru', 'isi', 'parameter', 'berubah', 'paksa']
+
+
+def sidik_parameter_qr(parameter=None):
+    # Sidik pendek parameter render (sama = PNG yang dihasilkan sama)
+    teks = json.dumps(parameter or PARAMETER_QR, sort_keys=True)
+    return hashlib.sha256(teks.encode('utf-8')).hexdigest()[:16]
+
+
+def path_manifest_qr(folder_qr):
+    return os.path.join(folder_qr, 'manifest.json')
+
+
+def baca_manifest_qr(folder_qr):
+    # Isi manifest QR (kosong jika belum ada, rusak atau versinya lain)
+    kosong = {'versi': VERSI_MANIFEST_QR, 'parameter': {}, 'qr': {}}
+    path = path_manifest_qr(folder_qr)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return kosong
+    except ValueError as e:
+        print(f"Warning: {path} rusak, semua QR dianggap belum tercatat: {e}")
+        return kosong
+    if manifest.get('versi') != VERSI_MANIFEST_QR:
+        return kosong
+    return manifest
+
+
+def _tulis_manifest_qr(folder_qr, manifest):
+    # Tulis atomic (file sementara + os.replace)
+    path = path_manifest_qr(folder_qr)
+    os.makedirs(folder_qr, exist_ok=True)
+    path_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(path_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+    os.replace(path_tmp, path)
+
+
+def perbarui_manifest_qr(folder_qr, daftar_id, daftar_data, daftar_sidik, parameter=None, hapus=()):
+    '''
+    Catat hasil generate QR ke manifest
+    daftar_sidik: sidik file dari generate_qr_paralel(dengan_sidik=True),
+    None = gagal (entri lama dibuang agar dibuat ulang berikutnya)
+    hapus: ID yang entrinya dibuang (dokumen sudah tidak ada)
+    '''
+    if not len(daftar_id) and not len(hapus):
+        return
+    kunci = sidik_parameter_qr(parameter)
+    with kunci_file(path_manifest_qr(folder_qr)):
+        manifest = baca_manifest_qr(folder_qr)
+        entri = manifest['qr']
+        if not len(daftar_id) and not any(str(i) in entri for i in hapus):
+            return      # tidak ada entri yang berubah
+        for id_dokumen, data, sidik in zip(daftar_id, daftar_data, daftar_sidik):
+            if sidik is None:
+                entri.pop(str(id_dokumen), None)
+            else:
+                entri[str(id_dokumen)] = dict(sidik, data=str(data), parameter=kunci)
+        for id_dokumen in hapus:
+            entri.pop(str(id_dokumen), None)
+        
+        # Simpan hanya parameter yang masih dipakai
+        manifest['parameter'][kunci] = parameter or PARAMETER_QR
+        dipakai = {e['parameter'] for e in entri.values()}
+        manifest['parameter'] = {k: v for k, v in manifest['parameter'].items() if k in dipakai}
+        _tulis_manifest_qr(folder_qr, manifest)
+
+
+def _sha256_file(file_path):
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for blok in iter(lambda: f.read(1 << 16), b''):
+            h.update(blok)
+    return h.hexdigest()
+
+
+def rencana_qr_batch(file_path, folder_qr, parameter=None, paksa=False, segarkan=False):
+    '''
+    Tentukan QR mana yang perlu dibuat ulang tanpa merender apa pun
+    Return dict:
+    - perlu: ID yang perlu dibuat (urut sesuai data)
+    - alasan: jumlah per alasan (lihat ALASAN_QR)
+    - terbaru: jumlah QR yang sudah sesuai manifest
+    - yatim: nama file PNG yang dokumennya sudah tidak ada
+    - usang: ID di manifest yang dokumennya sudah tidak ada
+    Hasil di-cache per versi data + tanda folder QR + tanda manifest, jadi
+    rerun halaman tidak mengulang os.stat per dokumen. File PNG yang diubah
+    di tempat dari luar aplikasi tidak mengubah tanda folder: pakai
+    segarkan=True untuk memeriksa ulang.
+    '''
+    kunci = (os.path.abspath(file_path), os.path.abspath(folder_qr), sidik_parameter_qr(parameter), paksa)
+    versi = (versi_data(file_path), tanda_file(folder_qr), tanda_file(path_manifest_qr(folder_qr)))
+    with _CACHE_RENCANA_QR_LOCK:
+        cache = _CACHE_RENCANA_QR.get(kunci)
+    if cache is not None and cache[0] == versi and not segarkan:
+        return cache[1]
     
-    generated = []
+    rencana = _hitung_rencana_qr(file_path, folder_qr, parameter, paksa)
+    # Versi diambil lagi: _hitung_rencana_qr bisa memperbarui manifest (file disentuh)
+    versi = (versi_data(file_path), tanda_file(folder_qr), tanda_file(path_manifest_qr(folder_qr)))
+    with _CACHE_RENCANA_QR_LOCK:
+        _CACHE_RENCANA_QR[kunci] = (versi, rencana)
+    return rencana
+
+
+def _hitung_rencana_qr(file_path, folder_qr, parameter, paksa):
+    # Isi rencana_qr_batch tanpa cache
+    df = load_data(file_path, kolom=['ID'])
+    daftar_id = df['ID'].astype(str).tolist() if 'ID' in df.columns else []
+    manifest = baca_manifest_qr(folder_qr)
+    entri_qr = manifest['qr']
+    kunci = sidik_parameter_qr(parameter)
+    
+    perlu = []
+    alasan = dict.fromkeys(ALASAN_QR, 0)
+    disentuh = []   # file yang mtime-nya berubah tapi isinya tetap sama
+    for id_dokumen in daftar_id:
+        path = f"{folder_qr}/{id_dokumen}.png"
+        entri = entri_qr.get(id_dokumen)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        
+        if st is None:
+            sebab = 'hilang'
+        elif entri is None:
+            sebab = 'baru'
+        elif entri['data'] != id_dokumen:
+            sebab = 'isi'
+        elif entri['parameter'] != kunci:
+            sebab = 'parameter'
+        elif (st.st_size, st.st_mtime_ns) == (entri['ukuran'], entri['mtime_ns']):
+            sebab = None
+        elif st.st_size == entri['ukuran'] and _sha256_file(path) == entri['sha256']:
+            # Misalnya dipulihkan dari backup: cukup perbarui mtime di manifest
+            sebab = None
+            disentuh.append((id_dokumen, dict(entri, mtime_ns=st.st_mtime_ns)))
+        else:
+            sebab = 'berubah'
+        
+        if sebab is None and paksa:
+            sebab = 'paksa'
+        if sebab is not None:
+            perlu.append(id_dokumen)
+            alasan[sebab] += 1
     
-    # Loop tiap baris dokumen
-    for _, row in df.iterrows():
-        if 'ID' in row:
-            qr_path = f"{output_folder}/{row['ID']}.png"
-            generate_qr_code(row['ID'], qr_path)
-            generated.append(row['ID'])
+    if disentuh:
+        perbarui_manifest_qr(folder_qr, [i for i, _ in disentuh], [e['data'] for _, e in disentuh],
+                             [{k: e[k] for k in ('sha256', 'ukuran', 'mtime_ns')} for _, e in disentuh],
+                             parameter=parameter)
     
-    return generated
+    ada = set(daftar_id)
+    yatim = []
+    if os.path.isdir(folder_qr):
+        yatim = sorted(f for f in os.listdir(folder_qr) if f.endswith('.png') and f[:-4] not in ada)
+    return {
+        'perlu': perlu,
+        'alasan': alasan,
+        'terbaru': len(daftar_id) - len(perlu),
+        'yatim': yatim,
+        'usang': [id_dokumen for id_dokumen in entri_qr if id_dokumen not in ada]
+    }
 
-# FUNGSI STATISTIK
-def get_statistik(file_path):
-    # Ambil statistik dokumen
-    df = load_data(file_path)
+
+def hapus_qr_yatim(folder_qr, daftar_file):
+    # Hapus file PNG yatim (dari rencana_qr_batch) beserta entri manifestnya, return jumlah terhapus
+    terhapus = []
+    for nama in daftar_file:
+        try:
+            os.remove(os.path.join(folder_qr, nama))
+            terhapus.append(nama)
+        except OSError as e:
+            print(f"Warning: Gagal menghapus {nama}: {e}")
+    perbarui_manifest_qr(folder_qr, [], [], [], hapus=[nama[:-4] for nama in terhapus])
+    return len(terhapus)
+
+# FUNGSI EKSPOR QR
+'''
+Download QR Code massal
+-----------------------
+- daftar_qr(): ID dokumen (sesuai filter Jenis/Status/Lokasi, lewat
+  cari_query_faset) yang file QR-nya ada, cukup satu os.listdir
+- buat_zip_qr(): satu file ZIP dibuat saat diminta saja, ditulis streaming
+  per file (ZIP_STORED karena PNG sudah terkompresi) ke FOLDER_EKSPOR_QR.
+  Nama file memuat sidik filter + (nama, ukuran, mtime) semua PNG, jadi ZIP
+  dipakai ulang sampai kumpulan QR-nya berubah
+- thumbnail_qr(): gambar kecil untuk grid, di-cache di cache QR
+'''
+FOLDER_EKSPOR_QR = 'ekspor_qr'
+MAKS_ZIP_QR = 5                     # jumlah file ekspor lama (ZIP / lembar label) yang disimpan
+
+
+def daftar_qr(file_path, folder_qr, jenis="Semua", status="Semua", lokasi="Semua", ctx=None):
+    # List ID dokumen (urut sesuai data) yang punya file <folder_qr>/<ID>.png
+    if not os.path.isdir(folder_qr):
+        return []
+    df, _ = cari_query_faset(file_path, "", jenis, status, lokasi, ctx=ctx)
+    if len(df) == 0 or 'ID' not in df.columns:
+        return []
+    ada = {f[:-4] for f in os.listdir(folder_qr) if f.endswith('.png')}
+    return [id_dokumen for id_dokumen in df['ID'].astype(str) if id_dokumen in ada]
+
+
+def thumbnail_qr(file_path, ukuran=120):
+    # Bytes PNG kecil (ukuran x ukuran pixel) dari file QR, None jika file tidak ada
+    tanda = tanda_file(file_path)
+    if tanda is None:
+        return None
     
-    # Return statistik kosong jika data kosong
-    if len(df) == 0:
-        return {
-            'total': 0,
-            'per_jenis': {},
-            'per_status': {},
-            'per_lokasi': {}
-        }
+    def buat():
+        with Image.open(file_path) as img:
+            # NEAREST agar tepi modul QR tetap tajam
+            kecil = img.convert('L').resize((ukuran, ukuran), Image.NEAREST)
+        buffer = io.BytesIO()
+        kecil.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+    
+    try:
+        return _qr_dengan_cache(('thumbnail', os.path.abspath(file_path), tanda, ukuran), buat)
+    except OSError:
+        return None
+
+
+def buat_zip_qr(file_path, folder_qr, jenis="Semua", status="Semua", lokasi="Semua", folder_ekspor=None):
+    '''
+    Buat (atau pakai ulang) ZIP berisi QR Code dokumen sesuai filter
+    Return (path ZIP, jumlah file), path None jika tidak ada QR yang cocok
+    '''
+    folder_ekspor = folder_ekspor or FOLDER_EKSPOR_QR
+    sidik = hashlib.sha256(json.dumps([jenis, status, lokasi]).encode('utf-8'))
+    file_qr = []
+    for id_dokumen in daftar_qr(file_path, folder_qr, jenis, status, lokasi):
+        path = f"{folder_qr}/{id_dokumen}.png"
+        tanda = tanda_file(path)
+        if tanda is not None:
+            file_qr.append((path, f"{id_dokumen}.png"))
+            sidik.update(f"{id_dokumen}\0{tanda[1]}\0{tanda[2]}\n".encode('utf-8'))
+    if not file_qr:
+        return None, 0
+    
+    os.makedirs(folder_ekspor, exist_ok=True)
+    path_zip = os.path.join(folder_ekspor, f"qr_{sidik.hexdigest()[:16]}.zip")
+    # Satu kunci untuk seluruh folder ekspor (bukan per ZIP, agar tidak ada file .lock yatim)
+    with kunci_file(os.path.join(folder_ekspor, 'qr.zip')):
+        if os.path.exists(path_zip):
+            os.utime(path_zip)  # tandai baru dipakai
+            return path_zip, len(file_qr)
+        
+        # Ditulis per file ke disk (tidak ditampung di memori), atomic lewat os.replace
+        path_tmp = f"{path_zip}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with zipfile.ZipFile(path_tmp, 'w', zipfile.ZIP_STORED) as zipf:
+                for path, arcname in file_qr:
+                    try:
+                        zipf.write(path, arcname)
+                    except FileNotFoundError:
+                        pass    # dihapus di tengah jalan
+            os.replace(path_tmp, path_zip)
+        finally:
+            if os.path.exists(path_tmp):
+                os.remove(path_tmp)
+    
+    _bersihkan_ekspor_qr(folder_ekspor, 'qr_')
+    return path_zip, len(file_qr)
+
+
+def _bersihkan_ekspor_qr(folder_ekspor, awalan):
+    # Buang file ekspor lama berawalan tertentu, sisakan MAKS_ZIP_QR yang terakhir dipakai
+    lama = sorted((os.path.join(folder_ekspor, f) for f in os.listdir(folder_ekspor)
+                   if f.startswith(awalan) and not f.endswith(('.lock', '.tmp'))),
+                  key=lambda path: (tanda_file(path) or (0, 0, 0))[2])
+    for path in lama[:-MAKS_ZIP_QR]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# FUNGSI LEMBAR LABEL QR
+'''
+Cetak label QR per lembar
+-------------------------
+- buat_lembar_label(): kolom x baris label per halaman (QR + ID, Judul,
+  Lokasi_Fisik) di atas kertas UKURAN_KERTAS, dokumen dipilih lewat filter
+  Jenis/Status/Lokasi seperti Download QR
+- Halaman dirender paralel di worker (spawn, seperti generate_qr_paralel)
+  dengan paling banyak 2 x workers halaman di antrean, lalu ditulis
+  berurutan langsung ke file: PDF lewat _PenulisPDF atau ZIP berisi PNG
+  per halaman. Memori tetap datar walau labelnya puluhan ribu
+- QR digambar dari _render_qr_png (PARAMETER_QR), sama dengan file qr/
+'''
+UKURAN_KERTAS = {               # lebar x tinggi dalam mm
+    'A4': (210, 297),
+    'A5': (148, 210),
+    'Letter': (215.9, 279.4),
+    'Legal': (215.9, 355.6)
+}
+DPI_LABEL = 200
+
+
+class _PenulisPDF:
+    '''
+    Penulis PDF minimal yang streaming ke file: tiap halaman satu gambar
+    DeviceGray 8 bit (FlateDecode) seukuran kertas. Yang ditahan di memori
+    hanya offset tiap objek; objek Pages (nomor 2) ditulis paling akhir
+    karena berisi daftar semua halaman.
+    '''
+    def __init__(self, f, lebar_pt, tinggi_pt):
+        self.f = f
+        self.lebar_pt = lebar_pt
+        self.tinggi_pt = tinggi_pt
+        self.offset = {}
+        self.halaman = []
+        self.nomor = 2              # 1 = Catalog, 2 = Pages
+        f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    
+    def _objek(self, nomor, kamus, stream=None):
+        self.offset[nomor] = self.f.tell()
+        self.f.write(f"{nomor} 0 obj\n{kamus}".encode('latin-1'))
+        if stream is not None:
+            self.f.write(b'\nstream\n')
+            self.f.write(stream)
+            self.f.write(b'\nendstream')
+        self.f.write(b'\nendobj\n')
+    
+    def _nomor_baru(self):
+        self.nomor += 1
+        return self.nomor
+    
+    def tambah_halaman(self, data, lebar_px, tinggi_px):
+        # data: piksel abu-abu (lebar_px x tinggi_px) yang sudah di-zlib
+        gambar, konten, halaman = self._nomor_baru(), self._nomor_baru(), self._nomor_baru()
+        self._objek(gambar, f"<< /Type /XObject /Subtype /Image /Width {lebar_px} /Height {tinggi_px} "
+                            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+                            f"/Length {len(data)} >>", data)
+        isi = f"q {self.lebar_pt:.2f} 0 0 {self.tinggi_pt:.2f} 0 0 cm /Im0 Do Q".encode('latin-1')
+        self._objek(konten, f"<< /Length {len(isi)} >>", isi)
+        self._objek(halaman, f"<< /Type /Page /Parent 2 0 R "
+                             f"/MediaBox [0 0 {self.lebar_pt:.2f} {self.tinggi_pt:.2f}] "
+                             f"/Resources << /XObject << /Im0 {gambar} 0 R >> >> /Contents {konten} 0 R >>")
+        self.halaman.append(halaman)
+    
+    def tutup(self):
+        kids = ' '.join(f"{nomor} 0 R" for nomor in self.halaman)
+        self._objek(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        self._objek(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.halaman)} >>")
+        xref = self.f.tell()
+        jumlah = self.nomor + 1
+        self.f.write(f"xref\n0 {jumlah}\n0000000000 65535 f \n".encode('latin-1'))
+        for nomor in range(1, jumlah):
+            self.f.write(f"{self.offset[nomor]:010d} 00000 n \n".encode('latin-1'))
+        self.f.write(f"trailer\n<< /Size {jumlah} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1'))
+
+
+@lru_cache(maxsize=16)
+def _font_label(ukuran, tebal=False):
+    # Font caption label (DejaVu jika ada, selain itu font bawaan Pillow)
+    try:
+        return ImageFont.truetype('DejaVuSans-Bold.ttf' if tebal else 'DejaVuSans.ttf', ukuran)
+    except OSError:
+        return ImageFont.load_default(size=ukuran)
+
+
+def _potong_teks(gambar, teks, font, lebar):
+    # Potong teks dengan '...' agar muat dalam lebar pixel
+    if gambar.textlength(teks, font=font) <= lebar:
+        return teks
+    # Cari panjang terpanjang yang masih muat (binary search)
+    bawah, atas = 0, len(teks)
+    while bawah < atas:
+        tengah = (bawah + atas + 1) // 2
+        if gambar.textlength(teks[:tengah] + '...', font=font) <= lebar:
+            bawah = tengah
+        else:
+            atas = tengah - 1
+    return teks[:bawah] + '...'
+
+
+def _render_halaman_label(pekerjaan):
+    # Dijalankan di worker: pekerjaan = (tata letak, [(ID, Judul, Lokasi)]),
+    # return bytes halaman (zlib piksel abu-abu untuk PDF, PNG untuk format png)
+    tata, daftar_label = pekerjaan
+    halaman = Image.new('L', (tata['lebar'], tata['tinggi']), 255)
+    gambar = ImageDraw.Draw(halaman)
+    sel_w, sel_h, pad = tata['sel_w'], tata['sel_h'], tata['pad']
+    font_id = _font_label(tata['font'], tebal=True)
+    font_teks = _font_label(tata['font'])
+    tinggi_baris = int(tata['font'] * 1.3)
+    
+    for i, (id_dokumen, judul, lokasi) in enumerate(daftar_label):
+        x0 = tata['margin_x'] + (i % tata['kolom']) * sel_w
+        y0 = tata['margin_y'] + (i // tata['kolom']) * sel_h
+        gambar.rectangle([x0, y0, x0 + sel_w - 1, y0 + sel_h - 1], outline=200)    # garis potong
+        
+        # Sel lebar: QR di kiri, teks di kanan; selain itu QR di atas, teks di bawah
+        if tata['mendatar']:
+            sisi = sel_h - 2 * pad
+            x_teks, y_teks, lebar_teks = x0 + sisi + 2 * pad, y0 + (sel_h - 3 * tinggi_baris) // 2, sel_w - sisi - 3 * pad
+            posisi_qr = (x0 + pad, y0 + pad)
+        else:
+            sisi = min(sel_w - 2 * pad, sel_h - 3 * pad - 3 * tinggi_baris)
+            x_teks, y_teks, lebar_teks = x0 + pad, y0 + 2 * pad + sisi, sel_w - 2 * pad
+            posisi_qr = (x0 + (sel_w - sisi) // 2, y0 + pad)
+        
+        with Image.open(io.BytesIO(_render_qr_png(id_dokumen))) as qr:
+            halaman.paste(qr.convert('L').resize((sisi, sisi), Image.NEAREST), posisi_qr)
+        for baris, (teks, font) in enumerate(((id_dokumen, font_id), (judul, font_teks), (lokasi, font_teks))):
+            teks = _potong_teks(gambar, teks, font, lebar_teks)
+            if tata['mendatar']:
+                x = x_teks
+            else:
+                x = x_teks + (lebar_teks - gambar.textlength(teks, font=font)) // 2
+            gambar.text((x, y_teks + baris * tinggi_baris), teks, fill=0, font=font)
+    
+    if tata['format'] == 'pdf':
+        return zlib.compress(halaman.tobytes(), 6)
+    buffer = io.BytesIO()
+    halaman.save(buffer, format='PNG', optimize=True, dpi=(tata['dpi'], tata['dpi']))
+    return buffer.getvalue()
+
+
+def _peta_berurutan(fungsi, daftar_pekerjaan, workers):
+    # Seperti map(fungsi, daftar_pekerjaan) di ProcessPoolExecutor, tapi paling
+    # banyak 2 x workers pekerjaan di antrean dan hasil di-yield sesuai urutan;
+    # jika worker gagal dijalankan, sisanya dikerjakan serial
+    berikut = 0
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                antrean = deque()
+                for pekerjaan in daftar_pekerjaan:
+                    antrean.append(pool.submit(fungsi, pekerjaan))
+                    if len(antrean) >= 2 * workers:
+                        yield antrean.popleft().result()
+                        berikut += 1
+                while antrean:
+                    yield antrean.popleft().result()
+                    berikut += 1
+        except Exception as e:
+            print(f"Warning: Render paralel gagal, lanjut serial: {e}")
+    for pekerjaan in daftar_pekerjaan[berikut:]:
+        yield fungsi(pekerjaan)
+
+
+def buat_lembar_label(file_path, output_path, kertas='A4', kolom=3, baris=8, format_output='pdf',
+                      jenis="Semua", status="Semua", lokasi="Semua", margin_mm=8, dpi=DPI_LABEL,
+                      workers=None, progress=None):
+    '''
+    Buat lembar label QR untuk dokumen sesuai filter
+    format_output: 'pdf' (satu file PDF) atau 'png' (ZIP berisi PNG per halaman)
+    progress: callback(selesai, total) setiap satu halaman ditulis
+    Return (jumlah label, jumlah halaman). Melempar ValueError jika
+    pilihan kertas/grid tidak valid atau sel terlalu kecil.
+    '''
+    if kertas not in UKURAN_KERTAS:
+        raise ValueError(f"Ukuran kertas tidak dikenal: {kertas}")
+    if format_output not in ('pdf', 'png'):
+        raise ValueError(f"Format tidak dikenal: {format_output}")
+    if kolom < 1 or baris < 1:
+        raise ValueError("Kolom dan baris minimal 1")
     
-    # Hitung statistik menggunakan value_counts()
-    # value_counts() menghitung frekuensi setiap nilai unik
-    # to_dict() mengkonversi ke dictionary
-    stats = {
-        'total': len(df),
-        'per_jenis': df['Jenis'].value_counts().to_dict() if 'Jenis' in df.columns else {},
-        'per_status': df['Status'].value_counts().to_dict() if 'Status' in df.columns else {},
-        'per_lokasi': df['Lokasi_Fisik'].value_counts().to_dict() if 'Lokasi_Fisik' in df.columns else {}
+    # Tata letak dalam pixel
+    lebar_mm, tinggi_mm = UKURAN_KERTAS[kertas]
+    px = lambda mm: int(round(mm / 25.4 * dpi))
+    lebar, tinggi, margin = px(lebar_mm), px(tinggi_mm), px(margin_mm)
+    sel_w, sel_h = (lebar - 2 * margin) // kolom, (tinggi - 2 * margin) // baris
+    font = max(8, int(min(sel_w, sel_h) * 0.075))
+    tata = {
+        'lebar': lebar, 'tinggi': tinggi, 'kolom': kolom, 'sel_w': sel_w, 'sel_h': sel_h,
+        'margin_x': (lebar - kolom * sel_w) // 2, 'margin_y': (tinggi - baris * sel_h) // 2,
+        'pad': max(2, int(min(sel_w, sel_h) * 0.05)), 'font': font, 'dpi': dpi,
+        'mendatar': sel_w >= sel_h * 1.6, 'format': format_output
     }
+    sisi_qr = (sel_h - 2 * tata['pad'] if tata['mendatar']
+               else min(sel_w - 2 * tata['pad'], sel_h - 3 * tata['pad'] - 3 * int(font * 1.3)))
+    if sisi_qr < px(10):
+        raise ValueError("Label terlalu kecil untuk QR Code (minimal 10 mm), kurangi kolom/baris")
+    
+    # Data label (hanya teks, gambar dirender per halaman di worker)
+    df, _ = cari_query_faset(file_path, "", jenis, status, lokasi)
+    if len(df) == 0 or 'ID' not in df.columns:
+        return 0, 0
+    # Spasi/baris baru dirapatkan jadi satu spasi: caption label selalu satu
+    # baris (textlength tidak bisa mengukur teks multi-baris)
+    teks = lambda kolom_df: ([' '.join(str(v).split()) for v in df[kolom_df].fillna('')]
+                             if kolom_df in df.columns else [''] * len(df))
+    daftar_label = list(zip(teks('ID'), teks('Judul'), teks('Lokasi_Fisik')))
+    per_halaman = kolom * baris
+    pekerjaan = [(tata, daftar_label[i:i + per_halaman]) for i in range(0, len(daftar_label), per_halaman)]
+    workers = min(workers or QR_WORKERS, len(pekerjaan))
+    
+    # Tulis halaman satu per satu ke file sementara, lalu os.replace
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    path_tmp = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(path_tmp, 'wb') as f:
+            hasil = _peta_berurutan(_render_halaman_label, pekerjaan, workers)
+            if format_output == 'pdf':
+                pdf = _PenulisPDF(f, lebar_mm / 25.4 * 72, tinggi_mm / 25.4 * 72)
+                for i, data in enumerate(hasil):
+                    pdf.tambah_halaman(data, lebar, tinggi)
+                    if progress:
+                        progress(i + 1, len(pekerjaan))
+                pdf.tutup()
+            else:
+                with zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as zipf:
+                    for i, data in enumerate(hasil):
+                        zipf.writestr(f"label_{i + 1:04d}.png", data)
+                        if progress:
+                            progress(i + 1, len(pekerjaan))
+        os.replace(path_tmp, output_path)
+    finally:
+        if os.path.exists(path_tmp):
+            os.remove(path_tmp)
+    return len(daftar_label), len(pekerjaan)
+
+
+def antrekan_lembar_label(file_path, output_path, **opsi):
+    # Jalankan buat_lembar_label di thread background, kembalikan job_id untuk
+    # get_status_qr() (total/selesai = halaman, 'path' dan 'label' saat selesai)
+    job_id = f"label-{time.time_ns()}"
+    status = _daftarkan_job_qr(job_id, {'total': 0, 'selesai': 0, 'gagal': 0, 'jalan': True,
+                                        'path': None, 'label': 0, 'error': None})
+    
+    def kerja():
+        akhir = {}
+        try:
+            label, halaman = buat_lembar_label(
+                file_path, output_path,
+                progress=lambda selesai, total: _perbarui_job_qr(status, selesai=selesai, total=total), **opsi)
+            akhir = dict(label=label, total=halaman, selesai=halaman, path=output_path if halaman else None)
+        except Exception as e:
+            print(f"Error buat lembar label: {e}")
+            akhir = dict(gagal=1, error=str(e))
+        folder = os.path.dirname(output_path)
+        if folder and os.path.isdir(folder):
+            _bersihkan_ekspor_qr(folder, 'label_')
+        _selesaikan_job_qr(job_id, **akhir)
+    
+    threading.Thread(target=kerja, name=job_id, daemon=True).start()
+    return job_id
+
+# FUNGSI STATISTIK
+def get_statistik(file_path, ctx=None):
+    # Ambil statistik dokumen
+    # Dibaca dari counter IndeksStatistik yang diperbarui tiap tambah/ubah/hapus;
+    # hitung ulang penuh hanya jika data berubah di luar aplikasi
+    indeks = ambil_indeks(file_path, 'statistik', ctx=ctx)
+    
+    # Urutkan dari jumlah terbanyak (sama seperti value_counts)
+    def urut(hitungan):
+        return dict(sorted(hitungan.items(), key=lambda x: -x[1]))
     
+    stats = {'total': int(indeks.total)}
+    for kolom, nama in KOLOM_STATISTIK.items():
+        stats[nama] = urut(indeks.hitungan[kolom]) if indeks.total else {}
     return stats
 
 
-def get_dokumen_terbaru(file_path, limit=5):
+def get_dokumen_terbaru(file_path, limit=5, ctx=None):
     # Ambil dokumen terbaru
-    df = load_data(file_path)
+    # Data append-only: dokumen terbaru ada di akhir, dibaca lewat tail engine
+    # (CSV: baca mundur beberapa KB, SQLite: ORDER BY rowid DESC LIMIT);
+    # jika ctx sudah memuat file ini, diambil dari data yang sama
+    df = ctx.ekor(file_path, limit) if ctx is not None else None
+    if df is None:
+        df = get_storage().tail(file_path, limit)
     if len(df) == 0:
         return pd.DataFrame()
     
-    # tail() ambil n baris terakhir, iloc[::-1] balik urutan
-    return df.tail(limit).iloc[::-1]
+    # iloc[::-1] balik urutan (terbaru di atas)
+    return df.iloc[::-1]
 
 
-def get_log_terbaru(file_path, limit=5):
-    # Ambil log aktivitas terbaru
-    df = load_data(file_path)
+def get_log_terbaru(file_path, limit=5, mulai=None, sampai=None, ctx=None):
+    # Ambil log aktivitas terbaru (opsional dalam rentang tanggal)
+    if mulai is not None or sampai is not None:
+        df = get_semua_log(file_path, mulai, sampai, ctx=ctx)
+    else:
+        df = get_storage().tail(file_path, limit)
+        # Partisi aktif kurang dari limit: lengkapi dari arsip terbaru
+        arsip = daftar_partisi_log(file_path)
+        while len(df) < limit and arsip:
+            path = arsip.pop()
+            if path.endswith('.gz'):
+                df_arsip = muat_dengan_cache(_ENGINES['csv'], path).tail(limit - len(df))
+            else:
+                df_arsip = _ENGINES['csv'].tail(path, limit - len(df))
+            if len(df_arsip) > 0:
+                df = pd.concat([df_arsip, df], ignore_index=True) if len(df) > 0 else df_arsip
     if len(df) == 0:
         return pd.DataFrame()
     
     return df.tail(limit).iloc[::-1]
 
 # FUNGSI GRAFIK
-def buat_pie_chart(df, kolom, judul):
+'''
+Cache figure Plotly (dipakai semua sesi)
+----------------------------------------
+- Kunci: (jenis grafik, kolom, judul, versi data, tema); versi diberikan
+  pemanggil (mis. versi_data(file)), tanpa versi figure selalu dibangun ulang
+- Data boleh diberikan sebagai fungsi pemuat: cache hit tidak memuat data
+  sama sekali, hanya versi_data() yang dibaca
+- Entry hanya menyimpan spec JSON figure (teks, tidak bisa diubah pemanggil);
+  cache hit membuat Figure baru dari spec tanpa value_counts dan tanpa
+  validasi ulang Plotly (spec berasal dari Figure yang sudah valid), jadi
+  tiap pemanggil mendapat Figure sendiri yang boleh diubah
+- Memori dibatasi CACHE_GRAFIK_MAKS_MB (LRU)
+- waktu_grafik_terakhir(): waktu pembuatan grafik terakhir di thread (sesi) ini
+'''
+CACHE_GRAFIK_MAKS_MB = float(os.environ.get('SMDOK_CACHE_GRAFIK_MB', 8))
+
+# Nama tema warna grafik (ikut kunci cache, ganti jika warna di bawah diubah)
+TEMA_GRAFIK = 'gelap'
+
+_CACHE_GRAFIK = CacheLRU()          # kunci -> {'spec', 'ms_bangun'}
+_WAKTU_GRAFIK = threading.local()
+
+
+def _figure_dari_spec(spec):
+    # Figure baru dari spec JSON cache ('' = tidak ada grafik)
+    if not spec:
+        return None
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+def _grafik_dengan_cache(jenis, kolom, judul, versi, bangun):
+    # Ambil figure dari cache, atau bangun() lalu simpan spec-nya
+    mulai = time.perf_counter()
+    kunci = (jenis, kolom, judul, versi, TEMA_GRAFIK, tuple(CHART_COLORS))
+    if versi is not None:
+        entry = _CACHE_GRAFIK.ambil(kunci)
+        _CACHE_GRAFIK.catat(hit=entry is not None)
+        if entry is not None:
+            fig = _figure_dari_spec(entry['spec'])
+            _WAKTU_GRAFIK.terakhir = {'jenis': jenis, 'kolom': kolom, 'cache': True,
+                                      'ms': (time.perf_counter() - mulai) * 1000,
+                                      'ms_bangun': entry['ms_bangun']}
+            return fig
+    
+    fig = bangun()
+    ms_bangun = (time.perf_counter() - mulai) * 1000
+    _WAKTU_GRAFIK.terakhir = {'jenis': jenis, 'kolom': kolom, 'cache': False,
+                              'ms': ms_bangun, 'ms_bangun': ms_bangun}
+    if versi is None:
+        return fig
+    
+    spec = fig.to_json() if fig is not None else ''
+    _CACHE_GRAFIK.simpan(kunci, {'spec': spec, 'ms_bangun': ms_bangun}, len(spec) + 256, CACHE_GRAFIK_MAKS_MB)
+    return fig
+
+
+def waktu_grafik_terakhir():
+    # {'jenis', 'kolom', 'cache', 'ms', 'ms_bangun'} grafik terakhir di sesi ini, None jika belum ada
+    return getattr(_WAKTU_GRAFIK, 'terakhir', None)
+
+
+def get_statistik_cache_grafik():
+    # Statistik cache grafik: hit/miss/eviction, entry dan memori terpakai
+    return _CACHE_GRAFIK.statistik(CACHE_GRAFIK_MAKS_MB)
+
+
+def _data_grafik(df):
+    # df boleh berupa fungsi pemuat tanpa argumen: data baru dimuat saat
+    # figure benar-benar perlu dibangun (cache miss)
+    return df() if callable(df) else df
+
+
+def buat_pie_chart(df, kolom, judul, versi=None):
     # Buat pie chart (donut chart)
+    # df: DataFrame atau fungsi yang mengembalikan DataFrame (lihat _data_grafik)
+    # versi: versi data df (mis. versi_data(file)) agar figure diambil dari cache
+    return _grafik_dengan_cache('pie', kolom, judul, versi,
+                                lambda: _bangun_pie_chart(_data_grafik(df), kolom, judul))
+
+
+def _bangun_pie_chart(df, kolom, judul):
     if len(df) == 0 or kolom not in df.columns:
         return None
     
@@ -523,8 +4252,15 @@ def buat_pie_chart(df, kolom, judul):
     return fig
 
 
-def buat_bar_chart(df, kolom, judul):
+def buat_bar_chart(df, kolom, judul, versi=None):
     # Buat bar chart
+    # df: DataFrame atau fungsi yang mengembalikan DataFrame (lihat _data_grafik)
+    # versi: versi data df (mis. versi_data(file)) agar figure diambil dari cache
+    return _grafik_dengan_cache('bar', kolom, judul, versi,
+                                lambda: _bangun_bar_chart(_data_grafik(df), kolom, judul))
+
+
+def _bangun_bar_chart(df, kolom, judul):
     if len(df) == 0 or kolom not in df.columns:
         return None
     
@@ -553,31 +4289,58 @@ def buat_bar_chart(df, kolom, judul):
     return fig
 
 
-def buat_line_chart(df, judul):
-    # Buat line chart aktivitas per hari
-    if len(df) == 0 or 'Waktu' not in df.columns:
+def buat_line_chart(df, judul, per=None, versi=None):
+    # Buat line chart aktivitas per periode
+    # df: hasil get_rollup_log (kolom Periode, Jumlah) atau log mentah (kolom Waktu, dihitung per hari),
+    #     boleh juga fungsi yang mengembalikannya (lihat _data_grafik)
+    # per: 'User' / 'Aksi' -> satu garis per nilai kolom tersebut
+    # versi: identitas data df (versi log + rentang + grain) agar figure diambil dari cache
+    return _grafik_dengan_cache('line', per, judul, versi,
+                                lambda: _bangun_line_chart(_data_grafik(df), judul, per))
+
+
+def _bangun_line_chart(df, judul, per=None):
+    if len(df) == 0 or ('Periode' not in df.columns and 'Waktu' not in df.columns):
         return None
     
     try:
-        # Ekstrak tanggal dari kolom Waktu
-        df_temp = df.copy()
-        df_temp['Tanggal'] = pd.to_datetime(df_temp['Waktu']).dt.date
-        
-        # Hitung jumlah aktivitas per tanggal
-        data = df_temp.groupby('Tanggal').size()
+        if 'Periode' not in df.columns:
+            # Log mentah: tanggal = 10 karakter awal Waktu (tanpa pd.to_datetime)
+            kolom = ['Periode'] + ([per] if per in df.columns else [])
+            df = (df.assign(Periode=df['Waktu'].astype(str).str[:10])
+                  .groupby(kolom).size().reset_index(name='Jumlah'))
         
-        if len(data) == 0:
+        if len(df) == 0:
             return None
         
-        # Buat line chart dengan area fill
-        fig = go.Figure(data=[go.Scatter(
-            x=data.index.tolist(),
-            y=data.values.tolist(),
-            mode='lines+markers',           # garis dengan marker titik
-            fill='tozeroy',                 # fill area sampai sumbu y = 0
-            line=dict(color='#8b5cf6', width=3),
-            marker=dict(size=8, color='#8b5cf6')
-        )])
+        # 'YYYY-MM-DD HH' dilengkapi menit agar dikenali sebagai waktu oleh Plotly
+        periode = df['Periode'].astype(str)
+        df = df.assign(Periode=periode.where(periode.str.len() != 13, periode + ':00'))
+        
+        if per in df.columns:
+            # Satu garis per User / Aksi
+            garis = []
+            for i, (nilai, bagian) in enumerate(df.groupby(per, sort=True)):
+                warna = CHART_COLORS[i % len(CHART_COLORS)]
+                garis.append(go.Scatter(
+                    x=bagian['Periode'].tolist(),
+                    y=bagian['Jumlah'].tolist(),
+                    mode='lines+markers',
+                    name=str(nilai),
+                    line=dict(color=warna, width=2),
+                    marker=dict(size=6, color=warna)
+                ))
+            fig = go.Figure(data=garis)
+        else:
+            # Buat line chart dengan area fill
+            fig = go.Figure(data=[go.Scatter(
+                x=df['Periode'].tolist(),
+                y=df['Jumlah'].tolist(),
+                mode='lines+markers',           # garis dengan marker titik
+                fill='tozeroy',                 # fill area sampai sumbu y = 0
+                line=dict(color='#8b5cf6', width=3),
+                marker=dict(size=8, color='#8b5cf6')
+            )])
         
         fig.update_layout(
             title=dict(text=judul, font=dict(color='#fafafa', size=16)),
@@ -586,6 +4349,7 @@ def buat_line_chart(df, judul):
             font=dict(color='#fafafa'),
             xaxis=dict(tickfont=dict(color='#b0b8c4'), gridcolor='#2d3139'),
             yaxis=dict(tickfont=dict(color='#b0b8c4'), gridcolor='#2d3139'),
+            legend=dict(font=dict(color='#fafafa')),
             margin=dict(l=20, r=20, t=50, b=20)
         )
         
@@ -594,12 +4358,61 @@ def buat_line_chart(df, judul):
         return None
 
 # FUNGSI PENCARIAN & FILTER
-def cari_dokumen(file_path, keyword):
-    # Cari dokumen berdasarkan keyword
+def cari_id_dokumen(file_path, keyword, ambang=None):
+    '''
+    Cari ID dokumen yang cocok dengan keyword, urut dari paling relevan
+    - Hasil indeks teks (kata persis / stem / prefix) di urutan atas
+    - Disusul hasil fuzzy indeks trigram (salah ketik) di atas ambang
+    Skor fuzzy dikali 0.5 sehingga selalu di bawah skor kata persis
+    (skor indeks teks minimal log(2) x bobot 1.0).
+    Return list (ID, skor)
+    '''
+    hasil = ambil_indeks(file_path, 'teks').cari(keyword)
+    sudah = {id_dokumen for id_dokumen, _ in hasil}
+    for id_dokumen, skor in ambil_indeks(file_path, 'trigram').cari(keyword, ambang):
+        if id_dokumen not in sudah:
+            hasil.append((id_dokumen, skor * 0.5))
+    return hasil
+
+
+def _mask_frasa(df, frasa):
+    # Substring persis (tanpa beda huruf) di kolom yang diindeks teks
+    mask = np.zeros(len(df), dtype=bool)
+    for kolom in BOBOT_KOLOM_TEKS:
+        if kolom in df.columns:
+            mask |= df[kolom].astype(str).str.contains(frasa, case=False, regex=False).to_numpy()
+    return mask
+
+
+def cari_dokumen(file_path, keyword, ambang=None):
+    '''
+    Cari dokumen berdasarkan keyword lewat indeks teks + indeks trigram
+    - Hasil diurutkan dari yang paling relevan, salah ketik tetap ditemukan
+      (ambang: skor kemiripan minimal, default FUZZY_AMBANG)
+    - Keyword dalam tanda kutip ("notulen rapat") dicari persis
+    - Keyword tanpa huruf/angka memakai pencarian substring lama di semua kolom
+    '''
     df = load_data(file_path)
     if len(df) == 0:
         return pd.DataFrame()
     
+    keyword = str(keyword).strip()
+    if len(keyword) >= 2 and keyword.startswith('"') and keyword.endswith('"'):
+        return df[_mask_frasa(df, keyword[1:-1])]
+    
+    if normalisasi_teks(keyword) and 'ID' in df.columns:
+        hasil = cari_id_dokumen(file_path, keyword, ambang)
+        if not hasil:
+            return df.iloc[0:0]
+        # Ambil baris lewat posisi dari indeks ID (urut sesuai skor)
+        indeks_id = ambil_indeks(file_path, 'id')
+        if not indeks_id.duplikat and indeks_id.jumlah == len(df):
+            posisi = [indeks_id.cari(id_dokumen) for id_dokumen, _ in hasil]
+            return df.iloc[[p for p in posisi if p is not None]]
+        urutan = {id_dokumen: i for i, (id_dokumen, _) in enumerate(hasil)}
+        df = df[df['ID'].isin(urutan)]
+        return df.iloc[np.argsort(df['ID'].map(urutan).to_numpy(), kind='stable')]
+    
     # Fungsi untuk cek apakah keyword ada di salah satu kolom
     # apply() menerapkan fungsi ke setiap baris
     # lambda row: ... adalah fungsi anonim
@@ -622,9 +4435,520 @@ def filter_dokumen(file_path, kolom, nilai):
     if nilai == "Semua":
         return df
     
+    # Kolom kategori: pakai bitmap faset (tanpa membandingkan seluruh kolom)
+    if kolom in KOLOM_FASET:
+        faset = ambil_indeks(file_path, 'faset')
+        if faset.jumlah == len(df):
+            return df[faset.ambil(kolom, nilai)]
+    
     # Filter data berdasarkan kolom dan nilai
     return df[df[kolom] == nilai]
 
+# FUNGSI QUERY PENCARIAN
+'''
+Bahasa query untuk kotak pencarian Lihat Data
+---------------------------------------------
+- kata biasa           : dicari lewat indeks teks + trigram (lihat cari_dokumen)
+- "frasa persis"       : substring persis di ID/Judul/Jenis/Lokasi/Keterangan
+- jenis:memo           : per kolom (jenis, status, lokasi, judul, ket, id),
+  jenis:"surat masuk"    nilai dicocokkan sebagai substring tanpa beda huruf
+- tanggal:2025-01      : Tanggal_Upload berawalan 2025-01
+  tanggal:2025-01-01..2025-03-31, tanggal:>=2025-02, tanggal:<2025
+- AND (default antar kata), OR, NOT / -kata, dan tanda kurung
+Contoh: jenis:memo (status:aktif OR status:arsip) -tanggal:2024 rapat
+Query dikompilasi menjadi satu mask boolean: tiap daun hanya membaca
+kolomnya sendiri dan data dilewati satu kali.
+'''
+# Nama field di query -> kolom master
+FIELD_QUERY = {
+    'id': 'ID',
+    'judul': 'Judul',
+    'jenis': 'Jenis',
+    'lokasi': 'Lokasi_Fisik',
+    'status': 'Status',
+    'ket': 'Keterangan',
+    'keterangan': 'Keterangan',
+    'tanggal': 'Tanggal_Upload'
+}
+
+_OPERATOR_QUERY = {'AND', 'OR', 'NOT'}
+
+_POLA_TOKEN_QUERY = re.compile(r'''
+    \s*(?:
+        (?P<buka>\() | (?P<tutup>\)) |
+        (?P<minus>-)?
+        (?:(?P<field>[A-Za-z_]+):)?
+        (?:"(?P<kutip>[^"]*)"? | (?P<kata>[^\s()"]+))
+    )''', re.VERBOSE)
+
+
+def _token_query(teks):
+    # Pecah query menjadi token: '(', ')', operator, atau daun (negasi, kolom, nilai, kutip)
+    token = []
+    pos = 0
+    teks = teks.strip()
+    while pos < len(teks):
+        m = _POLA_TOKEN_QUERY.match(teks, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"Query tidak valid di posisi {pos + 1}: {teks[pos:pos + 10]}")
+        pos = m.end()
+        if m.group('buka'):
+            token.append('(')
+        elif m.group('tutup'):
+            token.append(')')
+        elif m.group('kata') in _OPERATOR_QUERY and not m.group('field') and not m.group('minus'):
+            token.append(m.group('kata'))
+        else:
+            field = (m.group('field') or '').lower()
+            dikutip = m.group('kutip') is not None
+            nilai = m.group('kutip') if dikutip else m.group('kata')
+            if field and field not in FIELD_QUERY:
+                # bukan field yang dikenal (mis. 'jam:10'): anggap teks biasa
+                nilai, field = f"{m.group('field')}:{nilai}", ''
+            if nilai is None or nilai == '':
+                continue
+            token.append(('daun', bool(m.group('minus')), FIELD_QUERY.get(field), nilai, dikutip))
+    return token
+
+
+def parse_query(teks):
+    '''
+    Parse query menjadi pohon (tuple):
+    ('dan', [..]), ('atau', [..]), ('bukan', node),
+    ('kolom', kolom, nilai), ('teks', nilai, dikutip)
+    (cari_query menambahkan ('sama', kolom, nilai) untuk filter dropdown)
+    Return None untuk query kosong, ValueError jika sintaks salah.
+    '''
+    token = _token_query(teks or '')
+    pos = 0
+
+    def lihat():
+        return token[pos] if pos < len(token) else None
+
+    def ambil():
+        nonlocal pos
+        pos += 1
+        return token[pos - 1]
+
+    def parse_atau():
+        anak = [parse_dan()]
+        while lihat() == 'OR':
+            ambil()
+            anak.append(parse_dan())
+        return anak[0] if len(anak) == 1 else ('atau', anak)
+
+    def parse_dan():
+        anak = [parse_bukan()]
+        while lihat() not in (None, ')', 'OR'):
+            if lihat() == 'AND':
+                ambil()
+            anak.append(parse_bukan())
+        return anak[0] if len(anak) == 1 else ('dan', anak)
+
+    def parse_bukan():
+        if lihat() == 'NOT':
+            ambil()
+            return ('bukan', parse_bukan())
+        return parse_atom()
+
+    def parse_atom():
+        t = lihat()
+        if t is None or t in (')', 'AND', 'OR'):
+            raise ValueError("Query tidak lengkap: kurang kata setelah operator")
+        ambil()
+        if t == '(':
+            node = parse_atau()
+            if lihat() != ')':
+                raise ValueError("Query tidak valid: kurung tutup ')' tidak ada")
+            ambil()
+            return node
+        _, negasi, kolom, nilai, dikutip = t
+        node = ('kolom', kolom, nilai) if kolom else ('teks', nilai, dikutip)
+        return ('bukan', node) if negasi else node
+
+    if not token:
+        return None
+    pohon = parse_atau()
+    if pos < len(token):
+        raise ValueError("Query tidak valid: kurung tutup ')' berlebih")
+    return pohon
+
+
+def _mask_tanggal(kolom, nilai):
+    # Bandingkan teks 'YYYY-MM-DD HH:MM:SS'; tanggal parsial berlaku sebagai prefix
+    batas_atas = '\uffff'    # '2025-01' + batas_atas > semua waktu di Januari 2025
+    if '..' in nilai:
+        awal, akhir = nilai.split('..', 1)
+        mask = np.ones(len(kolom), dtype=bool)
+        if awal:
+            mask &= (kolom >= awal).to_numpy()
+        if akhir:
+            mask &= (kolom <= akhir + batas_atas).to_numpy()
+        return mask
+    for op, fungsi in (('>=', lambda x: kolom >= x), ('<=', lambda x: kolom <= x + batas_atas),
+                       ('>', lambda x: kolom > x + batas_atas), ('<', lambda x: kolom < x)):
+        if nilai.startswith(op):
+            return fungsi(nilai[len(op):]).to_numpy()
+    return kolom.str.startswith(nilai).to_numpy()
+
+
+def _mask_nilai(kolom, nilai):
+    # Substring tanpa beda huruf; dihitung sekali per nilai unik lalu di-map
+    nilai = nilai.lower()
+    unik = kolom.dropna().unique()
+    cocok = [u for u in unik if nilai in str(u).lower()]
+    return kolom.isin(cocok).to_numpy()
+
+
+def _evaluasi_query(node, df, konteks):
+    # Hitung mask boolean untuk satu node pohon query
+    jenis = node[0]
+    if jenis == 'dan':
+        mask = np.ones(len(df), dtype=bool)
+        for anak in node[1]:
+            mask &= _evaluasi_query(anak, df, konteks)
+        return mask
+    if jenis == 'atau':
+        mask = np.zeros(len(df), dtype=bool)
+        for anak in node[1]:
+            mask |= _evaluasi_query(anak, df, konteks)
+        return mask
+    if jenis == 'bukan':
+        return ~_evaluasi_query(node[1], df, konteks)
+    
+    faset = konteks.get('faset')
+    if jenis == 'sama':
+        # nilai dropdown: harus sama persis
+        _, kolom, nilai = node
+        if faset is not None and kolom in KOLOM_FASET:
+            return faset.ambil(kolom, nilai)
+        if kolom not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        return (df[kolom] == nilai).to_numpy()
+    
+    if jenis == 'kolom':
+        _, kolom, nilai = node
+        if faset is not None and kolom in KOLOM_FASET:
+            # gabungan (OR) bitmap nilai yang mengandung teks query
+            mask = np.zeros(len(df), dtype=bool)
+            for nilai_faset, bitmap in faset.semua(kolom).items():
+                if nilai.lower() in nilai_faset.lower():
+                    mask |= bitmap
+            return mask
+        if kolom not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        if kolom == 'Tanggal_Upload':
+            return _mask_tanggal(df[kolom].astype(str), nilai)
+        if kolom in ('Jenis', 'Status', 'Lokasi_Fisik', 'ID'):
+            return _mask_nilai(df[kolom], nilai)
+        return df[kolom].astype(str).str.contains(nilai, case=False, regex=False).to_numpy()
+    
+    # jenis == 'teks'
+    _, nilai, dikutip = node
+    if dikutip or not normalisasi_teks(nilai):
+        return _mask_frasa(df, nilai)
+    hasil = cari_id_dokumen(konteks['file_path'], nilai)
+    for id_dokumen, skor in hasil:
+        konteks['skor'][id_dokumen] = konteks['skor'].get(id_dokumen, 0.0) + skor
+    indeks_id = konteks['indeks_id']
+    if indeks_id is None:
+        return df['ID'].isin([id_dokumen for id_dokumen, _ in hasil]).to_numpy()
+    # Posisi baris langsung dari indeks ID (tanpa scan kolom ID)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[[indeks_id.posisi[id_dokumen] for id_dokumen, _ in hasil if id_dokumen in indeks_id.posisi]] = True
+    return mask
+
+
+def _ada_teks(node):
+    # True jika pohon query memakai indeks teks
+    if node[0] in ('dan', 'atau'):
+        return any(_ada_teks(anak) for anak in node[1])
+    if node[0] == 'bukan':
+        return _ada_teks(node[1])
+    return node[0] == 'teks' and not node[2]
+
+
+def _jalankan_query_faset(file_path, pohon, df, jenis, status, lokasi):
+    # Evaluasi query tanpa cache, return (posisi baris hasil atau None = semua, hitungan)
+    if len(df) == 0:
+        return None, {kolom: {} for kolom in KOLOM_FASET}
+    
+    faset = ambil_indeks(file_path, 'faset')
+    konteks = {'skor': {}, 'file_path': file_path,
+               'faset': faset if faset.jumlah == len(df) else None}
+    if pohon is not None and _ada_teks(pohon):
+        if 'ID' not in df.columns:
+            return np.zeros(0, dtype=np.int32), {kolom: {} for kolom in KOLOM_FASET}
+        indeks_id = ambil_indeks(file_path, 'id')
+        konteks['indeks_id'] = indeks_id if not indeks_id.duplikat and indeks_id.jumlah == len(df) else None
+    
+    # Mask query dan mask tiap dropdown dihitung terpisah agar bisa dipakai
+    # ulang untuk hitungan faset; filter dropdown = irisan bitmap
+    mask_query = _evaluasi_query(pohon, df, konteks) if pohon is not None else None
+    mask_dropdown = {kolom: _evaluasi_query(('sama', kolom, nilai), df, konteks)
+                     for kolom, nilai in (('Jenis', jenis), ('Status', status), ('Lokasi_Fisik', lokasi))
+                     if nilai and nilai != "Semua"}
+    
+    def gabung(kecuali=None):
+        mask = mask_query
+        for kolom, m in mask_dropdown.items():
+            if kolom != kecuali:
+                mask = m if mask is None else mask & m
+        return mask
+    
+    mask = gabung()
+    posisi = None if mask is None else np.flatnonzero(np.asarray(mask)).astype(np.int32)
+    if konteks['skor'] and (posisi is None or len(posisi) > 1):
+        id_hasil = df['ID'] if posisi is None else df['ID'].iloc[posisi]
+        skor = id_hasil.map(konteks['skor']).fillna(0.0).to_numpy()
+        urutan = np.argsort(-skor, kind='stable')
+        posisi = urutan.astype(np.int32) if posisi is None else posisi[urutan]
+    
+    # Hitungan tiap dropdown tidak ikut difilter oleh dropdown itu sendiri
+    hitungan = {}
+    for kolom in KOLOM_FASET:
+        basis = gabung(kecuali=kolom)
+        if konteks['faset'] is not None:
+            hitungan[kolom] = konteks['faset'].hitung(kolom, basis)
+        elif kolom in df.columns:
+            nilai = df[kolom] if basis is None else df.loc[basis, kolom]
+            hitungan[kolom] = {str(k): int(v) for k, v in nilai.value_counts().items()}
+        else:
+            hitungan[kolom] = {}
+    return posisi, hitungan
+
+
+def cari_query_faset(file_path, query, jenis="Semua", status="Semua", lokasi="Semua", ctx=None,
+                     dengan_kunci=False):
+    '''
+    Jalankan query pencarian (lihat parse_query) beserta filter dropdown
+    jenis/status/lokasi dalam satu kali lewat data. Hasil yang memakai kata
+    biasa diurutkan dari yang paling relevan.
+    Return (df_hasil, hitungan) dengan hitungan[kolom][nilai] = jumlah hasil
+    per pilihan dropdown (mengikuti query dan filter dropdown lainnya),
+    dihitung dari bitmap IndeksFaset tanpa scan ulang.
+    Hasil disimpan di cache hasil query (lihat FUNGSI CACHE HASIL QUERY).
+    dengan_kunci=True: return (df_hasil, hitungan, sumber); sumber diteruskan
+    ke halaman_data agar urutan halaman ikut di-cache (None jika data berubah
+    di tengah pencarian).
+    Melempar ValueError jika sintaks query salah.
+    '''
+    pohon = parse_query(query)
+    kunci = (os.path.abspath(file_path), _kunci_pohon(pohon), jenis, status, lokasi, FUZZY_AMBANG)
+    versi = versi_data(file_path)
+    df = load_data(file_path, ctx=ctx)
+    
+    # Jika ada penulisan di antara versi_data() dan load_data(), df bisa lebih
+    # baru dari versi: hasilnya dihitung biasa tanpa menyentuh cache
+    stabil = versi_data(file_path) == versi
+    entry = _ambil_cache_query(kunci, versi) if stabil else None
+    if entry is not None and entry['jumlah'] == len(df):
+        posisi, hitungan = entry['posisi'], entry['hitungan']
+    else:
+        posisi, hitungan = _jalankan_query_faset(file_path, pohon, df, jenis, status, lokasi)
+        if stabil:
+            _simpan_cache_query(kunci, versi, posisi, hitungan, len(df))
+    
+    hasil = df if posisi is None else df.iloc[posisi]
+    hitungan = {kolom: dict(jumlah) for kolom, jumlah in hitungan.items()}
+    if dengan_kunci:
+        return hasil, hitungan, ((kunci, versi) if stabil else None)
+    return hasil, hitungan
+
+
+def cari_query(file_path, query, jenis="Semua", status="Semua", lokasi="Semua"):
+    # Seperti cari_query_faset, hanya mengembalikan DataFrame hasil
+    return cari_query_faset(file_path, query, jenis, status, lokasi)[0]
+
+
+# FUNGSI CACHE HASIL QUERY
+'''
+Cache hasil pencarian + filter Lihat Data (LRU, dipakai semua sesi)
+-------------------------------------------------------------------
+Streamlit menjalankan ulang script di setiap interaksi (ganti halaman, ganti
+urutan), sehingga query dan filter yang sama dihitung berulang-ulang.
+- Kunci: (file, pohon query hasil parse_query, filter dropdown, ambang fuzzy);
+  beda spasi, huruf besar nama field atau AND eksplisit tetap satu entry
+- Entry hanya berlaku untuk versi_data() saat dihitung: setiap penulisan
+  menaikkan versi, jadi entry lama otomatis basi tanpa invalidasi manual
+- Yang disimpan hanya posisi baris hasil (int32) + hitungan faset, bukan
+  DataFrame; baris diambil lagi dari cache data dengan iloc
+- Urutan halaman (halaman_data) ikut disimpan sebagai entry tersendiri:
+  kunci query + ('urut', kolom), posisi = permutasi int32, hitungan None
+- Memori dibatasi CACHE_QUERY_MAKS_MB, entry paling lama tidak dipakai
+  dibuang lebih dulu
+'''
+CACHE_QUERY_MAKS_MB = float(os.environ.get('SMDOK_CACHE_QUERY_MB', 16))
+
+# Perkiraan memori per entry di luar array posisi (kunci, dictionary hitungan)
+_UKURAN_ENTRY_QUERY = 2048
+
+_CACHE_QUERY = CacheLRU()           # kunci -> {'versi', 'posisi', 'hitungan', 'jumlah'}
+
+
+def _kunci_pohon(node):
+    # Pohon query (list anak 'dan'/'atau') -> tuple agar bisa jadi kunci dictionary
+    if isinstance(node, (list, tuple)):
+        return tuple(_kunci_pohon(n) for n in node)
+    return node
+
+
+def _ambil_cache_query(kunci, versi):
+    # Entry cache untuk kunci pada versi data ini, None jika tidak ada / basi
+    entry = _CACHE_QUERY.ambil(kunci)
+    if entry is not None and entry['versi'] != versi:
+        entry = None
+    _CACHE_QUERY.catat(hit=entry is not None)
+    return entry
+
+
+def _simpan_cache_query(kunci, versi, posisi, hitungan, jumlah):
+    # Simpan hasil query, lalu buang entry LRU sampai total ukuran di bawah batas
+    ukuran = _UKURAN_ENTRY_QUERY + (posisi.nbytes if posisi is not None else 0)
+    _CACHE_QUERY.simpan(kunci, {'versi': versi, 'posisi': posisi, 'hitungan': hitungan, 'jumlah': jumlah},
+                        ukuran, CACHE_QUERY_MAKS_MB)
+
+
+def get_statistik_cache_query():
+    # Statistik cache hasil query: hit/miss/eviction, entry dan memori terpakai
+    return _CACHE_QUERY.statistik(CACHE_QUERY_MAKS_MB)
+
+
+# FUNGSI PAGINASI
+'''
+Paginasi di sisi server untuk tabel Lihat Data
+----------------------------------------------
+- Pengurutan dilakukan di sini (argsort stabil bertingkat di numpy),
+  bukan di browser; hanya baris di halaman aktif yang di-materialisasi
+- Keyset pagination: posisi halaman disimpan sebagai kunci baris
+  (nilai kolom urut, panjang ID, ID), bukan offset. Halaman berikutnya dicari
+  dengan binary search di urutan, jadi halaman jauh tetap cepat dan tidak
+  bergeser saat ada dokumen baru
+- ID diurutkan natural: DOC999 sebelum DOC1000
+- Urutan hasil query disimpan di cache hasil query (kunci query + kolom
+  urut, versi data), jadi pindah halaman cukup binary search tanpa sort ulang
+'''
+KOLOM_URUT = ['ID', 'Judul', 'Jenis', 'Status', 'Lokasi_Fisik', 'Tanggal_Upload']
+
+
+def _urutan_data(df, kolom_urut):
+    # Posisi baris terurut naik (int32)
+    if kolom_urut is None or 'ID' not in df.columns:
+        # urutan asli (mis. relevansi pencarian)
+        return np.arange(len(df), dtype=np.int32)
+    
+    # Urutan bertingkat dengan sort stabil: ID dulu, lalu panjang ID, lalu nilai kolom
+    id_str = df['ID'].astype(str)
+    panjang = id_str.str.len().to_numpy()
+    urutan = id_str.argsort(kind='stable').to_numpy()
+    urutan = urutan[np.argsort(panjang[urutan], kind='stable')]
+    if kolom_urut != 'ID' and kolom_urut in df.columns:
+        kode_nilai = pd.factorize(df[kolom_urut].fillna('').astype(str), sort=True)[0]
+        urutan = urutan[np.argsort(kode_nilai[urutan], kind='stable')]
+    return urutan.astype(np.int32)
+
+
+def _kunci_baris(df, kolom_urut):
+    # Fungsi kunci keyset untuk baris di posisi p, dibaca langsung dari df
+    # (binary search hanya menyentuh ~log2(n) baris, tidak perlu array kunci penuh)
+    if kolom_urut is None or 'ID' not in df.columns:
+        return lambda p: (int(p),)
+    
+    kolom_id = df['ID']
+    def kunci_id(p):
+        id_str = str(kolom_id.iat[p])
+        return len(id_str), id_str
+    if kolom_urut == 'ID' or kolom_urut not in df.columns:
+        return lambda p: ('',) + kunci_id(p)
+    
+    kolom_nilai = df[kolom_urut]
+    def kunci(p):
+        nilai = kolom_nilai.iat[p]
+        return ('' if pd.isna(nilai) else str(nilai),) + kunci_id(p)
+    return kunci
+
+
+def _urutan_data_cache(df, kolom_urut, sumber):
+    # Urutan baris df, disimpan di cache hasil query jika df berasal dari
+    # cari_query_faset(dengan_kunci=True): kunci = kunci query + kolom urut,
+    # berlaku untuk versi data yang sama seperti hasil query-nya
+    if sumber is None or kolom_urut is None:
+        return _urutan_data(df, kolom_urut)
+    kunci_query, versi = sumber
+    kunci = kunci_query + ('urut', kolom_urut)
+    entry = _ambil_cache_query(kunci, versi)
+    if entry is not None and entry['jumlah'] == len(df):
+        return entry['posisi']
+    urutan = _urutan_data(df, kolom_urut)
+    _simpan_cache_query(kunci, versi, urutan, None, len(df))
+    return urutan
+
+
+def halaman_data(df, kolom_urut='ID', turun=False, ukuran=50, kursor=None, sumber=None):
+    '''
+    Ambil satu halaman dari df yang sudah difilter
+    kolom_urut: salah satu KOLOM_URUT, None = urutan df apa adanya (relevansi)
+    kursor: None / ('awal',)   -> halaman pertama
+            ('akhir',)         -> halaman terakhir
+            ('setelah', kunci) -> halaman sesudah baris dengan kunci tersebut
+            ('sebelum', kunci) -> halaman sebelum baris dengan kunci tersebut
+    sumber: tanda hasil dari cari_query_faset(..., dengan_kunci=True); jika
+            diisi, urutan baris diambil dari cache hasil query sehingga
+            pindah halaman tidak mengurutkan ulang seluruh hasil
+    Return dictionary:
+    - data       : DataFrame halaman ini (maksimal ukuran baris)
+    - mulai      : nomor urut baris pertama (dari 0)
+    - total      : jumlah seluruh baris
+    - kunci_awal / kunci_akhir : kunci baris pertama / terakhir (untuk kursor)
+    '''
+    total = len(df)
+    ukuran = max(1, int(ukuran))
+    if total == 0:
+        return {'data': df, 'mulai': 0, 'total': 0, 'kunci_awal': None, 'kunci_akhir': None}
+    
+    urutan = _urutan_data_cache(df, kolom_urut, sumber)
+    if turun:
+        urutan = urutan[::-1]
+    kunci_posisi = _kunci_baris(df, kolom_urut)
+    kunci = lambda i: kunci_posisi(urutan[i])
+    
+    def cari_batas(k):
+        # Jumlah baris yang berada sebelum atau sama dengan kunci k (binary search)
+        kiri, kanan = 0, total
+        while kiri < kanan:
+            tengah = (kiri + kanan) // 2
+            sudah_lewat = kunci(tengah) > k if not turun else kunci(tengah) < k
+            if sudah_lewat:
+                kanan = tengah
+            else:
+                kiri = tengah + 1
+        return kiri
+    
+    jenis = kursor[0] if kursor else 'awal'
+    if jenis == 'akhir':
+        mulai = ((total - 1) // ukuran) * ukuran
+    elif jenis == 'setelah':
+        mulai = cari_batas(tuple(kursor[1]))
+        if mulai >= total:
+            mulai = ((total - 1) // ukuran) * ukuran
+    elif jenis == 'sebelum':
+        # baris berkunci sama dengan kursor tidak ikut (batas - 1 jika cocok persis)
+        batas = cari_batas(tuple(kursor[1]))
+        if batas > 0 and kunci(batas - 1) == tuple(kursor[1]):
+            batas -= 1
+        mulai = max(0, batas - ukuran)
+    else:
+        mulai = 0
+    
+    posisi = urutan[mulai:mulai + ukuran]
+    return {
+        'data': df.iloc[posisi],
+        'mulai': mulai,
+        'total': total,
+        'kunci_awal': kunci(mulai),
+        'kunci_akhir': kunci(mulai + len(posisi) - 1)
+    }
+
 # FUNGSI EXPORT & BACKUP
 def export_excel(file_path, output_path):
     # Export data ke file Excel
@@ -659,31 +4983,31 @@ def buat_backup(source_folder, backup_name):
 # FUNGSI LOGIN
 def validasi_login(file_path, username, password):
     # Validasi login user
-    df = load_data(file_path)
-    
-    if len(df) == 0:
-        return {'valid': False, 'message': 'Database user kosong'}
+    storage = get_storage()
     
-    # Cari user dengan username dan password sesuai
-    user = df[(df['username'] == username) & (df['password'] == password)]
+    # Cari user berdasarkan username (primary key di engine SQLite)
+    user = storage.get_by_key(file_path, 'username', username)
     
-    if len(user) > 0:
+    if user is not None and str(user['password']) == str(password):
         return {
             'valid': True,
             'username': username,
-            'role': user.iloc[0]['role'],
+            'role': user['role'],
             'message': 'Login berhasil'
         }
     
+    if len(storage.tail(file_path, 1)) == 0:
+        return {'valid': False, 'message': 'Database user kosong'}
+    
     return {'valid': False, 'message': 'Username atau password salah'}
 
 
 def tambah_user(file_path, username, password, role):
     # Tambah user baru
-    df = load_data(file_path)
+    storage = get_storage()
     
     # Cek apakah username sudah ada
-    if len(df) > 0 and username in df['username'].values:
+    if storage.get_by_key(file_path, 'username', username) is not None:
         return False    # username sudah ada, gagal tambah
     
     # Buat user baru
@@ -693,13 +5017,8 @@ def tambah_user(file_path, username, password, role):
         'role': role
     }])
     
-    # Gabungkan dengan data user existing
-    if len(df) == 0:
-        df = user_baru
-    else:
-        df = pd.concat([df, user_baru], ignore_index=True)
-    
-    save_data(file_path, df)
+    # Tambahkan ke data user existing
+    storage.append(file_path, user_baru)
     return True
 
 # FUNGSI UTILITAS